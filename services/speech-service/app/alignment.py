@@ -1,70 +1,154 @@
 import os
 import tempfile
-import json
-import yaml
 import numpy as np
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Union
 import torch
 import torchaudio
 import logging
 import os.path as osp
+import threading
+
+from .audio import decode_audio_bytes
+from .bundle import ModelBundle, cmvn_from_json, default_bundle_path, read_units
+from .ctc_head import ctc_projection, restricted_log_posteriors
+from .ctc_viterbi import build_extended_labels, build_skip_mask, ctc_viterbi_path_ext
+from .frontend import FeatureFrontend
+from .lexicon import NeuralG2P, PronunciationLexicon, arpabet_to_ipa
+from .metrics import (
+    STAGE_CTC,
+    STAGE_DECODE,
+    STAGE_ENCODER,
+    STAGE_FBANK,
+    STAGE_G2P,
+    STAGE_RESAMPLE,
+    STAGE_SEGMENTATION,
+    STAGE_VITERBI,
+)
+from .precision import PRECISION_FP32, apply_precision, inference_context, precision_mode
+from .results import AlignmentResult, PhonemeSegment, WordSegment
+from .reference import CompiledReference, ReferenceCache, compile_reference, group_tokens_by_word
+from .timing import stage
+from .trim import TrimConfig, TrimSpan, speech_span
+from .vocabulary import Vocabulary
 
-# WeNet imports
-WENET_AVAILABLE = False
-try:
-    from wenet.utils.init_model import init_model, load_checkpoint
-    from wenet.utils.file_utils import read_symbol_table
-    from wenet.models.transformer.ctc import CTC
-    from wenet.models.transformer.decoder import TransformerDecoder
-    from wenet.models.transformer.encoder import ConformerEncoder
-    from wenet.models.transformer.asr_model import ASRModel
-    WENET_AVAILABLE = True
-except (ImportError, AttributeError, ModuleNotFoundError) as e:
-    # 捕获所有可能的导入错误，包括依赖版本冲突
-    print(f"Warning: WeNet not available: {e}. Using fallback alignment.")
-    WENET_AVAILABLE = False
-
-# 设置日志
-logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+
 # 过滤掉WeNet的unexpected tensor日志
 class WeNetLogFilter(logging.Filter):
     def filter(self, record):
         return "unexpected tensor" not in record.getMessage()
 
-# 为root logger添加过滤器
-root_logger = logging.getLogger()
-root_logger.addFilter(WeNetLogFilter())
+
+# WeNet 包树较重，首次加载模型时才导入（见 wenet_available），导入前这些符号为 None
+init_model: Any = None
+load_checkpoint: Any = None
+CTC: Any = None
+TransformerDecoder: Any = None
+ConformerEncoder: Any = None
+TransformerEncoder: Any = None
+ASRModel: Any = None
+
+_wenet_available: Optional[bool] = None
+_wenet_lock = threading.Lock()
+
+
+def wenet_available() -> bool:
+    """导入 WeNet 并返回是否可用；结果缓存，成功时为本模块的 WeNet 符号赋值"""
+    global _wenet_available, init_model, load_checkpoint
+    global CTC, TransformerDecoder, ConformerEncoder, TransformerEncoder, ASRModel
+    if _wenet_available is not None:
+        return _wenet_available
+    with _wenet_lock:
+        if _wenet_available is None:
+            try:
+                from wenet.utils.init_model import init_model as _init_model
+                from wenet.utils.init_model import load_checkpoint as _load_checkpoint
+                from wenet.models.transformer.ctc import CTC as _CTC
+                from wenet.models.transformer.decoder import TransformerDecoder as _TransformerDecoder
+                from wenet.models.transformer.encoder import ConformerEncoder as _ConformerEncoder
+                from wenet.models.transformer.encoder import TransformerEncoder as _TransformerEncoder
+                from wenet.models.transformer.asr_model import ASRModel as _ASRModel
+            except (ImportError, AttributeError, ModuleNotFoundError) as e:
+                # 捕获所有可能的导入错误，包括依赖版本冲突
+                logger.warning(f"WeNet not available: {e}. Using fallback alignment.")
+                _wenet_available = False
+            else:
+                # 只填充仍为 None 的符号，不覆盖测试中替换的组件
+                init_model = init_model or _init_model
+                load_checkpoint = load_checkpoint or _load_checkpoint
+                CTC = CTC or _CTC
+                TransformerDecoder = TransformerDecoder or _TransformerDecoder
+                ConformerEncoder = ConformerEncoder or _ConformerEncoder
+                TransformerEncoder = TransformerEncoder or _TransformerEncoder
+                ASRModel = ASRModel or _ASRModel
+                # 为root logger添加过滤器（WeNet 加载 checkpoint 时经 root logger 输出）
+                logging.getLogger().addFilter(WeNetLogFilter())
+                _wenet_available = True
+    return _wenet_available
+
+
+def __getattr__(name: str) -> Any:
+    # 兼容 from app.alignment import WENET_AVAILABLE：访问时才导入 WeNet
+    if name == "WENET_AVAILABLE":
+        return wenet_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-@dataclass
-class PhonemeSegment:
-    phoneme: str
-    start: float
-    end: float
-    confidence: float
+def load_mode() -> str:
+    """模型加载模式：ctc_only（默认，只加载 encoder + CTC）或 full（完整 ASRModel）"""
+    return os.getenv("WENET_LOAD_MODE", "ctc_only").lower()
 
 
-@dataclass
-class WordSegment:
-    word: str
-    start: float
-    end: float
-    phonemes: List[PhonemeSegment]
+def default_checkpoint_path() -> str:
+    """默认 checkpoint：优先使用下载的模型文件"""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    downloaded_model = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/final.pt")
+    local_model = os.path.join(project_root, "models/final.pt")
+    return downloaded_model if os.path.exists(downloaded_model) else local_model
 
 
-@dataclass
-class AlignmentResult:
-    words: List[WordSegment]
-    duration: float
-    raw_confidence: List[float]
+def model_source_path() -> str:
+    """默认配置下加载的模型包或 checkpoint 路径"""
+    return default_bundle_path() or os.getenv("WENET_MODEL_PATH", default_checkpoint_path())
+
+
+class CTCOnlyModel(torch.nn.Module):
+    """只包含 encoder 与 CTC 头的模型，对齐不需要注意力解码器"""
+
+    def __init__(self, encoder: torch.nn.Module, ctc: torch.nn.Module):
+        super().__init__()
+        self.encoder = encoder
+        self.ctc = ctc
+
+
+def _load_checkpoint_state(path: str) -> Dict[str, torch.Tensor]:
+    """读取 checkpoint；支持时使用 mmap，未被复制的张量（如解码器）不会读入内存"""
+    try:
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except (TypeError, RuntimeError):
+        # 旧版 torch 不支持 mmap/weights_only，或旧格式 checkpoint 无法 mmap
+        return torch.load(path, map_location="cpu")
 
 
 class WeNetAlignment:
-    def __init__(self, model_path: str = None, config_path: str = None, dict_path: str = None):
-        """初始化 WeNet 模型"""
+    def __init__(
+        self,
+        model_path: str = None,
+        config_path: str = None,
+        dict_path: str = None,
+        load_model: bool = True,
+        precision: Optional[str] = None,
+        bundle_path: Optional[str] = None,
+    ):
+        """初始化 WeNet 模型
+
+        load_model=False 时只加载配置、词表、SentencePiece 与 CMVN（不需要安装 WeNet），
+        编码器由其它后端（如 ONNX）执行。
+        precision 为 fp32 / int8 / bf16，默认读取 WENET_PRECISION。
+        bundle_path 为 scripts/pack_model.py 打包的模型包（默认 WENET_BUNDLE_PATH 或 models/bundle），
+        存在时替代 checkpoint / 配置 / 词典 / SentencePiece / CMVN 各文件，权重以 mmap 方式加载。
+        """
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.debug(f"Using device: {self.device}")
 
@@ -72,12 +156,7 @@ class WeNetAlignment:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
 
-        # 优先使用下载的模型文件
-        downloaded_model = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/final.pt")
-        local_model = os.path.join(project_root, "models/final.pt")
-        default_model = downloaded_model if os.path.exists(downloaded_model) else local_model
-
-        self.model_path = model_path or os.getenv("WENET_MODEL_PATH", default_model)
+        self.model_path = model_path or os.getenv("WENET_MODEL_PATH", default_checkpoint_path())
         self.config_path = config_path or os.getenv("WENET_CONFIG_PATH", os.path.join(project_root, "config", "wenet_config.yaml"))
 
         # 优先使用下载的词典文件
@@ -87,21 +166,45 @@ class WeNetAlignment:
 
         self.dict_path = dict_path or os.getenv("WENET_DICT_PATH", default_dict)
 
+        # 显式指定 checkpoint / 配置 / 词典时不自动使用模型包
+        bundle_path = bundle_path or (None if (model_path or config_path or dict_path) else default_bundle_path())
+        self.bundle: Optional[ModelBundle] = None
+
         self.model = None
+        self.load_mode = load_mode()
+        self.precision = PRECISION_FP32
         self.config = None
         self.char_dict = None
+        self.vocab: Optional[Vocabulary] = None
         self.vocab_size = 0
-        self.g2p = None  # lazy init
+        self.g2p = NeuralG2P()  # lazy init，线程安全
+        self.lexicon = PronunciationLexicon.from_env(g2p=self.g2p)
+        self.references = ReferenceCache.from_env()
         self.spm = None  # sentencepiece processor if available
         self.cmvn_mean = None
         self.cmvn_istd = None
+        # 重采样核、窗函数、mel 矩阵与 CMVN 的缓存前端
+        self.frontend = FeatureFrontend()
 
-        if not WENET_AVAILABLE:
+        # 只有 PyTorch 编码器需要 WeNet；词表、配置、SentencePiece 与 CMVN 的读取不依赖 WeNet
+        if load_model and not wenet_available():
             raise RuntimeError("WeNet library is not available. Please install WeNet properly.")
 
         try:
+            if bundle_path:
+                self.bundle = ModelBundle.open(bundle_path)
+                stale = self.bundle.stale_reason(self.model_path)
+                if stale:
+                    logger.warning(f"Model bundle {bundle_path} may be stale ({stale}); re-run make pack-model")
+                self.model_path = bundle_path
+                logger.info(f"Opened model bundle {bundle_path}")
+
             # 加载配置
-            if os.path.exists(self.config_path):
+            if self.bundle is not None:
+                self.config = self.bundle.config
+            elif os.path.exists(self.config_path):
+                import yaml
+
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     self.config = yaml.safe_load(f)
                 logger.info(f"Loaded config from {self.config_path}")
@@ -110,60 +213,102 @@ class WeNetAlignment:
                 self.config = self._get_default_config()
 
             # 加载词典
-            if os.path.exists(self.dict_path):
-                self.char_dict = read_symbol_table(self.dict_path)
-                self.vocab_size = len(self.char_dict)
-                logger.info(f"Loaded vocabulary with {self.vocab_size} tokens")
+            if self.bundle is not None:
+                self.char_dict = self.bundle.symbol_table()
+            elif os.path.exists(self.dict_path):
+                self.char_dict = read_units(self.dict_path)
+                logger.info(f"Loaded vocabulary with {len(self.char_dict)} tokens")
             else:
                 logger.warning(f"Dictionary not found at {self.dict_path}, using default")
                 self.char_dict = self._get_default_char_dict()
-                self.vocab_size = len(self.char_dict)
+            self.vocab = Vocabulary(self.char_dict)
+            self.vocab_size = len(self.vocab)
 
             # 初始化模型
-            if not os.path.exists(self.model_path):
-                raise RuntimeError(f"Model file not found at {self.model_path}")
-
-            self.model = self._init_model()
-            if not self.model:
-                raise RuntimeError("Failed to initialize WeNet model")
-
-            self.model.to(self.device)
-            self.model.eval()
-            logger.info("WeNet model loaded successfully")
-
-            # 加载 SentencePiece 模型（若存在）
-            spm_path = os.getenv("WENET_SPM_PATH")
-            if not spm_path:
-                # downloads 中常见的 spm 路径
-                candidate = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/train_960_unigram5000.model")
-                if os.path.exists(candidate):
-                    spm_path = candidate
-            if spm_path and os.path.exists(spm_path):
-                try:
-                    import sentencepiece as spm
-                    self.spm = spm.SentencePieceProcessor()
-                    self.spm.Load(spm_path)
-                    logger.info(f"Loaded SentencePiece model: {spm_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to load SentencePiece model at {spm_path}: {e}")
-
-            # 加载全局 CMVN（若存在）
-            cmvn_path = os.getenv("WENET_CMVN_PATH")
-            if not cmvn_path:
-                candidate = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/global_cmvn")
-                if os.path.exists(candidate):
-                    cmvn_path = candidate
-            if cmvn_path and os.path.exists(cmvn_path):
-                try:
-                    self.cmvn_mean, self.cmvn_istd = self._load_cmvn(cmvn_path)
-                    logger.info(f"Loaded global CMVN: {cmvn_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to load CMVN at {cmvn_path}: {e}")
+            if load_model:
+                if self.bundle is not None:
+                    # 模型包只含 encoder + CTC
+                    self.load_mode = "ctc_only"
+                    self.model = self._init_bundle_model()
+                elif not os.path.exists(self.model_path):
+                    raise RuntimeError(f"Model file not found at {self.model_path}")
+
+                if self.model is None and self.load_mode == "ctc_only":
+                    try:
+                        self.model = self._init_ctc_only_model()
+                    except Exception as e:
+                        logger.warning(f"CTC-only loading failed ({e}), falling back to full model")
+                if self.model is None:
+                    self.load_mode = "full"
+                    self.model = self._init_model()
+                if not self.model:
+                    raise RuntimeError("Failed to initialize WeNet model")
+
+                self.model.to(self.device)
+                self.model.eval()
+                self.precision = apply_precision(self.model, precision or precision_mode(), self.device)
+                logger.info(f"WeNet model loaded successfully (precision {self.precision})")
+            else:
+                # 编码器由其它后端（如 ONNX）执行
+                self.load_mode = "none"
+
+            if self.bundle is not None:
+                self._load_bundle_frontend()
+            else:
+                self._load_spm_file(project_root)
+                self._load_cmvn_file(project_root)
 
         except Exception as e:
             logger.error(f"Failed to load WeNet model: {e}")
             raise
 
+    def _load_spm_file(self, project_root: str) -> None:
+        """加载 SentencePiece 模型（若存在）"""
+        spm_path = os.getenv("WENET_SPM_PATH")
+        if not spm_path:
+            # downloads 中常见的 spm 路径
+            candidate = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/train_960_unigram5000.model")
+            if os.path.exists(candidate):
+                spm_path = candidate
+        if spm_path and os.path.exists(spm_path):
+            try:
+                import sentencepiece as spm
+                self.spm = spm.SentencePieceProcessor()
+                self.spm.Load(spm_path)
+                logger.info(f"Loaded SentencePiece model: {spm_path}")
+            except Exception as e:
+                logger.warning(f"Failed to load SentencePiece model at {spm_path}: {e}")
+
+    def _load_cmvn_file(self, project_root: str) -> None:
+        """加载全局 CMVN（若存在）"""
+        cmvn_path = os.getenv("WENET_CMVN_PATH")
+        if not cmvn_path:
+            candidate = os.path.join(project_root, "downloads/20210610_u2pp_conformer_exp/global_cmvn")
+            if os.path.exists(candidate):
+                cmvn_path = candidate
+        if cmvn_path and os.path.exists(cmvn_path):
+            try:
+                self.cmvn_mean, self.cmvn_istd = self._load_cmvn(cmvn_path)
+                self.frontend = FeatureFrontend(self.cmvn_mean, self.cmvn_istd)
+                logger.info(f"Loaded global CMVN: {cmvn_path}")
+            except Exception as e:
+                logger.warning(f"Failed to load CMVN at {cmvn_path}: {e}")
+
+    def _load_bundle_frontend(self) -> None:
+        """从模型包读取预计算的 CMVN 与 SentencePiece 模型"""
+        cmvn = self.bundle.cmvn
+        if cmvn is not None:
+            self.cmvn_mean, self.cmvn_istd = cmvn
+            self.frontend = FeatureFrontend(self.cmvn_mean, self.cmvn_istd)
+        spm_model = self.bundle.spm_model
+        if spm_model is not None:
+            try:
+                import sentencepiece as spm
+                self.spm = spm.SentencePieceProcessor()
+                self.spm.LoadFromSerializedProto(spm_model)
+            except Exception as e:
+                logger.warning(f"Failed to load SentencePiece model from bundle: {e}")
+
     def _get_default_config(self) -> Dict:
         """获取默认配置"""
         return {
@@ -212,10 +357,47 @@ class WeNetAlignment:
         chars = ['<blank>', '<unk>', '▁'] + list('abcdefghijklmnopqrstuvwxyz ') + [str(i) for i in range(10)]
         return {char: i for i, char in enumerate(chars)}
 
+    def _build_ctc_only_model(self) -> CTCOnlyModel:
+        """按配置构建 encoder + CTC（未加载权重）"""
+        encoder_type = self.config.get('encoder', 'conformer')
+        encoder_cls = {'conformer': ConformerEncoder, 'transformer': TransformerEncoder}.get(encoder_type)
+        if encoder_cls is None:
+            raise ValueError(f"unsupported encoder type for CTC-only loading: {encoder_type}")
+
+        input_dim = int(self.config.get('input_dim', 80))
+        vocab_size = int(self.config.get('output_dim', self.vocab_size))
+        blank_id = int(self.config.get('ctc_conf', {}).get('ctc_blank_id', 0))
+        encoder = encoder_cls(input_dim, **self.config.get('encoder_conf', {}))
+        ctc = CTC(vocab_size, encoder.output_size(), blank_id=blank_id)
+        return CTCOnlyModel(encoder, ctc)
+
+    def _init_ctc_only_model(self) -> CTCOnlyModel:
+        """只构建 encoder + CTC 并加载对应权重，跳过注意力解码器（含反向解码器）"""
+        model = self._build_ctc_only_model()
+        state = _load_checkpoint_state(self.model_path)
+        wanted = {k: v for k, v in state.items() if k.startswith(('encoder.', 'ctc.'))}
+        del state
+        missing, _ = model.load_state_dict(wanted, strict=False)
+        if missing:
+            raise RuntimeError(f"checkpoint is missing {len(missing)} encoder/CTC tensors, e.g. {missing[0]}")
+        logger.info(f"Loaded encoder + CTC weights only ({len(wanted)} tensors) from {self.model_path}")
+        return model
+
+    def _init_bundle_model(self) -> CTCOnlyModel:
+        """encoder + CTC 的参数直接使用模型包 mmap 上的张量（不复制）"""
+        model = self._build_ctc_only_model()
+        state = self.bundle.state_dict()
+        # assign=True 需要 torch >= 2.1（pyproject 中的下限）
+        missing, _ = model.load_state_dict(state, strict=False, assign=True)
+        if missing:
+            raise RuntimeError(f"bundle is missing {len(missing)} encoder/CTC tensors, e.g. {missing[0]}")
+        logger.info(f"Loaded encoder + CTC weights ({len(state)} tensors) from bundle {self.bundle.path}")
+        return model
+
     def _init_model(self):
         """初始化模型"""
         try:
-            if not WENET_AVAILABLE:
+            if not wenet_available():
                 return None
 
             # 创建一个简单的args对象
@@ -247,19 +429,30 @@ class WeNetAlignment:
             logger.error(f"Failed to initialize model: {e}")
             return None
 
-    def preprocess_audio(self, wav_path: str) -> torch.Tensor:
-        """预处理音频文件"""
+    def preprocess_audio(
+        self, audio: Union[str, bytes, bytearray, memoryview, np.ndarray], sample_rate: Optional[int] = None
+    ) -> torch.Tensor:
+        """预处理音频：文件路径、内存中的音频字节（直接解码，不落盘），
+        或已解码的 [channels, samples] float32 数组（需同时给出 sample_rate）"""
         try:
-            waveform, sample_rate = torchaudio.load(wav_path)
+            if isinstance(audio, np.ndarray):
+                if sample_rate is None:
+                    raise ValueError("sample_rate is required for decoded audio")
+                waveform = torch.from_numpy(audio if audio.ndim == 2 else audio[None, :])
+            elif isinstance(audio, (bytes, bytearray, memoryview)):
+                with stage(STAGE_DECODE):
+                    samples, sample_rate = decode_audio_bytes(audio)
+                waveform = torch.from_numpy(samples)
+            else:
+                waveform, sample_rate = torchaudio.load(audio)
 
             # 转换为单声道
             if waveform.shape[0] > 1:
                 waveform = torch.mean(waveform, dim=0, keepdim=True)
 
-            # 重采样到 16kHz
-            if sample_rate != 16000:
-                resampler = torchaudio.transforms.Resample(sample_rate, 16000)
-                waveform = resampler(waveform)
+            # 重采样到 16kHz（重采样核按源采样率缓存）
+            with stage(STAGE_RESAMPLE):
+                waveform = self.frontend.resample(waveform, sample_rate)
 
             # 确保音频长度足够（至少0.5秒，即8000个样本）
             min_length = 8000  # 0.5秒 * 16000Hz
@@ -274,74 +467,148 @@ class WeNetAlignment:
             logger.error(f"Failed to preprocess audio: {e}")
             raise
 
-    def get_phoneme_alignments(self, waveform: torch.Tensor, text: str) -> AlignmentResult:
-        """使用 WeNet 获取音素对齐"""
-        if not WENET_AVAILABLE:
+    def _check_ready(self) -> None:
+        if not wenet_available():
             raise RuntimeError("WeNet library is not available. Please install WeNet properly.")
 
         if self.model is None:
             raise RuntimeError("WeNet model is not loaded. Please check model file and configuration.")
 
-        with torch.no_grad():
-            # 使用 Kaldi fbank 提取，并应用 CMVN 与 WeNet 训练一致
-            import torchaudio.compliance.kaldi as kaldi
-
-            # 记录原始样本数用于计算持续时间
-            original_num_samples = int(waveform.shape[-1])
-            if waveform.dim() == 1:
-                waveform = waveform.unsqueeze(0)  # [1, seq_len]
-
-            # 提取 Kaldi fbank 特征: [frames, 80]
-            fbank = kaldi.fbank(
-                waveform,
-                num_mel_bins=80,
-                sample_frequency=16000,
-                frame_length=25.0,
-                frame_shift=10.0,
-                dither=0.0,
-                window_type='hamming',
-                use_energy=False,
-            )
+    def compute_features(self, waveform: torch.Tensor) -> torch.Tensor:
+        """提取 Kaldi fbank 特征并应用 CMVN，返回 [frames, 80]"""
+        # 与 kaldi.fbank + CMVN 逐位一致，窗函数与 mel 矩阵由前端缓存
+        with stage(STAGE_FBANK):
+            return self.frontend.compute(waveform)
 
-            # 应用 CMVN（若可用）
-            if self.cmvn_mean is not None and self.cmvn_istd is not None:
-                feats2 = (fbank - self.cmvn_mean) * self.cmvn_istd
-            else:
-                feats2 = fbank
+    def compute_features_batch(self, waveforms: List[torch.Tensor]) -> List[torch.Tensor]:
+        """批量提取多条音频的特征"""
+        with stage(STAGE_FBANK):
+            return self.frontend.compute_batch(waveforms)
 
-            # 转换为 [1, time, feature]
-            feats = feats2.unsqueeze(0).to(self.device)
-            feats_lengths = torch.tensor([feats.shape[1]], dtype=torch.long).to(self.device)
+    def forward_ctc(self, feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+        """对一组特征执行一次批量 encoder + CTC 前向，返回每条的 [T, V] 对数后验"""
+        self._check_ready()
+        from .batching import pad_features
 
-            # 编码器前向传播
-            encoder_result = self.model.encoder(feats, feats_lengths)
-            if len(encoder_result) == 3:
-                encoder_out, encoder_out_lens, _ = encoder_result
+        with torch.no_grad():
+            feats, feats_lengths = pad_features(feats_list)
+            feats = feats.to(self.device)
+            feats_lengths = feats_lengths.to(self.device)
+
+            # 编码器前向传播（bf16 模式下在 autocast 中执行）
+            with stage(STAGE_ENCODER), inference_context(self.precision, self.device):
+                encoder_result = self.model.encoder(feats, feats_lengths)
+            encoder_out, encoder_mask = encoder_result[0], encoder_result[1]
+
+            # CTC 解码获取对齐（对数后验始终为 fp32）
+            with stage(STAGE_CTC):
+                ctc_probs = self.model.ctc.log_softmax(encoder_out.float())
+
+            # 按编码器输出长度拆分（mask: [B, 1, T']，或直接为长度 [B]）
+            if encoder_mask.dim() == 3:
+                out_lens = encoder_mask.squeeze(1).sum(dim=1)
             else:
-                encoder_out, encoder_out_lens = encoder_result
+                out_lens = encoder_mask
+            return [ctc_probs[i, :int(out_lens[i])].cpu() for i in range(len(feats_list))]
 
-            # CTC 解码获取对齐
-            ctc_probs = self.model.ctc.log_softmax(encoder_out)
+    def forward_encoder(self, feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+        """批量 encoder 前向，返回每条的 [T, D] 隐状态（CTC 头由请求按标签子集计算）"""
+        self._check_ready()
+        from .batching import pad_features
 
-            # 将文本转换为 token 序列
-            text_tokens = self._text_to_tokens(text)
-
-            # 使用CTC对齐（改为使用 T=时间帧数 进行归一化）
-            alignments = self._compute_ctc_alignments(
-                ctc_probs.squeeze(0), text_tokens, ctc_probs.shape[1]
+        with torch.no_grad():
+            feats, feats_lengths = pad_features(feats_list)
+            feats = feats.to(self.device)
+            feats_lengths = feats_lengths.to(self.device)
+
+            with stage(STAGE_ENCODER), inference_context(self.precision, self.device):
+                encoder_out, encoder_mask = self.model.encoder(feats, feats_lengths)[:2]
+            out_lens = encoder_mask.squeeze(1).sum(dim=1)
+            return [encoder_out[i, :int(out_lens[i])].float() for i in range(len(feats_list))]
+
+    def align_posteriors(
+        self,
+        ctc_probs: torch.Tensor,
+        text: str,
+        num_samples: int,
+        span: Optional[TrimSpan] = None,
+        cache_reference: bool = True,
+    ) -> AlignmentResult:
+        """在 [T, V] 的 CTC 对数后验上做强制对齐并构建词/音素结果
+
+        span 为首尾静音裁剪的保留区间时，时间戳平移回原始时间轴。
+        cache_reference=False 时参考文本不进入 LRU（如长音频的分段子文本）。
+        """
+        # 参考文本的分词、扩展标签、词边界与音素按文本缓存，请求路径直接进入 DP
+        ref = self.get_reference(text, cache_reference)
+
+        # 使用CTC对齐（使用 T=时间帧数 进行归一化）
+        alignments = self._align_tokens(
+            ctc_probs, ref.token_ids, ref.token_pieces, ref.ext_labels, ref.skip_mask
+        )
+        return self._alignment_result(ref, alignments, num_samples, span)
+
+    def align_hidden(
+        self,
+        hidden: torch.Tensor,
+        text: str,
+        num_samples: int,
+        span: Optional[TrimSpan] = None,
+        cache_reference: bool = True,
+    ) -> AlignmentResult:
+        """在 encoder 隐状态上只计算参考文本所需标签列的 CTC 后验，再做强制对齐"""
+        ref = self.get_reference(text, cache_reference)
+        weight, bias = ctc_projection(self.model.ctc)
+        # [T, K]：列顺序为 ref.label_ids，标签已映射为子集下标
+        with stage(STAGE_CTC):
+            sub_probs = restricted_log_posteriors(hidden, weight, bias, ref.label_ids)
+        alignments = self._align_tokens(
+            sub_probs, ref.local_token_ids, ref.token_pieces, ref.local_ext_labels, ref.skip_mask,
+            token_ids=ref.token_ids,
+        )
+        return self._alignment_result(ref, alignments, num_samples, span)
+
+    def _alignment_result(
+        self, ref: CompiledReference, alignments: Dict[str, Any], num_samples: int, span: Optional[TrimSpan] = None
+    ) -> AlignmentResult:
+        # 构建结果
+        total_duration_s = max(0.0, float(num_samples) / 16000.0)
+        with stage(STAGE_SEGMENTATION):
+            words = self._build_word_segments(
+                ref.words, ref.word_token_groups, ref.word_phonemes,
+                alignments['alignments'], total_duration_s,
+                offset_s=span.offset_s if span is not None else 0.0,
             )
+        duration = span.duration_s if span is not None else total_duration_s  # 转换为秒
 
-            # 构建结果
-            total_duration_s = max(0.0, float(original_num_samples) / 16000.0)
-            words = self._build_word_segments_from_ctc(text, alignments, total_duration_s)
-            duration = total_duration_s  # 转换为秒
+        return AlignmentResult(
+            words=words,
+            duration=duration,
+            raw_confidence=alignments['confidences'],
+            trimmed_duration=span.trimmed_s if span is not None else 0.0,
+        )
 
-            return AlignmentResult(
-                words=words,
-                duration=duration,
-                raw_confidence=alignments['confidences']
-            )
+    def get_phoneme_alignments(self, waveform: torch.Tensor, text: str) -> AlignmentResult:
+        """使用 WeNet 获取音素对齐"""
+        self._check_ready()
 
+        span = speech_span(waveform, TrimConfig.from_env())
+        feats = self.compute_features(waveform[..., span.start:span.end])
+
+        from .longform import LongformConfig, align_longform
+        config = LongformConfig.from_env()
+        if config.applies(span.num_samples):
+            # 长音频：按静音切分后每次前向 batch_size 个片段
+            def infer_many(feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+                outputs = []
+                for i in range(0, len(feats_list), config.batch_size):
+                    outputs.extend(self.forward_ctc(feats_list[i:i + config.batch_size]))
+                return outputs
+
+            return align_longform(self, feats, text, span.num_samples, infer_many, False, config, span)
+
+        ctc_probs = self.forward_ctc([feats])[0]
+        return self.align_posteriors(ctc_probs, text, span.num_samples, span)
 
     def _simple_phonemize(self, word: str) -> List[str]:
         """简单的音素化"""
@@ -366,30 +633,26 @@ class WeNetAlignment:
         """
         text = text.strip()
         # SentencePiece 路径
-        if self.spm is not None and isinstance(self.char_dict, dict):
-            # WeNet Librispeech 模型词表为大写子词，统一为大写以避免 <unk>
-            pieces = self.spm.EncodeAsPieces(text.upper())
-            ids: List[int] = []
-            unk_id = self.char_dict.get('<unk>', 1)
-            for p in pieces:
-                if p.startswith('▁'):
-                    up = '▁' + p[1:].upper()
-                else:
-                    up = p.upper()
-                token_id = self.char_dict.get(up, unk_id)
-                ids.append(token_id)
-            return ids
+        if self.spm is not None:
+            return self.vocab.encode_sentencepiece(self.spm.EncodeAsPieces(text.upper()))
 
         # 回退：字符级，并将空格映射到 ▁ 若存在
-        space_token = '▁' if '▁' in self.char_dict else ' '
-        tokens = []
-        for char in text.lower():
-            ch = space_token if char == ' ' else char
-            if ch in self.char_dict:
-                tokens.append(self.char_dict[ch])
-            else:
-                tokens.append(self.char_dict.get('<unk>', 1))
-        return tokens
+        return self.vocab.encode_chars(text)
+
+    def _compile_reference(self, text: str) -> CompiledReference:
+        """编译参考文本：分词、扩展标签、skip 掩码、词边界与音素"""
+        token_ids = self._text_to_tokens(text)
+        # 仅在参考缓存未命中时发生，耗时主要来自词典外单词的 G2P
+        with stage(STAGE_G2P):
+            return compile_reference(
+                text, token_ids, self.vocab.decode(token_ids), self._word_to_ipa_list, self.vocab.blank_id
+            )
+
+    def get_reference(self, text: str, cache: bool = True) -> CompiledReference:
+        """从 LRU 获取编译后的参考文本（未命中时编译并缓存）；cache=False 时直接编译，不读写 LRU"""
+        if not cache:
+            return self._compile_reference(text)
+        return self.references.get_or_compile(text, self._compile_reference)
 
     def _compute_ctc_alignments(self, ctc_probs: torch.Tensor, text_tokens: List[int], seq_length: int) -> Dict[str, Any]:
         """使用 CTC Viterbi 强制对齐，返回每个目标 token 的时间与置信度。
@@ -402,74 +665,33 @@ class WeNetAlignment:
         - alignments: 每个目标 token 的起止时间（0~1 归一化）与平均概率。
         - confidences: 概率列表。
         """
-        T, V = ctc_probs.shape
-        if T <= 0 or not text_tokens:
+        blank_id = self.vocab.blank_id
+        ext = build_extended_labels(text_tokens, blank_id)
+        return self._align_tokens(
+            ctc_probs, text_tokens, self.vocab.decode(text_tokens), ext, build_skip_mask(ext, blank_id)
+        )
+
+    def _align_tokens(
+        self,
+        ctc_probs: torch.Tensor,
+        labels: List[int],
+        token_pieces: List[str],
+        ext: np.ndarray,
+        skip_mask: np.ndarray,
+        token_ids: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """在预先构建的扩展标签上做 Viterbi，并汇总每个 token 的时间与置信度
+
+        labels 为 ctc_probs 的列下标；若 ctc_probs 只包含标签子集，token_ids 给出对应的全局 id。
+        """
+        T = ctc_probs.shape[0]
+        if T <= 0 or not labels:
             return {'alignments': [], 'confidences': []}
 
-        blank_id = 0
-
-        # 构造扩展标签序列（在 token 之间插入 blank，并两端加 blank）
-        labels = text_tokens
-        ext: List[int] = []
-        for i, lid in enumerate(labels):
-            ext.append(blank_id)
-            ext.append(lid)
-        ext.append(blank_id)
-        S = len(ext)
-
-        # DP 与回溯：Viterbi 最大路径
-        neg_inf = -1e10
-        dp = torch.full((T, S), neg_inf, dtype=ctc_probs.dtype, device=ctc_probs.device)
-        bp = torch.full((T, S), -1, dtype=torch.long, device=ctc_probs.device)  # 0:stay,1:prev,2:skip
-
-        # 初始化 t=0
-        dp[0, 0] = ctc_probs[0, ext[0]]
-        if S > 1:
-            dp[0, 1] = ctc_probs[0, ext[1]]
-            bp[0, 1] = 1
-
-        # 迭代
-        for t in range(1, T):
-            for s in range(S):
-                emit = ctc_probs[t, ext[s]]
-                # 来自 s（保持）
-                best = dp[t-1, s]
-                arg = 0
-                # 来自 s-1
-                if s-1 >= 0:
-                    v = dp[t-1, s-1]
-                    if v > best:
-                        best = v
-                        arg = 1
-                # 来自 s-2（若非重复同音且非 blank）
-                if s-2 >= 0 and ext[s] != blank_id and ext[s] != ext[s-2]:
-                    v = dp[t-1, s-2]
-                    if v > best:
-                        best = v
-                        arg = 2
-                dp[t, s] = best + emit
-                bp[t, s] = arg
-
-        # 结束状态：S-1 或 S-2 中较大者
-        last_s = S-1
-        alt_s = S-2 if S-2 >= 0 else S-1
-        if dp[T-1, alt_s] > dp[T-1, last_s]:
-            last_s = alt_s
-
-        # 回溯逐帧状态
-        path_states = [last_s]
-        cur_s = last_s
-        for t in range(T-1, 0, -1):
-            move = int(bp[t, cur_s].item())
-            if move == 0:
-                prev_s = cur_s
-            elif move == 1:
-                prev_s = cur_s - 1
-            else:
-                prev_s = cur_s - 2
-            path_states.append(prev_s)
-            cur_s = prev_s
-        path_states.reverse()  # 长度 T
+        # 向量化 Viterbi：每帧对全部扩展标签状态一次性计算 stay/prev/skip 转移
+        log_probs = ctc_probs.detach().cpu().numpy()
+        with stage(STAGE_VITERBI):
+            path_states = ctc_viterbi_path_ext(log_probs, ext, skip_mask)  # 长度 T
 
         # 将逐帧状态映射到目标 token（奇数位为真实 token，偶数位为 blank）
         # 汇总每个 token 的起止帧与均值概率
@@ -480,12 +702,6 @@ class WeNetAlignment:
                 if 0 <= j < len(labels):
                     token_to_frames[j].append(t)
 
-        def id_to_char(token_id: int) -> Optional[str]:
-            for ch, cid in self.char_dict.items():
-                if cid == token_id:
-                    return ch
-            return None
-
         time_per_frame = 1.0 / max(1, T)
         alignments: List[Dict[str, Any]] = []
         confidences: List[float] = []
@@ -500,10 +716,9 @@ class WeNetAlignment:
             start_t = start_idx * time_per_frame
             end_t = max(start_t + time_per_frame, end_idx * time_per_frame)
             conf = torch.clamp(torch.exp(ctc_probs[start_idx:end_idx, labels[j]]).mean(), 0.0, 1.0).item()
-            token_char = id_to_char(labels[j]) or ''
             alignments.append({
-                'token': token_char,
-                'token_id': labels[j],
+                'token': token_pieces[j],
+                'token_id': token_ids[j] if token_ids is not None else labels[j],
                 'start': start_t,
                 'end': end_t,
                 'confidence': conf
@@ -512,54 +727,50 @@ class WeNetAlignment:
 
         return {'alignments': alignments, 'confidences': confidences}
 
-    def _build_word_segments_from_ctc(self, text: str, alignments: Dict[str, Any], total_duration: float) -> List[WordSegment]:
+    def _build_word_segments_from_ctc(
+        self, text: str, alignments: Dict[str, Any], total_duration: float, offset_s: float = 0.0
+    ) -> List[WordSegment]:
         """从 CTC 对齐构建词级分段，兼容 SentencePiece 子词。
         逻辑：
         - 按照对齐 token 顺序，将以 '▁' 开头的 token 视为新词起点。
         - 与 text.split() 的词数进行对齐，超出部分合并到最后一个词。
         - 对每个词内的 token，按时长均衡到 IPA 音素个数。
+        - total_duration 为送入 encoder 的（裁剪后）时长，offset_s 为裁剪起点，
+          所有时间戳加上 offset_s 回到原始时间轴。
         """
         words = text.strip().split()
         a_list = alignments.get('alignments', [])
         if not words or not a_list:
             return []
-
-        # 将 token 对齐分组为词
-        groups: List[List[Dict[str, Any]]] = []
-        current: List[Dict[str, Any]] = []
-        for idx, a in enumerate(a_list):
-            token_str = str(a.get('token', ''))
-            if token_str.startswith('▁') and current:
-                groups.append(current)
-                current = []
-            current.append(a)
-        if current:
-            groups.append(current)
-
-        # 调整分组数量与 words 数量一致
-        if len(groups) < len(words):
-            # 不足则将最后一组重复为空以占位
-            while len(groups) < len(words):
-                groups.append([])
-        elif len(groups) > len(words):
-            # 过多则将多余分组合并到最后一组
-            rest = []
-            for g in groups[len(words)-1:]:
-                rest.extend(g)
-            groups = groups[:len(words)-1] + [rest]
+        groups = group_tokens_by_word([str(a.get('token', '')) for a in a_list], len(words))
+        phonemes = [self._word_to_ipa_list(w) if groups[i] else [] for i, w in enumerate(words)]
+        return self._build_word_segments(words, groups, phonemes, a_list, total_duration, offset_s)
+
+    def _build_word_segments(
+        self,
+        words: List[str],
+        groups: List[List[int]],
+        word_phonemes: List[List[str]],
+        a_list: List[Dict[str, Any]],
+        total_duration: float,
+        offset_s: float = 0.0,
+    ) -> List[WordSegment]:
+        """按预先确定的词分组与音素，把 token 对齐转换为词/音素分段"""
+        if not words or not a_list:
+            return []
 
         word_segments: List[WordSegment] = []
 
         for w_idx, word in enumerate(words):
-            toks = groups[w_idx] if w_idx < len(groups) else []
+            toks = [a_list[i] for i in groups[w_idx]] if w_idx < len(groups) else []
             if not toks:
                 continue
             word_start_rel = min(t['start'] for t in toks)
             word_end_rel = max(t['end'] for t in toks)
-            word_start = word_start_rel * total_duration
-            word_end = word_end_rel * total_duration
+            word_start = word_start_rel * total_duration + offset_s
+            word_end = word_end_rel * total_duration + offset_s
 
-            ipa_phones = self._word_to_ipa_list(word)
+            ipa_phones = word_phonemes[w_idx]
             if not ipa_phones:
                 ipa_phones = [t.get('token', '') for t in toks]
 
@@ -587,7 +798,7 @@ class WeNetAlignment:
                 last = bins.pop()
                 bins[-1].extend(last)
 
-            word_phonemes: List[PhonemeSegment] = []
+            phoneme_segments: List[PhonemeSegment] = []
             for p_idx, phone in enumerate(ipa_phones):
                 tok_ids = bins[p_idx] if p_idx < len(bins) else []
                 if not tok_ids:
@@ -597,12 +808,12 @@ class WeNetAlignment:
                 else:
                     start_rel = min(toks[i]['start'] for i in tok_ids)
                     end_rel = max(toks[i]['end'] for i in tok_ids)
-                    start_t = start_rel * total_duration
-                    end_t = end_rel * total_duration
+                    start_t = start_rel * total_duration + offset_s
+                    end_t = end_rel * total_duration + offset_s
                     conf_vals = [float(toks[i]['confidence']) for i in tok_ids]
                     conf = float(sum(conf_vals) / max(1, len(conf_vals)))
 
-                word_phonemes.append(PhonemeSegment(
+                phoneme_segments.append(PhonemeSegment(
                     phoneme=phone,
                     start=start_t,
                     end=end_t,
@@ -613,85 +824,26 @@ class WeNetAlignment:
                 word=word,
                 start=word_start,
                 end=word_end,
-                phonemes=word_phonemes
+                phonemes=phoneme_segments
             ))
 
         return word_segments
 
     # ---------------------- G2P & IPA helpers ----------------------
     def _ensure_g2p(self):
-        if self.g2p is None:
-            try:
-                from g2p_en import G2p  # type: ignore
-                self.g2p = G2p()
-            except Exception as e:
-                logger.warning(f"g2p_en not available: {e}")
-                self.g2p = None
+        self.g2p.ensure_loaded()
 
     def _load_cmvn(self, path: str) -> Tuple[torch.Tensor, torch.Tensor]:
         """加载 WeNet global_cmvn，返回 mean 和 istd（形状 [80]）。"""
-        with open(path, 'r') as f:
-            obj = json.load(f)
-        mean_stat = np.asarray(obj['mean_stat'], dtype=np.float64)
-        var_stat = np.asarray(obj['var_stat'], dtype=np.float64)
-        frame_num = float(obj['frame_num'])
-        mean = mean_stat / max(1.0, frame_num)
-        var = var_stat / max(1.0, frame_num) - mean * mean
-        var = np.maximum(var, 1e-10)
-        istd = 1.0 / np.sqrt(var)
-        mean_t = torch.from_numpy(mean.astype(np.float32))
-        istd_t = torch.from_numpy(istd.astype(np.float32))
-        return mean_t, istd_t
+        return cmvn_from_json(path)
 
     def _word_to_ipa_list(self, word: str) -> List[str]:
-        """使用 g2p_en 生成 ARPABET 并映射为 IPA。返回 IPA 字符串列表。"""
-        self._ensure_g2p()
-        if self.g2p is None:
-            # Fallback：简单字符到 IPA（相较于之前的占位，提供更合理的默认）
-            simple_map = {
-                'a': 'æ', 'e': 'ɛ', 'i': 'ɪ', 'o': 'oʊ', 'u': 'ʊ',
-                'b': 'b', 'c': 'k', 'd': 'd', 'f': 'f', 'g': 'ɡ', 'h': 'h',
-                'j': 'dʒ', 'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n', 'p': 'p',
-                'q': 'k', 'r': 'ɹ', 's': 's', 't': 't', 'v': 'v', 'w': 'w',
-                'x': 'ks', 'y': 'j', 'z': 'z'
-            }
-            return [simple_map.get(ch, ch) for ch in word.lower() if ch.isalpha()]
-        try:
-            arp_tokens = [t for t in self.g2p(word) if t.strip()]
-        except Exception as e:
-            logger.warning(f"g2p_en inference failed for '{word}': {e}. Falling back to simple IPA mapping.")
-            simple_map = {
-                'a': 'æ', 'e': 'ɛ', 'i': 'ɪ', 'o': 'oʊ', 'u': 'ʊ',
-                'b': 'b', 'c': 'k', 'd': 'd', 'f': 'f', 'g': 'ɡ', 'h': 'h',
-                'j': 'dʒ', 'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n', 'p': 'p',
-                'q': 'k', 'r': 'ɹ', 's': 's', 't': 't', 'v': 'v', 'w': 'w',
-                'x': 'ks', 'y': 'j', 'z': 'z'
-            }
-            return [simple_map.get(ch, ch) for ch in word.lower() if ch.isalpha()]
-        # 过滤非音素（例如空格、标点）
-        arp_phones = [t for t in arp_tokens if t[0].isalpha()]
-        return [self._arpabet_to_ipa(p) for p in arp_phones]
+        """查发音词典获取 IPA 列表：LRU → 磁盘词典 → g2p_en（仅词典外的词）。"""
+        return list(self.lexicon.lookup(word))
 
     def _arpabet_to_ipa(self, phone: str) -> str:
         """简易 ARPABET→IPA 映射，去除重音数字。"""
-        base = ''.join([c for c in phone if not c.isdigit()]).upper()
-        mapping = {
-            # consonants
-            'P': 'p', 'B': 'b', 'T': 't', 'D': 'd', 'K': 'k', 'G': 'ɡ',
-            'CH': 'tʃ', 'JH': 'dʒ', 'F': 'f', 'V': 'v', 'TH': 'θ', 'DH': 'ð',
-            'S': 's', 'Z': 'z', 'SH': 'ʃ', 'ZH': 'ʒ', 'HH': 'h', 'M': 'm',
-            'N': 'n', 'NG': 'ŋ', 'L': 'l', 'R': 'ɹ', 'Y': 'j', 'W': 'w',
-            # vowels (monophthongs/diphthongs)
-            'IY': 'i', 'IH': 'ɪ', 'EH': 'ɛ', 'AE': 'æ', 'AA': 'ɑ', 'AH': 'ʌ',
-            'AO': 'ɔ', 'UH': 'ʊ', 'UW': 'u', 'ER': 'ɝ', 'AX': 'ə',
-            'EY': 'eɪ', 'AY': 'aɪ', 'OW': 'oʊ', 'AW': 'aʊ', 'OY': 'ɔɪ',
-            # schwa-like
-            'AXR': 'ɚ', 'IX': 'ɨ',
-        }
-        # context-free adjustment: unstressed AH often → ə
-        if base == 'AH' and any(ch.isdigit() and ch == '0' for ch in phone):
-            return 'ə'
-        return mapping.get(base, base.lower())
+        return arpabet_to_ipa(phone)
 
     def _char_to_phoneme(self, char: str) -> str:
         """将字符转换为音素"""
@@ -707,16 +859,49 @@ class WeNetAlignment:
         return phoneme_map.get(char.lower(), char.upper())
 
 
-def run_wenet_alignment(wav_path: str, text: str, language: str = "en-US") -> AlignmentResult:
-    """运行 WeNet 对齐 - 只使用WeNet，不提供回退"""
-    # 初始化 WeNet 对齐器
-    aligner = WeNetAlignment()
+def run_wenet_alignment(
+    audio: Union[str, bytes, bytearray, memoryview, np.ndarray],
+    text: str,
+    language: str = "en-US",
+    sample_rate: Optional[int] = None,
+) -> AlignmentResult:
+    """运行 WeNet 对齐 - 只使用WeNet，不提供回退
 
-    # 预处理音频
-    waveform = aligner.preprocess_audio(wav_path)
+    audio 可以是 WAV 文件路径、内存中的音频字节，或已解码的数组（此时需给出 sample_rate）。
+    """
+    from .registry import get_registry
 
-    # 获取对齐结果 - 只使用WeNet
-    result = aligner.get_phoneme_alignments(waveform, text)
+    # 使用进程级共享的 WeNet 对齐器（启动时加载一次）
+    aligner = get_registry().get_aligner()
+
+    # 预处理音频
+    waveform = aligner.preprocess_audio(audio, sample_rate)
+
+    # 获取对齐结果 - 只使用WeNet；编码器前向（torch 或 ONNX 后端）经由微批处理与并发请求合并
+    backend = get_registry().get_backend()
+    backend.check_ready()
+    # 首尾静音不进入 fbank / encoder，时间戳在构建结果时平移回原始时间轴
+    span = speech_span(waveform, TrimConfig.from_env())
+    feats = aligner.compute_features(waveform[..., span.start:span.end])
+    batcher = get_registry().get_batcher()
+    num_samples = span.num_samples
+
+    from .longform import LongformConfig, align_longform
+    config = LongformConfig.from_env()
+    if config.applies(num_samples):
+        # 长音频：各片段同时提交，由微批处理合并为批量前向
+        result = align_longform(
+            aligner, feats, text, num_samples, batcher.infer_many, backend.outputs_hidden, config, span
+        )
+        logger.info(f"Using WeNet model for long-form alignment ({num_samples / 16000.0:.1f}s)")
+        return result
+
+    output = batcher.infer(feats)
+    if backend.outputs_hidden:
+        # 受限词表：只为参考文本用到的标签计算 CTC 后验
+        result = aligner.align_hidden(output, text, num_samples, span)
+    else:
+        result = aligner.align_posteriors(output, text, num_samples, span)
 
     # 记录使用WeNet模型
     logger.info("Using WeNet model for alignment")
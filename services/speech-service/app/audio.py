@@ -0,0 +1,203 @@
+"""
+内存音频解码
+
+上传内容直接在内存中解码，不再写入临时目录再由 torchaudio.load 读回：
+- 按文件头魔数（而非文件名）识别 WAV / FLAC / Ogg（Opus、Vorbis）/ MP3；
+- PCM / IEEE float 的 WAV 由 RIFF 头解析后，用 np.frombuffer 得到指向上传缓冲区
+  的零拷贝视图；
+- 其它 WAV 编码与压缩格式交给 soundfile（libsndfile）从内存解码，失败时再尝试
+  torchaudio 从内存解码；
+- WAV 仍无法解码时回退到临时文件 + torchaudio.load。
+"""
+import io
+import os
+import shutil
+import struct
+import tempfile
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# 上传大小上限（字节），与 config/env.example 中的 MAX_AUDIO_SIZE 一致
+DEFAULT_MAX_AUDIO_SIZE = 10 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+FORMAT_WAV = "wav"
+FORMAT_FLAC = "flac"
+FORMAT_OGG = "ogg"
+FORMAT_MP3 = "mp3"
+SUPPORTED_FORMATS = (FORMAT_WAV, FORMAT_FLAC, FORMAT_OGG, FORMAT_MP3)
+
+
+class AudioDecodeError(ValueError):
+    """音频无法解码"""
+
+
+class AudioTooLarge(ValueError):
+    """上传音频超过大小上限"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"audio exceeds the {limit} byte limit")
+        self.limit = limit
+
+
+def max_audio_size() -> int:
+    return int(os.getenv("MAX_AUDIO_SIZE", str(DEFAULT_MAX_AUDIO_SIZE)))
+
+
+async def read_upload_limited(upload, limit: int) -> bytearray:
+    """分块读取上传文件，超过 limit 字节时立即中止。"""
+    buf = bytearray()
+    while True:
+        chunk = await upload.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return buf
+        if len(buf) + len(chunk) > limit:
+            raise AudioTooLarge(limit)
+        buf += chunk
+
+
+def detect_format(data: BytesLike) -> Optional[str]:
+    """按文件头魔数识别音频格式，无法识别时返回 None"""
+    head = bytes(memoryview(data)[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return FORMAT_WAV
+    if head[:4] == b"fLaC":
+        return FORMAT_FLAC
+    if head[:4] == b"OggS":
+        return FORMAT_OGG
+    if head[:3] == b"ID3":
+        return FORMAT_MP3
+    # MPEG 音频帧同步字：11 个 1，且 layer 位不为 0（排除 AAC ADTS）
+    if len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0 and (head[1] & 0x06) != 0:
+        return FORMAT_MP3
+    return None
+
+
+def _parse_wav_header(view: memoryview) -> Tuple[int, int, int, int, int, int]:
+    """解析 RIFF/WAVE 头，返回 (format_tag, channels, sample_rate, bits, data_offset, data_size)。"""
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        raise AudioDecodeError("not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16:
+                raise AudioDecodeError("invalid fmt chunk")
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # WAVEFORMATEXTENSIBLE：SubFormat GUID 的前两个字节即实际格式
+                (format_tag,) = struct.unpack_from("<H", view, body + 24)
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioDecodeError("data chunk before fmt chunk")
+            # 流式录音常把 data 大小写成 0 或 0xFFFFFFFF，按实际长度截断
+            data_size = min(chunk_size, len(view) - body)
+            return fmt[0], fmt[1], fmt[2], fmt[3], body, data_size
+        # RIFF 块按偶数字节对齐
+        pos = body + chunk_size + (chunk_size & 1)
+    raise AudioDecodeError("missing data chunk")
+
+
+def decode_wav_pcm(data: BytesLike) -> Tuple[np.ndarray, int]:
+    """从内存解码 PCM/float WAV。
+
+    返回 ([channels, samples] 的 float32 数组, 采样率)，归一化方式与 torchaudio.load 一致。
+    """
+    view = memoryview(data).cast("B")
+    format_tag, channels, sample_rate, bits, offset, size = _parse_wav_header(view)
+    if channels <= 0:
+        raise AudioDecodeError("invalid channel count")
+
+    if format_tag == _WAVE_FORMAT_PCM and bits == 16:
+        dtype, scale, bias = np.dtype("<i2"), 1.0 / 32768.0, 0.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 32:
+        dtype, scale, bias = np.dtype("<i4"), 1.0 / 2147483648.0, 0.0
+    elif format_tag == _WAVE_FORMAT_PCM and bits == 8:
+        dtype, scale, bias = np.dtype("u1"), 1.0 / 128.0, -128.0
+    elif format_tag == _WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype, scale, bias = np.dtype("<f4"), None, 0.0
+    else:
+        raise AudioDecodeError(f"unsupported WAV encoding (format {format_tag}, {bits} bit)")
+
+    frame_bytes = dtype.itemsize * channels
+    num_frames = size // frame_bytes
+    # 零拷贝视图：直接指向上传缓冲区中的 PCM 数据
+    pcm = np.frombuffer(view, dtype=dtype, count=num_frames * channels, offset=offset)
+    pcm = pcm.reshape(num_frames, channels).T
+
+    if scale is None:
+        samples = pcm.astype(np.float32, copy=not pcm.flags.writeable)
+    else:
+        samples = pcm.astype(np.float32)
+        if bias:
+            samples += bias
+        samples *= scale
+    return samples, sample_rate
+
+
+def _decode_with_soundfile(data: BytesLike) -> Tuple[np.ndarray, int]:
+    import soundfile as sf
+
+    samples, sample_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return np.ascontiguousarray(samples.T), int(sample_rate)
+
+
+def _decode_with_torchaudio(data: BytesLike, fmt: str) -> Tuple[np.ndarray, int]:
+    """由 torchaudio 从内存解码（依赖其可用的解码后端）"""
+    import torchaudio
+
+    waveform, sample_rate = torchaudio.load(io.BytesIO(bytes(data)), format=fmt)
+    return waveform.numpy(), int(sample_rate)
+
+
+def _decode_via_disk(data: BytesLike) -> Tuple[np.ndarray, int]:
+    """回退：写入临时文件后由 torchaudio 解码。"""
+    import torchaudio
+
+    session_dir = tempfile.mkdtemp(prefix="sylis_speech_")
+    path = os.path.join(session_dir, "audio.wav")
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+        waveform, sample_rate = torchaudio.load(path)
+        return waveform.numpy(), int(sample_rate)
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def decode_audio_bytes(data: BytesLike) -> Tuple[np.ndarray, int]:
+    """将内存中的音频解码为 ([channels, samples] float32, 采样率)。"""
+    fmt = detect_format(data)
+    if fmt is None:
+        raise AudioDecodeError(f"unsupported audio format (expected one of {', '.join(SUPPORTED_FORMATS)})")
+
+    if fmt == FORMAT_WAV:
+        try:
+            return decode_wav_pcm(data)
+        except AudioDecodeError:
+            pass
+    try:
+        return _decode_with_soundfile(data)
+    except Exception as e:
+        error = e
+    if fmt != FORMAT_WAV:
+        try:
+            return _decode_with_torchaudio(data, fmt)
+        except Exception:
+            raise AudioDecodeError(f"failed to decode {fmt} audio: {error}") from error
+    try:
+        return _decode_via_disk(data)
+    except Exception as e:
+        raise AudioDecodeError(f"failed to decode audio: {e}") from e
@@ -0,0 +1,164 @@
+"""
+编码器推理后端
+
+对齐只需要 encoder + CTC 头输出的 [T, V] 对数后验。后端负责这一步：
+- torch（默认）：WeNetAlignment 中的 PyTorch ASRModel；
+- onnx：scripts/export_onnx.py 导出的 encoder+CTC 图，由 onnxruntime 在 CPU 上执行。
+
+特征提取（fbank + CMVN）、分词与 Viterbi 对齐对两种后端完全相同。
+通过 WENET_BACKEND=torch|onnx 选择，ONNX 模型路径由 WENET_ONNX_PATH 指定。
+
+forward() 是微批处理调用的入口：outputs_hidden 为 True 时返回 encoder 隐状态，
+由各请求按参考文本的标签子集计算 CTC 后验（见 ctc_head.py），否则返回完整的对数后验。
+"""
+import inspect
+import logging
+import os
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .batching import pad_features
+from .ctc_head import CTC_RESTRICTED, ctc_posteriors_mode
+from .metrics import STAGE_ENCODER
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+ONNX_INPUT_NAMES = ["feats", "feats_lengths"]
+ONNX_OUTPUT_NAMES = ["ctc_log_probs", "ctc_lengths"]
+DEFAULT_OPSET = 17
+
+
+def backend_kind() -> str:
+    return os.getenv("WENET_BACKEND", "torch").lower()
+
+
+def default_onnx_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("WENET_ONNX_PATH", os.path.join(project_root, "models", "encoder_ctc.onnx"))
+
+
+class EncoderCTC(torch.nn.Module):
+    """encoder + CTC 头，输出对数后验与有效帧数（用于 ONNX 导出）"""
+
+    def __init__(self, encoder: torch.nn.Module, ctc: torch.nn.Module):
+        super().__init__()
+        self.encoder = encoder
+        self.ctc = ctc
+
+    def forward(self, feats: torch.Tensor, feats_lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        encoder_out, encoder_mask = self.encoder(feats, feats_lengths)[:2]
+        log_probs = self.ctc.log_softmax(encoder_out)
+        # mask: [B, 1, T']
+        out_lens = encoder_mask.squeeze(1).sum(dim=1).to(torch.int64)
+        return log_probs, out_lens
+
+
+def export_encoder_ctc(
+    encoder: torch.nn.Module,
+    ctc: torch.nn.Module,
+    output_path: str,
+    feat_dim: int = 80,
+    opset: int = DEFAULT_OPSET,
+) -> str:
+    """将 encoder + CTC 导出为 batch 与时间轴均为动态维度的 ONNX 图"""
+    model = EncoderCTC(encoder, ctc).eval()
+    dummy_feats = torch.randn(1, 200, feat_dim)
+    dummy_lengths = torch.tensor([200], dtype=torch.int64)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # 新版 torch 默认使用 dynamo 导出，这里固定使用 TorchScript 导出器
+        kwargs["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy_feats, dummy_lengths),
+            output_path,
+            input_names=ONNX_INPUT_NAMES,
+            output_names=ONNX_OUTPUT_NAMES,
+            dynamic_axes={
+                "feats": {0: "batch", 1: "time"},
+                "feats_lengths": {0: "batch"},
+                "ctc_log_probs": {0: "batch", 1: "frames"},
+                "ctc_lengths": {0: "batch"},
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+            **kwargs,
+        )
+    return output_path
+
+
+class TorchBackend:
+    """PyTorch eager 后端，直接使用对齐器加载的 ASRModel"""
+
+    name = "torch"
+
+    def __init__(self, aligner: Any, restricted: bool = False):
+        self.aligner = aligner
+        self.outputs_hidden = restricted
+
+    def check_ready(self) -> None:
+        self.aligner._check_ready()
+
+    def forward(self, feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+        if self.outputs_hidden:
+            return self.aligner.forward_encoder(feats_list)
+        return self.aligner.forward_ctc(feats_list)
+
+    def forward_ctc(self, feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+        return self.aligner.forward_ctc(feats_list)
+
+
+class OnnxBackend:
+    """onnxruntime CPU 后端"""
+
+    name = "onnx"
+    # 导出的图已包含 CTC log_softmax
+    outputs_hidden = False
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import onnxruntime as ort
+
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"ONNX model not found at {model_path}, run scripts/export_onnx.py first")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        logger.info(f"Loaded ONNX encoder+CTC: {model_path}")
+
+    def check_ready(self) -> None:
+        pass
+
+    def forward_ctc(self, feats_list: List[torch.Tensor]) -> List[torch.Tensor]:
+        feats, feats_lengths = pad_features(feats_list)
+        # 导出图中 encoder 与 CTC log_softmax 融合，整体计入 encoder 阶段
+        with stage(STAGE_ENCODER):
+            log_probs, out_lens = self.session.run(
+                ONNX_OUTPUT_NAMES,
+                {
+                    "feats": feats.numpy().astype(np.float32, copy=False),
+                    "feats_lengths": feats_lengths.numpy().astype(np.int64, copy=False),
+                },
+            )
+        return [torch.from_numpy(log_probs[i, :int(out_lens[i])]) for i in range(len(feats_list))]
+
+    forward = forward_ctc
+
+
+def create_backend(aligner: Any, kind: Optional[str] = None) -> Any:
+    """按 WENET_BACKEND 创建推理后端"""
+    kind = kind or backend_kind()
+    if kind == "onnx":
+        from .executor import ExecutorConfig
+
+        return OnnxBackend(default_onnx_path(), ExecutorConfig.from_env().threads_per_worker())
+    if kind != "torch":
+        raise ValueError(f"unknown WENET_BACKEND: {kind}")
+    return TorchBackend(aligner, restricted=ctc_posteriors_mode() == CTC_RESTRICTED)
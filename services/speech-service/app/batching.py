@@ -0,0 +1,198 @@
+"""
+编码器动态微批处理
+
+并发请求先各自完成 fbank 特征提取，然后把特征提交给 EncoderBatcher。
+后台线程在一个可配置的时间窗口内（最大批大小 / 最大等待毫秒）收集请求，
+按长度分桶后填充成一个 batch，执行一次 encoder + ctc.log_softmax 前向，
+再把每条语音的后验概率拆分回各自的调用方用于对齐。
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from .timing import StageTimer, current_timer, record_into
+
+logger = logging.getLogger(__name__)
+
+# forward_fn: 接收一组 [frames, feat_dim] 特征，返回每条对应的 [T, V] CTC 对数后验
+BatchForwardFn = Callable[[List[torch.Tensor]], List[torch.Tensor]]
+
+
+def pad_features(feats_list: List[torch.Tensor], pad_value: float = 0.0) -> Tuple[torch.Tensor, torch.Tensor]:
+    """将若干 [frames, feat_dim] 特征填充为 [B, max_frames, feat_dim]，并返回长度。"""
+    lengths = torch.tensor([int(f.shape[0]) for f in feats_list], dtype=torch.long)
+    padded = torch.nn.utils.rnn.pad_sequence(feats_list, batch_first=True, padding_value=pad_value)
+    return padded, lengths
+
+
+@dataclass
+class BatcherConfig:
+    max_batch_size: int = 8
+    max_wait_ms: float = 5.0
+    # 长度分桶粒度（fbank 帧数），同一桶内的语音一起填充，减少无效计算
+    bucket_frames: int = 200
+    # 调用方等待编码结果的超时（秒），0 表示不限
+    timeout_s: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "BatcherConfig":
+        return cls(
+            max_batch_size=max(1, int(os.getenv("WENET_BATCH_MAX_SIZE", "8"))),
+            max_wait_ms=max(0.0, float(os.getenv("WENET_BATCH_MAX_WAIT_MS", "5"))),
+            bucket_frames=max(1, int(os.getenv("WENET_BATCH_BUCKET_FRAMES", "200"))),
+            timeout_s=max(0.0, float(os.getenv("WENET_BATCH_TIMEOUT_S", "30"))),
+        )
+
+
+@dataclass
+class _Pending:
+    feats: torch.Tensor
+    future: Future = field(default_factory=Future)
+    # 提交方的请求计时器，批量前向的阶段耗时记回各请求
+    timer: Optional[StageTimer] = field(default_factory=current_timer)
+
+
+class EncoderBatcher:
+    """收集并发的编码请求，合并成批执行。"""
+
+    def __init__(self, forward_fn: BatchForwardFn, config: Optional[BatcherConfig] = None):
+        self._forward_fn = forward_fn
+        self.config = config or BatcherConfig()
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # 保证 close 之后不会再有请求进入队列
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self.batches_run = 0
+        self.items_run = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, feats: torch.Tensor) -> Future:
+        """提交一条特征，返回在对应后验就绪时完成的 Future。"""
+        pending = _Pending(feats=feats)
+        if self.config.max_batch_size <= 1:
+            if self._closed:
+                raise RuntimeError("EncoderBatcher is closed")
+            # 关闭批处理时直接在调用线程中执行
+            self._execute([pending])
+            return pending.future
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("EncoderBatcher is closed")
+            self._ensure_started()
+            self._queue.put(pending)
+        return pending.future
+
+    @property
+    def queue_depth(self) -> int:
+        """等待合批的请求数"""
+        return self._queue.qsize()
+
+    def infer(self, feats: torch.Tensor, timeout: Optional[float] = None) -> torch.Tensor:
+        """阻塞地获取一条特征的 CTC 对数后验 [T, V]。
+
+        timeout 为 None 时使用 config.timeout_s；超时抛出 TimeoutError。
+        """
+        return self.infer_many([feats], timeout)[0]
+
+    def infer_many(self, feats_list: List[torch.Tensor], timeout: Optional[float] = None) -> List[torch.Tensor]:
+        """同时提交多条特征（可合并为同一批），在共同的截止时间内等待全部结果。"""
+        timeout = self.config.timeout_s if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout > 0 else None
+        futures = [self.submit(f) for f in feats_list]
+        results = []
+        try:
+            for future in futures:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                results.append(future.result(timeout=remaining))
+        except FutureTimeoutError:
+            # 仍在排队的请求不再参与计算
+            for future in futures:
+                future.cancel()
+            raise TimeoutError(f"encoder batch did not complete within {timeout:.1f}s")
+        return results
+
+    def close(self) -> None:
+        """停止后台线程；尚未执行的请求以 RuntimeError 结束，不会让调用方一直等待。"""
+        with self._submit_lock:
+            self._closed = True
+        # 正在执行的批次照常完成，队列中的请求直接失败
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("EncoderBatcher is closed"))
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    # ---------------------- worker ----------------------
+    def _collect(self, first: _Pending) -> Tuple[List[_Pending], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.config.max_wait_ms / 1000.0
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _buckets(self, batch: List[_Pending]) -> List[List[_Pending]]:
+        groups: Dict[int, List[_Pending]] = {}
+        for item in batch:
+            key = int(item.feats.shape[0]) // self.config.bucket_frames
+            groups.setdefault(key, []).append(item)
+        return [groups[k] for k in sorted(groups)]
+
+    def _execute(self, items: List[_Pending]) -> None:
+        # 取消的请求（如客户端已断开）不再参与计算
+        items = [it for it in items if it.future.set_running_or_notify_cancel()]
+        if not items:
+            return
+        try:
+            with record_into([it.timer for it in items]):
+                outputs = self._forward_fn([it.feats for it in items])
+        except BaseException as e:
+            for it in items:
+                it.future.set_exception(e)
+            return
+        self.batches_run += 1
+        self.items_run += len(items)
+        for it, out in zip(items, outputs):
+            it.future.set_result(out)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            for bucket in self._buckets(batch):
+                self._execute(bucket)
+            if stop:
+                return
@@ -0,0 +1,225 @@
+"""
+预打包的模型包（bundle）
+
+下载的模型目录由多种格式组成（torch pickle 的 final.pt、units.txt、JSON 的 global_cmvn、
+SentencePiece 模型、YAML 配置），启动时需要分别解析。scripts/pack_model.py 把它们转换为一个带版本号的目录：
+
+- tensors.bin：所有张量按 64 字节对齐依次排列（encoder / CTC 权重、预计算的 CMVN mean/istd、
+  数组形式的词表、SentencePiece 模型的原始字节）；
+- manifest.json：格式版本、模型配置，以及每个张量的 dtype / shape / 偏移。
+
+加载时用 torch.UntypedStorage.from_file 对 tensors.bin 做私有只读映射，张量是映射上的视图，
+再经 load_state_dict(assign=True) 直接作为模型参数，不复制、不反序列化：加载只需毫秒级，
+且同一文件的页面在多个进程之间通过页缓存共享。assign=True 与 torch.load(mmap=True) 需要 torch >= 2.1。
+"""
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = "sylis-model-bundle"
+BUNDLE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+TENSORS_NAME = "tensors.bin"
+ALIGNMENT = 64
+
+MODEL_PREFIX = "model."
+CMVN_MEAN = "cmvn.mean"
+CMVN_ISTD = "cmvn.istd"
+VOCAB_IDS = "vocab.ids"
+VOCAB_OFFSETS = "vocab.offsets"
+VOCAB_BYTES = "vocab.bytes"
+SPM_MODEL = "spm.model"
+
+# 单独指定模型文件的环境变量：设置任一项时不自动使用 models/bundle
+FILE_OVERRIDE_VARS = (
+    "WENET_MODEL_PATH", "WENET_CONFIG_PATH", "WENET_DICT_PATH", "WENET_CMVN_PATH", "WENET_SPM_PATH",
+)
+
+
+def default_bundle_path() -> Optional[str]:
+    """WENET_BUNDLE_PATH；未设置且没有用 WENET_*_PATH 单独指定模型文件时，使用 models/bundle（存在时）"""
+    path = os.getenv("WENET_BUNDLE_PATH")
+    if path:
+        return path
+    if any(os.getenv(name) for name in FILE_OVERRIDE_VARS):
+        return None
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    candidate = os.path.join(project_root, "models", "bundle")
+    return candidate if os.path.exists(os.path.join(candidate, MANIFEST_NAME)) else None
+
+
+def read_units(path: str) -> Dict[str, int]:
+    """读取 WeNet units.txt（每行 "piece id"）"""
+    table: Dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) == 2:
+                table[parts[0]] = int(parts[1])
+    return table
+
+
+def cmvn_from_json(path: str) -> Tuple[torch.Tensor, torch.Tensor]:
+    """由 WeNet global_cmvn 的统计量计算 mean 与 istd（形状 [80]，float32）"""
+    with open(path, "r") as f:
+        obj = json.load(f)
+    mean_stat = np.asarray(obj["mean_stat"], dtype=np.float64)
+    var_stat = np.asarray(obj["var_stat"], dtype=np.float64)
+    frame_num = float(obj["frame_num"])
+    mean = mean_stat / max(1.0, frame_num)
+    var = var_stat / max(1.0, frame_num) - mean * mean
+    var = np.maximum(var, 1e-10)
+    istd = 1.0 / np.sqrt(var)
+    return torch.from_numpy(mean.astype(np.float32)), torch.from_numpy(istd.astype(np.float32))
+
+
+def encode_vocab(symbol_table: Dict[str, int]) -> Dict[str, torch.Tensor]:
+    """词表 → 数组：id、UTF-8 字节串拼接及每个 piece 的起始偏移"""
+    items = sorted(symbol_table.items(), key=lambda item: item[1])
+    encoded = [piece.encode("utf-8") for piece, _ in items]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return {
+        VOCAB_IDS: torch.tensor([idx for _, idx in items], dtype=torch.int64),
+        VOCAB_OFFSETS: torch.from_numpy(offsets),
+        VOCAB_BYTES: torch.from_numpy(np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()),
+    }
+
+
+def decode_vocab(ids: torch.Tensor, offsets: torch.Tensor, blob: torch.Tensor) -> Dict[str, int]:
+    data = blob.numpy().tobytes()
+    bounds = offsets.tolist()
+    return {data[bounds[i]:bounds[i + 1]].decode("utf-8"): idx for i, idx in enumerate(ids.tolist())}
+
+
+def _dtype_name(dtype: torch.dtype) -> str:
+    return str(dtype).replace("torch.", "")
+
+
+def write_bundle(
+    out_dir: str,
+    state: Dict[str, torch.Tensor],
+    config: Dict[str, Any],
+    symbol_table: Dict[str, int],
+    cmvn: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+    spm_model: Optional[bytes] = None,
+    source: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """写出模型包，返回 manifest"""
+    tensors: Dict[str, torch.Tensor] = {MODEL_PREFIX + name: t for name, t in state.items()}
+    tensors.update(encode_vocab(symbol_table))
+    if cmvn is not None:
+        tensors[CMVN_MEAN], tensors[CMVN_ISTD] = cmvn
+    if spm_model is not None:
+        tensors[SPM_MODEL] = torch.from_numpy(np.frombuffer(spm_model, dtype=np.uint8).copy())
+
+    os.makedirs(out_dir, exist_ok=True)
+    index: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    tmp_path = os.path.join(out_dir, TENSORS_NAME + ".tmp")
+    with open(tmp_path, "wb") as f:
+        for name, tensor in tensors.items():
+            tensor = tensor.detach().to("cpu").contiguous()
+            data = tensor.reshape(-1).view(torch.uint8).numpy().tobytes() if tensor.numel() else b""
+            index[name] = {
+                "dtype": _dtype_name(tensor.dtype),
+                "shape": list(tensor.shape),
+                "offset": offset,
+                "nbytes": len(data),
+            }
+            f.write(data)
+            offset += len(data)
+            pad = -offset % ALIGNMENT
+            f.write(b"\0" * pad)
+            offset += pad
+    os.replace(tmp_path, os.path.join(out_dir, TENSORS_NAME))
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "byteorder": sys.byteorder,
+        "alignment": ALIGNMENT,
+        "config": config,
+        "source": source or {},
+        "tensors": index,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+class ModelBundle:
+    """只读映射的模型包"""
+
+    def __init__(self, path: str, manifest: Dict[str, Any], tensors: Dict[str, torch.Tensor]):
+        self.path = path
+        self.manifest = manifest
+        self.tensors = tensors
+
+    @classmethod
+    def open(cls, path: str) -> "ModelBundle":
+        with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a model bundle")
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"unsupported bundle version {manifest.get('version')} (expected {BUNDLE_VERSION})")
+        if manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"bundle byte order {manifest.get('byteorder')} does not match this machine")
+
+        tensors_path = os.path.join(path, TENSORS_NAME)
+        size = os.path.getsize(tensors_path)
+        index = manifest["tensors"]
+        if any(entry["offset"] + entry["nbytes"] > size for entry in index.values()):
+            raise ValueError(f"{tensors_path} is truncated")
+
+        # 私有映射：只读使用时页面来自页缓存，多进程共享
+        storage = torch.UntypedStorage.from_file(tensors_path, shared=False, nbytes=size)
+        buffer = torch.empty(0, dtype=torch.uint8).set_(storage)
+        tensors = {}
+        for name, entry in index.items():
+            dtype = getattr(torch, entry["dtype"])
+            raw = buffer[entry["offset"]:entry["offset"] + entry["nbytes"]]
+            tensors[name] = raw.view(dtype).view(entry["shape"])
+        return cls(path, manifest, tensors)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.manifest["config"]
+
+    def state_dict(self) -> Dict[str, torch.Tensor]:
+        """模型参数（映射上的视图）"""
+        n = len(MODEL_PREFIX)
+        return {name[n:]: t for name, t in self.tensors.items() if name.startswith(MODEL_PREFIX)}
+
+    def stale_reason(self, checkpoint: str) -> Optional[str]:
+        """模型包与给定 checkpoint 不一致的原因；一致或无法判断（checkpoint 不存在）时返回 None"""
+        source = self.manifest.get("source", {}).get("checkpoint")
+        if not source or not checkpoint or not os.path.exists(checkpoint):
+            return None
+        if os.path.abspath(checkpoint) != os.path.abspath(source):
+            return f"packed from {source}, configured checkpoint is {checkpoint}"
+        if os.path.getmtime(checkpoint) > os.path.getmtime(os.path.join(self.path, TENSORS_NAME)):
+            return f"{checkpoint} was modified after packing"
+        return None
+
+    def symbol_table(self) -> Dict[str, int]:
+        return decode_vocab(self.tensors[VOCAB_IDS], self.tensors[VOCAB_OFFSETS], self.tensors[VOCAB_BYTES])
+
+    @property
+    def cmvn(self) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        if CMVN_MEAN not in self.tensors:
+            return None
+        return self.tensors[CMVN_MEAN], self.tensors[CMVN_ISTD]
+
+    @property
+    def spm_model(self) -> Optional[bytes]:
+        blob = self.tensors.get(SPM_MODEL)
+        return blob.numpy().tobytes() if blob is not None else None
@@ -0,0 +1,91 @@
+"""
+受限词表的 CTC 后验
+
+强制对齐只读取 blank 与参考文本中出现的少量 token 列，而 ctc.log_softmax 会
+为 5000 个 unit 生成完整的 [T, V] 矩阵。受限模式下：
+- 只对需要的标签子集计算输出投影（每个请求 gather 一次权重行）；
+- 归一化项按时间分块对完整 logits 求 logsumexp，每次只存在 [chunk, V] 的临时矩阵，
+  结果与完整 log_softmax 精确一致；
+- 扩展标签被重映射到子集内的局部下标，Viterbi 与置信度计算无需改动。
+
+受限模式仍要为归一化项计算完整的 T×V logits，外加一次子集投影，计算量略多于完整模式，
+换来的是不再保留 [T, V] 的后验矩阵（长音频时内存占用小得多）。因此默认使用 full，
+内存受限时通过 WENET_CTC_POSTERIORS=restricted 开启（仅 torch 后端支持受限模式）。
+"""
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import torch
+
+CTC_RESTRICTED = "restricted"
+CTC_FULL = "full"
+DEFAULT_CHUNK_FRAMES = 256
+
+
+def ctc_posteriors_mode() -> str:
+    return os.getenv("WENET_CTC_POSTERIORS", CTC_FULL).lower()
+
+
+def compact_labels(token_ids: Sequence[int], ext_labels: np.ndarray, blank_id: int = 0) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """将标签映射到子集下标。
+
+    返回 (label_ids, local_ext_labels, local_token_ids)：label_ids 为升序且包含 blank 的
+    全局 id 子集，其余两者为对应的局部下标。映射为双射，skip 掩码保持不变。
+    """
+    label_ids = np.unique(np.append(np.asarray(token_ids, dtype=np.int64), blank_id))
+    local_ext = np.searchsorted(label_ids, np.asarray(ext_labels, dtype=np.int64))
+    local_tokens = np.searchsorted(label_ids, np.asarray(token_ids, dtype=np.int64)).tolist()
+    return label_ids, local_ext, local_tokens
+
+
+def ctc_projection(ctc: torch.nn.Module) -> Tuple[torch.Tensor, torch.Tensor]:
+    """WeNet CTC 头的输出投影 (weight [V, D], bias [V])"""
+    return ctc.ctc_lo.weight, ctc.ctc_lo.bias
+
+
+def restricted_log_posteriors(
+    hidden: torch.Tensor,
+    weight: torch.Tensor,
+    bias: torch.Tensor,
+    label_ids: np.ndarray,
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+) -> torch.Tensor:
+    """计算 label_ids 列的精确 CTC 对数后验，返回 [T, K]（fp32，CPU）"""
+    with torch.no_grad():
+        hidden = hidden.float()
+        ids = torch.from_numpy(np.asarray(label_ids, dtype=np.int64)).to(weight.device)
+        sub_weight = weight.index_select(0, ids).float()
+        sub_bias = bias.index_select(0, ids).float()
+        weight_f = weight.float()
+        bias_f = bias.float()
+
+        T = hidden.size(0)
+        out = torch.empty((T, ids.numel()), dtype=torch.float32, device=hidden.device)
+        for start in range(0, T, chunk_frames):
+            h = hidden[start:start + chunk_frames]
+            # 归一化项：仅在分块内生成完整 logits
+            lse = torch.logsumexp(torch.addmm(bias_f, h, weight_f.t()), dim=-1, keepdim=True)
+            torch.addmm(sub_bias, h, sub_weight.t(), out=out[start:start + chunk_frames])
+            out[start:start + chunk_frames] -= lse
+        return out.cpu()
+
+
+def greedy_token_ids(
+    hidden: torch.Tensor,
+    weight: torch.Tensor,
+    bias: torch.Tensor,
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+) -> torch.Tensor:
+    """在 encoder 隐状态上逐帧取完整词表的 argmax，返回 [T]（分块计算，不保留 [T, V] 矩阵）"""
+    with torch.no_grad():
+        hidden = hidden.float()
+        weight_f = weight.float()
+        bias_f = bias.float()
+        ids = [
+            torch.addmm(bias_f, hidden[start:start + chunk_frames], weight_f.t()).argmax(dim=-1)
+            for start in range(0, hidden.size(0), chunk_frames)
+        ]
+        if not ids:
+            return torch.empty(0, dtype=torch.long)
+        return torch.cat(ids).cpu()
@@ -0,0 +1,268 @@
+"""
+向量化 CTC Viterbi 强制对齐
+
+在插入 blank 的扩展标签序列上做 Viterbi 动态规划：每一帧对所有 S 个状态
+一次性计算 保持(stay) / 前移(prev) / 跳过(skip) 三种转移，跳过转移由预先
+计算好的 skip mask 控制。并列时的取舍规则与逐元素循环实现完全一致
+（stay 优先于 prev，prev 优先于 skip），因此得到的路径逐帧相同。
+
+长录音（T×S 很大）使用带状搜索：只保留上一行 dp，回溯指针以 uint8 存储且只覆盖
+对角线附近 ±band 个状态。带内结果只有在能证明最优时才被采用：任何离开带的路径，
+其分数不超过"离开前的带内最优前缀 + 之后每帧的最大 log 概率之和"，带内最优分数严格
+大于这一上界时，完整 DP 的最优路径必然在带内，结果与完整 DP 逐帧一致；否则带宽翻倍重试，
+带宽覆盖全部状态时退化为完整 DP。
+- VITERBI_BAND：初始半带宽（状态数），0 表示总是使用完整 DP；
+- VITERBI_BAND_MIN_CELLS：T×S 达到该值时才启用带状搜索。
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NEG_INF = -1e10
+DEFAULT_BAND = 64
+DEFAULT_BAND_MIN_CELLS = 1_000_000
+
+# 回溯指针编码
+MOVE_STAY = 0
+MOVE_PREV = 1
+MOVE_SKIP = 2
+
+
+def build_extended_labels(labels: Sequence[int], blank_id: int = 0) -> np.ndarray:
+    """构造扩展标签序列：在 token 之间及两端插入 blank，长度 2L+1。"""
+    ext = np.full(2 * len(labels) + 1, blank_id, dtype=np.int64)
+    if len(labels):
+        ext[1::2] = np.asarray(labels, dtype=np.int64)
+    return ext
+
+
+def build_skip_mask(ext: np.ndarray, blank_id: int = 0) -> np.ndarray:
+    """状态 s 是否允许从 s-2 跳转：s 非 blank 且与 s-2 的标签不同。"""
+    mask = np.zeros(len(ext), dtype=bool)
+    if len(ext) > 2:
+        mask[2:] = (ext[2:] != blank_id) & (ext[2:] != ext[:-2])
+    return mask
+
+
+def viterbi_backpointers(emit: np.ndarray, skip_mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """对 [T, S] 的发射对数概率运行前向 Viterbi。
+
+    返回 (最后一帧的 dp 行, [T, S] 的回溯指针)。
+    """
+    T, S = emit.shape
+    dtype = emit.dtype
+    neg_inf = dtype.type(NEG_INF)
+
+    bp = np.full((T, S), -1, dtype=np.int8)
+    dp = np.full(S, neg_inf, dtype=dtype)
+    dp[0] = emit[0, 0]
+    if S > 1:
+        dp[1] = emit[0, 1]
+        bp[0, 1] = MOVE_PREV
+
+    prev = np.empty(S, dtype=dtype)
+    skip = np.empty(S, dtype=dtype)
+    for t in range(1, T):
+        # 平移得到来自 s-1 / s-2 的分数，越界位置不可达
+        prev[0] = -np.inf
+        prev[1:] = dp[:-1]
+        skip[:2] = -np.inf
+        skip[2:] = dp[:-2]
+
+        best = dp.copy()
+        arg = np.zeros(S, dtype=np.int8)
+        take = prev > best
+        best[take] = prev[take]
+        arg[take] = MOVE_PREV
+        take = skip_mask & (skip > best)
+        best[take] = skip[take]
+        arg[take] = MOVE_SKIP
+
+        dp = best + emit[t]
+        bp[t] = arg
+
+    return dp, bp
+
+
+def backtrack(bp: np.ndarray, last_s: int) -> List[int]:
+    """从终止状态沿回溯指针恢复逐帧状态序列（长度 T）。"""
+    T = bp.shape[0]
+    path = [0] * T
+    cur_s = last_s
+    path[T - 1] = cur_s
+    rows = bp.tolist()
+    for t in range(T - 1, 0, -1):
+        move = rows[t][cur_s]
+        if move == MOVE_PREV:
+            cur_s -= 1
+        elif move == MOVE_SKIP:
+            cur_s -= 2
+        path[t - 1] = cur_s
+    return path
+
+
+def ctc_viterbi_path(log_probs: np.ndarray, labels: Sequence[int], blank_id: int = 0) -> List[int]:
+    """CTC 强制对齐，返回每一帧所处的扩展标签状态下标。
+
+    参数
+    - log_probs: [T, V] 的 CTC log-softmax 输出。
+    - labels: 目标 token id 序列（非空）。
+    - blank_id: blank 的 id。
+    """
+    ext = build_extended_labels(labels, blank_id)
+    return ctc_viterbi_path_ext(log_probs, ext, build_skip_mask(ext, blank_id))
+
+
+def band_settings() -> Tuple[int, int]:
+    """(初始半带宽, 启用带状搜索的最小 T×S)"""
+    return (
+        max(0, int(os.getenv("VITERBI_BAND", str(DEFAULT_BAND)))),
+        max(0, int(os.getenv("VITERBI_BAND_MIN_CELLS", str(DEFAULT_BAND_MIN_CELLS)))),
+    )
+
+
+def _full_viterbi(log_probs: np.ndarray, ext: np.ndarray, skip_mask: np.ndarray) -> List[int]:
+    """完整 [T, S] 的 Viterbi + 回溯"""
+    S = len(ext)
+    emit = np.ascontiguousarray(log_probs[:, ext])
+    dp_last, bp = viterbi_backpointers(emit, skip_mask)
+
+    # 结束状态：S-1 或 S-2 中较大者
+    last_s = S - 1
+    alt_s = S - 2 if S - 2 >= 0 else S - 1
+    if dp_last[alt_s] > dp_last[last_s]:
+        last_s = alt_s
+
+    return backtrack(bp, last_s)
+
+
+def banded_viterbi_path(
+    log_probs: np.ndarray, ext: np.ndarray, skip_mask: np.ndarray, half_width: int
+) -> Optional[List[int]]:
+    """在线性时间/标签对角线 ±half_width 的带内做 Viterbi。
+
+    内存为 O(T × band)：dp 只保留一行，回溯指针为 [T, 2*half_width+1] 的 uint8。
+    终止状态不在带内或不可达、或无法证明带内路径是全局最优时返回 None。
+    """
+    T = log_probs.shape[0]
+    S = len(ext)
+    half_width = max(1, half_width)
+    B = 2 * half_width + 1
+    dtype = log_probs.dtype if log_probs.dtype.kind == "f" else np.dtype(np.float64)
+    neg_inf = dtype.type(-np.inf)
+
+    t_idx = np.arange(T)
+    center = np.rint(t_idx * ((S - 1) / max(1, T - 1))).astype(np.int64)
+    lo = np.clip(center - half_width, 0, S)
+    hi = np.clip(center + half_width + 1, 0, S)
+
+    # 带内发射概率 [T, B]，带外位置为 -inf
+    cols = lo[:, None] + np.arange(B)[None, :]
+    valid = cols < hi[:, None]
+    cols = np.minimum(cols, S - 1)
+    emit = np.where(valid, log_probs[t_idx[:, None], ext[cols]], neg_inf)
+    band_skip = skip_mask[cols] & valid
+    # 终止状态 S-1 必须在最后一帧的带内（T 过小时不成立）
+    if not lo[T - 1] <= S - 1 < hi[T - 1]:
+        return None
+
+    # suffix[t]：第 t 帧起每帧最大 log 概率之和，是任意路径在 t 之后得分的上界
+    suffix = np.zeros(T + 1, dtype=np.float64)
+    suffix[:T] = np.cumsum(log_probs.max(axis=1).astype(np.float64)[::-1])[::-1]
+    # 离开带的路径的得分上界
+    exit_bound = -np.inf
+    offsets = np.arange(B)
+
+    bp = np.zeros((T, B), dtype=np.uint8)
+    # 与完整 DP 一致：t=0 时只有状态 0、1 可达，带内其它状态为 NEG_INF
+    dp = np.where(valid[0], dtype.type(NEG_INF), neg_inf).astype(dtype)
+    dp[0] = emit[0, 0]
+    if S > 1 and hi[0] > 1:
+        dp[1] = emit[0, 1]
+        bp[0, 1] = MOVE_PREV
+
+    max_shift = int(np.max(np.diff(lo))) if T > 1 else 0
+    padded = np.full(2 + max_shift + B, neg_inf, dtype=dtype)
+    for t in range(1, T):
+        shift = int(lo[t] - lo[t - 1])
+        # 上一行中存在转移落到本行带外的状态：stay 低于 lo[t]，prev / skip 达到 hi[t]
+        states = lo[t - 1] + offsets
+        leaves = (states < lo[t]) | ((states + 1 >= hi[t]) & (states + 1 < S))
+        skip_to = np.minimum(states + 2, S - 1)
+        leaves |= (states + 2 >= hi[t]) & (states + 2 < S) & skip_mask[skip_to]
+        leaves &= valid[t - 1]
+        if leaves.any():
+            exit_bound = max(exit_bound, float(dp[leaves].max()) + suffix[t])
+        # padded[2 + k] 对应上一行的绝对状态 lo[t-1] + k
+        padded.fill(neg_inf)
+        padded[2:2 + B] = dp
+        stay = padded[2 + shift:2 + shift + B]
+        prev = padded[1 + shift:1 + shift + B]
+        skip = padded[shift:shift + B]
+
+        best = stay.copy()
+        arg = np.zeros(B, dtype=np.uint8)
+        take = prev > best
+        best[take] = prev[take]
+        arg[take] = MOVE_PREV
+        take = band_skip[t] & (skip > best)
+        best[take] = skip[take]
+        arg[take] = MOVE_SKIP
+
+        dp = best + emit[t]
+        bp[t] = arg
+
+    last_j = S - 1 - lo[T - 1]
+    alt_j = S - 2 - lo[T - 1]
+    if alt_j >= 0 and dp[alt_j] > dp[last_j]:
+        last_j = alt_j
+    best = float(dp[last_j])
+    if not best > NEG_INF / 2:
+        return None
+    # 留出浮点累加误差的余量；严格大于上界时带外路径不可能并列或更优
+    if not best > exit_bound + 1e-4 * (1.0 + abs(best)):
+        return None
+
+    path = np.empty(T, dtype=np.int64)
+    cur_s = int(lo[T - 1] + last_j)
+    path[T - 1] = cur_s
+    for t in range(T - 1, 0, -1):
+        move = bp[t, cur_s - lo[t]]
+        if move == MOVE_PREV:
+            cur_s -= 1
+        elif move == MOVE_SKIP:
+            cur_s -= 2
+        path[t - 1] = cur_s
+    return path.tolist()
+
+
+def ctc_viterbi_path_ext(
+    log_probs: np.ndarray,
+    ext: np.ndarray,
+    skip_mask: np.ndarray,
+    band: Optional[int] = None,
+    band_min_cells: Optional[int] = None,
+) -> List[int]:
+    """同 ctc_viterbi_path，但直接使用预先构建的扩展标签与 skip mask。
+
+    band / band_min_cells 为 None 时读取 VITERBI_BAND / VITERBI_BAND_MIN_CELLS。
+    T == 1 或 T < S/2（帧数不足以走完扩展标签）时直接使用完整 DP。
+    """
+    T = log_probs.shape[0]
+    S = len(ext)
+    if T <= 0 or S == 0:
+        return []
+
+    env_band, env_min_cells = band_settings()
+    band = env_band if band is None else band
+    band_min_cells = env_min_cells if band_min_cells is None else band_min_cells
+    if band > 0 and T > 1 and 2 * T >= S and T * S >= band_min_cells:
+        width = band
+        while 2 * width + 1 < S:
+            path = banded_viterbi_path(log_probs, ext, skip_mask, width)
+            if path is not None:
+                return path
+            width *= 2
+
+    return _full_viterbi(log_probs, ext, skip_mask)
@@ -0,0 +1,238 @@
+"""
+推理执行器
+
+CPU 密集的对齐与评分不能在 uvicorn 事件循环中同步执行，否则一次推理就会
+阻塞 /health 和其它所有上传。这里提供一个有界的执行器：
+
+- 线程池（默认）：共享进程内模型；torch intra-op 线程数按同时执行编码器前向的线程数划分
+  （开启微批处理时编码器只在批处理线程上串行执行，因此使用全部 CPU）；
+- 进程池：每个子进程各自加载模型，适合 GIL 成为瓶颈的场景；
+- 排队数量有上限，饱和时抛出 ServiceOverloaded，由接口返回 503 + Retry-After；
+- 客户端断开时取消仍在排队的任务。
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Executor.shutdown(cancel_futures=...) 需要 Python 3.9+
+_HAS_CANCEL_FUTURES = sys.version_info >= (3, 9)
+
+
+class ServiceOverloaded(Exception):
+    """推理队列已满"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ClientDisconnected(Exception):
+    """客户端在结果返回前断开连接"""
+
+
+@dataclass
+class ExecutorConfig:
+    kind: str = "thread"  # thread | process
+    workers: int = 2
+    # 除正在执行的任务外，最多允许排队的任务数
+    max_queue: int = 16
+    # torch intra-op 线程数，0 表示按 CPU 数 / 编码器并发数自动计算
+    torch_threads: int = 0
+    retry_after_s: int = 1
+    # 检查客户端是否断开的间隔
+    disconnect_poll_s: float = 0.1
+
+    @classmethod
+    def from_env(cls) -> "ExecutorConfig":
+        return cls(
+            kind=os.getenv("INFERENCE_EXECUTOR", "thread").lower(),
+            workers=max(1, int(os.getenv("INFERENCE_WORKERS", "2"))),
+            max_queue=max(0, int(os.getenv("INFERENCE_MAX_QUEUE", "16"))),
+            torch_threads=max(0, int(os.getenv("INFERENCE_TORCH_THREADS", "0"))),
+            retry_after_s=max(1, int(os.getenv("INFERENCE_RETRY_AFTER", "1"))),
+        )
+
+    def encoder_concurrency(self) -> int:
+        """同一进程内同时执行编码器前向的线程数"""
+        if self.kind == "process":
+            # 每个子进程各自设置线程数，进程之间分摊 CPU
+            return self.workers
+        from .batching import BatcherConfig
+
+        # 开启微批处理时，所有工作线程的编码请求都在同一个批处理线程上串行执行
+        return 1 if BatcherConfig.from_env().max_batch_size > 1 else self.workers
+
+    def threads_per_worker(self) -> int:
+        if self.torch_threads > 0:
+            return self.torch_threads
+        return max(1, (os.cpu_count() or 1) // self.encoder_concurrency())
+
+
+def _init_process_worker(torch_threads: int) -> None:
+    """进程池子进程初始化：设置 torch 线程数并加载模型"""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    from .registry import get_registry
+
+    try:
+        get_registry().load()
+    except Exception as e:
+        logger.error(f"Worker failed to preload model: {e}")
+
+
+class InferenceExecutor:
+    """有界推理执行器"""
+
+    def __init__(self, config: Optional[ExecutorConfig] = None):
+        self.config = config or ExecutorConfig()
+        self.capacity = self.config.workers + self.config.max_queue
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._pool = self._create_pool()
+        self._local: Optional[ThreadPoolExecutor] = None
+        self._local_lock = threading.Lock()
+        self._inflight = 0
+        # 未完成的任务，Python 3.8 关闭时据此取消排队中的任务
+        self._pending: Set[Future] = set()
+        self._inflight_lock = threading.Lock()
+
+    def _create_pool(self) -> Executor:
+        threads = self.config.threads_per_worker()
+        if self.config.kind == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.config.workers,
+                initializer=_init_process_worker,
+                initargs=(threads,),
+            )
+        if self.config.kind != "thread":
+            logger.warning(f"Unknown executor kind '{self.config.kind}', using thread pool")
+        import torch
+
+        # set_num_threads 对整个进程生效：按实际并发执行编码器的线程数计算，
+        # 微批处理时批处理线程独占全部 CPU，否则在工作线程之间划分以免超额订阅
+        torch.set_num_threads(threads)
+        return ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="inference")
+
+    @property
+    def inflight(self) -> int:
+        """已提交但未完成的任务数（包括排队中的）"""
+        return self._inflight
+
+    def _release(self, future: Future) -> None:
+        with self._inflight_lock:
+            self._inflight -= 1
+            self._pending.discard(future)
+        self._slots.release()
+
+    def _local_pool(self) -> Executor:
+        """在本进程内执行的池：线程池模式即推理线程池，进程池模式另建同样大小的线程池"""
+        if self.config.kind != "process":
+            return self._pool
+        if self._local is None:
+            with self._local_lock:
+                if self._local is None:
+                    self._local = ThreadPoolExecutor(
+                        max_workers=self.config.workers, thread_name_prefix="inference-local"
+                    )
+        return self._local
+
+    def submit(self, fn: Callable[..., Any], *args: Any, local: bool = False) -> Future:
+        """提交任务；队列已满时抛出 ServiceOverloaded。
+
+        local=True 的任务必须在本进程内执行（如持有编码器缓存的流式会话），
+        同样占用有界队列的名额。
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServiceOverloaded(self.config.retry_after_s)
+        try:
+            pool = self._local_pool() if local else self._pool
+            future = pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._inflight_lock:
+            self._inflight += 1
+            self._pending.add(future)
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        local: bool = False,
+    ) -> Any:
+        """在执行器中运行任务并等待结果。
+
+        若提供 is_disconnected（如 starlette Request.is_disconnected），等待期间
+        会定期检查客户端是否断开，断开时取消排队中的任务并抛出 ClientDisconnected。
+        """
+        future = self.submit(fn, *args, local=local)
+        wrapped = asyncio.wrap_future(future)
+        try:
+            if is_disconnected is None:
+                return await wrapped
+
+            while True:
+                done, _ = await asyncio.wait({wrapped}, timeout=self.config.disconnect_poll_s)
+                if done:
+                    return wrapped.result()
+                if await is_disconnected():
+                    # 只能取消尚未开始的任务；已在执行的任务完成后结果被丢弃
+                    if future.cancel():
+                        logger.info("Client disconnected, cancelled queued inference")
+                    raise ClientDisconnected()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def shutdown(self) -> None:
+        """关闭执行器，取消仍在排队的任务"""
+        if _HAS_CANCEL_FUTURES:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            if self._local is not None:
+                self._local.shutdown(wait=False, cancel_futures=True)
+            return
+        # Python 3.8 的 shutdown 没有 cancel_futures：手动取消（只对尚未开始的任务生效）
+        with self._inflight_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._pool.shutdown(wait=False)
+        if self._local is not None:
+            self._local.shutdown(wait=False)
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> InferenceExecutor:
+    """返回进程级共享的推理执行器（按环境变量配置）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor(ExecutorConfig.from_env())
+    return _executor
+
+
+def current_executor() -> Optional[InferenceExecutor]:
+    """返回已创建的执行器（未创建时返回 None，不触发创建）"""
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
@@ -0,0 +1,111 @@
+"""
+特征前端：重采样、Kaldi fbank 与 CMVN
+
+kaldi.fbank 每次调用都会重新生成 Hamming 窗与 mel 滤波器组，preprocess_audio 也会为每条
+非 16kHz 音频重新构造 Resample（包括计算 sinc 插值核）。对短语音而言这部分开销占比可观。
+FeatureFrontend 在构造时一次性准备：
+- 窗函数与补零后的 mel 矩阵（与 kaldi.fbank 使用的完全相同）；
+- 按源采样率缓存的 Resample 模块（插值核在模块构造时预计算）；
+- CMVN 在 log-mel 结果的缓冲区上原地完成，不再产生中间张量。
+
+计算步骤与 torchaudio.compliance.kaldi.fbank（dither=0、hamming 窗、use_energy=False）
+逐一对应，输出逐位一致。compute_batch 把多条音频的帧拼接后一次完成 FFT 与 mel 投影。
+"""
+import threading
+from typing import Dict, List, Optional
+
+import torch
+import torchaudio
+from torchaudio.compliance.kaldi import get_mel_banks
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25ms
+FRAME_SHIFT = 160  # 10ms
+PADDED_FRAME_LENGTH = 512
+PREEMPHASIS = 0.97
+LOW_FREQ = 20.0
+EPSILON = torch.finfo(torch.float).eps
+
+
+class FeatureFrontend:
+    def __init__(
+        self,
+        cmvn_mean: Optional[torch.Tensor] = None,
+        cmvn_istd: Optional[torch.Tensor] = None,
+        num_mel_bins: int = 80,
+    ):
+        self.num_mel_bins = num_mel_bins
+        self.cmvn_mean = cmvn_mean
+        self.cmvn_istd = cmvn_istd
+        self.window = torch.hamming_window(
+            FRAME_LENGTH, periodic=False, alpha=0.54, beta=0.46, dtype=torch.float32
+        ).unsqueeze(0)
+        mel, _ = get_mel_banks(num_mel_bins, PADDED_FRAME_LENGTH, float(SAMPLE_RATE), LOW_FREQ, 0.0, 100.0, -500.0, 1.0)
+        # 最右侧（Nyquist）列补零：[num_mel_bins, PADDED_FRAME_LENGTH // 2 + 1]
+        self.mel_banks = torch.nn.functional.pad(mel.float(), (0, 1), mode="constant", value=0)
+        self._resamplers: Dict[int, torchaudio.transforms.Resample] = {}
+        self._lock = threading.Lock()
+
+    # ---------------------- 重采样 ----------------------
+    def resampler(self, sample_rate: int) -> torchaudio.transforms.Resample:
+        """源采样率对应的 Resample 模块（按采样率缓存）"""
+        resampler = self._resamplers.get(sample_rate)
+        if resampler is None:
+            with self._lock:
+                resampler = self._resamplers.get(sample_rate)
+                if resampler is None:
+                    resampler = torchaudio.transforms.Resample(sample_rate, SAMPLE_RATE)
+                    self._resamplers[sample_rate] = resampler
+        return resampler
+
+    def resample(self, waveform: torch.Tensor, sample_rate: int) -> torch.Tensor:
+        if sample_rate == SAMPLE_RATE:
+            return waveform
+        with torch.no_grad():
+            return self.resampler(int(sample_rate))(waveform)
+
+    # ---------------------- fbank ----------------------
+    @staticmethod
+    def _frames(waveform: torch.Tensor) -> torch.Tensor:
+        """[samples] -> [m, FRAME_LENGTH] 的跨步视图（snip_edges=True）"""
+        if waveform.dim() == 2:
+            waveform = waveform[0]
+        num_samples = waveform.size(0)
+        if num_samples < FRAME_LENGTH:
+            raise ValueError(f"audio too short for fbank: {num_samples} samples < {FRAME_LENGTH}")
+        m = 1 + (num_samples - FRAME_LENGTH) // FRAME_SHIFT
+        stride = waveform.stride(0)
+        return waveform.as_strided((m, FRAME_LENGTH), (FRAME_SHIFT * stride, stride))
+
+    def _fbank_frames(self, frames: torch.Tensor) -> torch.Tensor:
+        """对 [m, FRAME_LENGTH] 帧计算 log-mel 并应用 CMVN，返回 [m, num_mel_bins]"""
+        # 去直流
+        frames = frames - torch.mean(frames, dim=1).unsqueeze(1)
+        # 预加重：x[j] -= 0.97 * x[max(0, j - 1)]
+        previous = torch.nn.functional.pad(frames.unsqueeze(0), (1, 0), mode="replicate").squeeze(0)
+        frames = frames - PREEMPHASIS * previous[:, :-1]
+        frames = frames * self.window
+        frames = torch.nn.functional.pad(
+            frames.unsqueeze(0), (0, PADDED_FRAME_LENGTH - FRAME_LENGTH), mode="constant", value=0
+        ).squeeze(0)
+
+        spectrum = torch.fft.rfft(frames).abs().pow(2.0)
+        feats = torch.mm(spectrum, self.mel_banks.T)
+        feats.clamp_(min=EPSILON).log_()
+        if self.cmvn_mean is not None and self.cmvn_istd is not None:
+            feats.sub_(self.cmvn_mean).mul_(self.cmvn_istd)
+        return feats
+
+    def compute(self, waveform: torch.Tensor) -> torch.Tensor:
+        """单条 16kHz 音频（[samples] 或 [1, samples]）的特征 [frames, num_mel_bins]"""
+        with torch.no_grad():
+            return self._fbank_frames(self._frames(waveform.float()))
+
+    def compute_batch(self, waveforms: List[torch.Tensor]) -> List[torch.Tensor]:
+        """多条音频的帧拼接后一次完成 FFT 与 mel 投影，返回每条的特征"""
+        if not waveforms:
+            return []
+        with torch.no_grad():
+            frames = [self._frames(w.float()) for w in waveforms]
+            feats = self._fbank_frames(torch.cat(frames, dim=0))
+            return list(torch.split(feats, [f.size(0) for f in frames], dim=0))
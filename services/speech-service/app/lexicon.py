@@ -0,0 +1,281 @@
+"""
+发音词典（G2P 缓存）
+
+查词顺序：
+1. 进程内 LRU 缓存；
+2. 磁盘词典：按词排序的 ``word<TAB>ipa ipa ...`` 文本文件，通过 mmap 映射后二分查找，
+   多个 worker 进程共享同一份页缓存；
+3. 神经网络 G2P（g2p_en），只用于词典外的词，结果写回 LRU。
+
+磁盘词典由 scripts/build_lexicon.py 基于 CMUdict 与词书词汇预先生成。
+"""
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEXICON_HEADER = "#sylis-lexicon v1"
+
+_SIMPLE_IPA_MAP = {
+    'a': 'æ', 'e': 'ɛ', 'i': 'ɪ', 'o': 'oʊ', 'u': 'ʊ',
+    'b': 'b', 'c': 'k', 'd': 'd', 'f': 'f', 'g': 'ɡ', 'h': 'h',
+    'j': 'dʒ', 'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n', 'p': 'p',
+    'q': 'k', 'r': 'ɹ', 's': 's', 't': 't', 'v': 'v', 'w': 'w',
+    'x': 'ks', 'y': 'j', 'z': 'z'
+}
+
+_ARPABET_IPA_MAP = {
+    # consonants
+    'P': 'p', 'B': 'b', 'T': 't', 'D': 'd', 'K': 'k', 'G': 'ɡ',
+    'CH': 'tʃ', 'JH': 'dʒ', 'F': 'f', 'V': 'v', 'TH': 'θ', 'DH': 'ð',
+    'S': 's', 'Z': 'z', 'SH': 'ʃ', 'ZH': 'ʒ', 'HH': 'h', 'M': 'm',
+    'N': 'n', 'NG': 'ŋ', 'L': 'l', 'R': 'ɹ', 'Y': 'j', 'W': 'w',
+    # vowels (monophthongs/diphthongs)
+    'IY': 'i', 'IH': 'ɪ', 'EH': 'ɛ', 'AE': 'æ', 'AA': 'ɑ', 'AH': 'ʌ',
+    'AO': 'ɔ', 'UH': 'ʊ', 'UW': 'u', 'ER': 'ɝ', 'AX': 'ə',
+    'EY': 'eɪ', 'AY': 'aɪ', 'OW': 'oʊ', 'AW': 'aʊ', 'OY': 'ɔɪ',
+    # schwa-like
+    'AXR': 'ɚ', 'IX': 'ɨ',
+}
+
+
+def arpabet_to_ipa(phone: str) -> str:
+    """简易 ARPABET→IPA 映射，去除重音数字。"""
+    base = ''.join([c for c in phone if not c.isdigit()]).upper()
+    # context-free adjustment: unstressed AH often → ə
+    if base == 'AH' and any(ch.isdigit() and ch == '0' for ch in phone):
+        return 'ə'
+    return _ARPABET_IPA_MAP.get(base, base.lower())
+
+
+def simple_ipa(word: str) -> List[str]:
+    """Fallback：简单字符到 IPA"""
+    return [_SIMPLE_IPA_MAP.get(ch, ch) for ch in word.lower() if ch.isalpha()]
+
+
+def normalize_word(word: str) -> str:
+    """词典键：小写并去掉首尾标点（g2p_en 同样会丢弃这些标点）。"""
+    start, end = 0, len(word)
+    while start < end and not (word[start].isalnum() or word[start] == "'"):
+        start += 1
+    while end > start and not (word[end - 1].isalnum() or word[end - 1] == "'"):
+        end -= 1
+    return word[start:end].lower()
+
+
+class NeuralG2P:
+    """g2p_en 的惰性、线程安全封装，输出 IPA 音素列表。"""
+
+    def __init__(self):
+        self._g2p = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        self.ensure_loaded()
+        return self._g2p is not None
+
+    def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                try:
+                    from g2p_en import G2p  # type: ignore
+                    self._g2p = G2p()
+                except Exception as e:
+                    logger.warning(f"g2p_en not available: {e}")
+                    self._g2p = None
+                self._loaded = True
+
+    def __call__(self, word: str) -> Optional[List[str]]:
+        """返回 IPA 列表；g2p_en 不可用或推理失败时返回 None。"""
+        self.ensure_loaded()
+        if self._g2p is None:
+            return None
+        try:
+            with self._lock:
+                arp_tokens = [t for t in self._g2p(word) if t.strip()]
+        except Exception as e:
+            logger.warning(f"g2p_en inference failed for '{word}': {e}. Falling back to simple IPA mapping.")
+            return None
+        # 过滤非音素（例如空格、标点）
+        return [arpabet_to_ipa(t) for t in arp_tokens if t[0].isalpha()]
+
+
+class LexiconStore:
+    """只读磁盘词典：mmap 映射排序后的文本文件并二分查找。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    @classmethod
+    def open_default(cls) -> Optional["LexiconStore"]:
+        """按 LEXICON_PATH（默认 models/lexicon.tsv）打开词典，不存在时返回 None。"""
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.getenv("LEXICON_PATH", os.path.join(project_root, "models", "lexicon.tsv"))
+        if not os.path.exists(path):
+            return None
+        try:
+            store = cls(path)
+            logger.info(f"Loaded pronunciation lexicon: {path}")
+            return store
+        except OSError as e:
+            logger.warning(f"Failed to open lexicon at {path}: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[List[str]]:
+        mm = self._mm
+        if mm is None:
+            return None
+        target = key.encode("utf-8")
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            nl = mm.rfind(b"\n", lo, mid)
+            start = lo if nl < 0 else nl + 1
+            end = mm.find(b"\n", start)
+            if end < 0:
+                end = len(mm)
+            k, _, v = mm[start:end].partition(b"\t")
+            if k == target:
+                phones = v.decode("utf-8")
+                return phones.split(" ") if phones else []
+            if k < target:
+                lo = end + 1
+            else:
+                hi = start
+        return None
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+def read_lexicon(path: str) -> Dict[str, List[str]]:
+    """读取整个词典文件（构建/合并时使用）。"""
+    entries: Dict[str, List[str]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            k, _, v = line.partition("\t")
+            entries[k] = v.split(" ") if v else []
+    return entries
+
+
+def write_lexicon(path: str, entries: Dict[str, List[str]]) -> None:
+    """按 UTF-8 字节序写出词典，保证 LexiconStore 可二分查找。"""
+    items: List[Tuple[bytes, str]] = []
+    for word, phones in entries.items():
+        key = normalize_word(word)
+        if key and "\t" not in key and "\n" not in key:
+            items.append((key.encode("utf-8"), " ".join(phones)))
+    items.sort(key=lambda kv: kv[0])
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write((LEXICON_HEADER + "\n").encode("utf-8"))
+        prev = None
+        for key, phones in items:
+            if key == prev:
+                continue
+            f.write(key + b"\t" + phones.encode("utf-8") + b"\n")
+            prev = key
+    os.replace(tmp_path, path)
+
+
+def cmudict_entries() -> Iterable[Tuple[str, List[str]]]:
+    """CMUdict 全部词条（首选发音）转换为 IPA；需要 nltk 的 cmudict 语料。"""
+    from nltk.corpus import cmudict  # type: ignore
+
+    for word, prons in cmudict.dict().items():
+        if prons:
+            yield word, [arpabet_to_ipa(p) for p in prons[0] if p[0].isalpha()]
+
+
+class PronunciationLexicon:
+    """LRU + 磁盘词典 + 神经 G2P 的分层查词"""
+
+    def __init__(
+        self,
+        store: Optional[LexiconStore] = None,
+        g2p: Optional[Callable[[str], Optional[List[str]]]] = None,
+        cache_size: int = 50000,
+    ):
+        self.store = store
+        self.g2p = g2p
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.g2p_calls = 0
+
+    @classmethod
+    def from_env(cls, g2p: Optional[Callable[[str], Optional[List[str]]]] = None) -> "PronunciationLexicon":
+        return cls(
+            store=LexiconStore.open_default(),
+            g2p=g2p,
+            cache_size=int(os.getenv("LEXICON_CACHE_SIZE", "50000")),
+        )
+
+    def _remember(self, key: str, phones: List[str]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = phones
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def lookup(self, word: str) -> List[str]:
+        """返回单词的 IPA 音素列表（调用方不应修改返回的列表）。"""
+        key = normalize_word(word)
+        if not key:
+            return []
+
+        with self._lock:
+            phones = self._cache.get(key)
+            if phones is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return phones
+
+        if self.store is not None:
+            phones = self.store.get(key)
+            if phones is not None:
+                with self._lock:
+                    self.store_hits += 1
+                self._remember(key, phones)
+                return phones
+
+        phones = None
+        if self.g2p is not None:
+            with self._lock:
+                self.g2p_calls += 1
+            phones = self.g2p(word)
+        if phones is None:
+            phones = simple_ipa(word)
+        self._remember(key, phones)
+        return phones
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "storeHits": self.store_hits,
+            "g2pCalls": self.g2p_calls,
+        }
@@ -0,0 +1,239 @@
+"""
+长音频（段落朗读）评测：按静音切分、文本锚定、分段对齐后拼接
+
+整段送入 encoder 时注意力的内存与耗时随长度超线性增长，且 Viterbi 需在整段文本上进行。
+长音频模式下：
+- 在已计算的 fbank 帧上按能量检测静音，在静音中点切分为目标时长附近的片段；
+- 各片段一起提交给 encoder（经微批处理合并），按贪心 CTC 解码得到的发射 token 数
+  把参考文本按词边界分配到各片段；
+- 每个片段只与分到的文本做强制对齐，最后将词/音素时间平移到全局时间轴并拼接为
+  一个 AlignmentResult。
+
+通过 LONGFORM_MIN_SECONDS 设置启用阈值（<=0 关闭）。
+"""
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from .results import AlignmentResult, PhonemeSegment, WordSegment
+from .ctc_head import ctc_projection, greedy_token_ids
+from .trim import TrimSpan
+
+# fbank 帧移 10ms
+FRAME_SHIFT_S = 0.01
+SAMPLES_PER_FRAME = 160
+SAMPLE_RATE = 16000
+
+# 一组特征 -> 每条的 encoder 输出（隐状态或 CTC 对数后验）
+InferManyFn = Callable[[List[torch.Tensor]], List[torch.Tensor]]
+
+
+@dataclass
+class LongformConfig:
+    # 音频时长超过该值时启用长音频模式（秒，<=0 关闭）
+    min_seconds: float = 30.0
+    # 片段目标时长与上限（秒）
+    target_seconds: float = 15.0
+    max_seconds: float = 25.0
+    # 可作为切分点的最短静音（毫秒）
+    min_silence_ms: float = 200.0
+    # 静音阈值：能量低于 低分位 + ratio * (高分位 - 低分位)
+    silence_ratio: float = 0.2
+    # 不经过微批处理时，每次 encoder 前向的片段数
+    batch_size: int = 4
+
+    @classmethod
+    def from_env(cls) -> "LongformConfig":
+        return cls(
+            min_seconds=float(os.getenv("LONGFORM_MIN_SECONDS", "30")),
+            target_seconds=max(1.0, float(os.getenv("LONGFORM_TARGET_SECONDS", "15"))),
+            max_seconds=max(1.0, float(os.getenv("LONGFORM_MAX_SECONDS", "25"))),
+            min_silence_ms=max(0.0, float(os.getenv("LONGFORM_MIN_SILENCE_MS", "200"))),
+            silence_ratio=min(1.0, max(0.0, float(os.getenv("LONGFORM_SILENCE_RATIO", "0.2")))),
+            batch_size=max(1, int(os.getenv("LONGFORM_BATCH_SIZE", "4"))),
+        )
+
+    def applies(self, num_samples: int) -> bool:
+        return self.min_seconds > 0 and num_samples / SAMPLE_RATE > self.min_seconds
+
+
+def frame_energy(feats: torch.Tensor, smooth_frames: int = 5) -> np.ndarray:
+    """每帧 log-mel 均值作为能量（CMVN 为逐维仿射变换，不影响相对高低），并做滑动平均"""
+    energy = feats.float().mean(dim=-1).cpu().numpy().astype(np.float64)
+    if smooth_frames > 1 and energy.size >= smooth_frames:
+        kernel = np.ones(smooth_frames) / smooth_frames
+        energy = np.convolve(energy, kernel, mode="same")
+    return energy
+
+
+def silence_mask(energy: np.ndarray, ratio: float) -> np.ndarray:
+    """按能量分布的相对阈值标记静音帧"""
+    if energy.size == 0:
+        return np.zeros(0, dtype=bool)
+    low, high = np.percentile(energy, [5, 95])
+    return energy < low + ratio * (high - low)
+
+
+def _silence_midpoints(mask: np.ndarray, min_frames: int) -> List[int]:
+    """长度不少于 min_frames 的静音段中点"""
+    points = []
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start >= min_frames:
+            points.append(int((start + end) // 2))
+    return points
+
+
+def split_at_silences(feats: torch.Tensor, config: LongformConfig) -> List[Tuple[int, int]]:
+    """将 [T, D] 特征切分为连续片段 [(start, end), ...]（帧下标，覆盖整段）
+
+    剩余长度超过上限时，在 (起点 + 目标/2, 起点 + 上限] 内选最接近目标时长的静音中点；
+    没有合适的静音时退化为窗口内能量最低的帧。
+    """
+    num_frames = int(feats.shape[0])
+    target = max(1, int(round(config.target_seconds / FRAME_SHIFT_S)))
+    max_frames = max(target, int(round(config.max_seconds / FRAME_SHIFT_S)))
+    if num_frames <= max_frames:
+        return [(0, num_frames)]
+
+    energy = frame_energy(feats)
+    candidates = np.asarray(
+        _silence_midpoints(silence_mask(energy, config.silence_ratio),
+                           max(1, int(round(config.min_silence_ms / 1000.0 / FRAME_SHIFT_S)))),
+        dtype=np.int64,
+    )
+
+    segments = []
+    start = 0
+    while num_frames - start > max_frames:
+        lo, hi = start + target // 2, start + max_frames
+        inside = candidates[(candidates > lo) & (candidates <= hi)]
+        if inside.size:
+            cut = int(inside[np.argmin(np.abs(inside - (start + target)))])
+        else:
+            cut = lo + 1 + int(np.argmin(energy[lo + 1:hi + 1]))
+        segments.append((start, cut))
+        start = cut
+    segments.append((start, num_frames))
+    return segments
+
+
+def count_emitted_tokens(best_ids: Sequence[int], blank_id: int = 0) -> int:
+    """贪心 CTC 路径中的发射 token 数（合并重复并去掉 blank）"""
+    ids = np.asarray(best_ids, dtype=np.int64)
+    if ids.size == 0:
+        return 0
+    keep = np.ones(ids.size, dtype=bool)
+    keep[1:] = ids[1:] != ids[:-1]
+    return int(np.count_nonzero(keep & (ids != blank_id)))
+
+
+def anchor_words(word_token_counts: Sequence[int], weights: Sequence[float]) -> List[Tuple[int, int]]:
+    """按片段权重（发射 token 数）把词分配到各片段，返回每个片段的词区间 [a, b)
+
+    第 i 个片段的结束位置取累计 token 数最接近 总 token 数 × 累计权重比例 的词边界，
+    区间单调且覆盖全部词，可能为空（如纯静音片段）。
+    """
+    num_words = len(word_token_counts)
+    cum_tokens = np.concatenate(([0], np.cumsum(np.asarray(word_token_counts, dtype=np.float64))))
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.sum() <= 0:
+        weights = np.ones_like(weights)
+    cum_weights = np.cumsum(weights) / weights.sum()
+
+    ranges = []
+    prev = 0
+    for i, frac in enumerate(cum_weights):
+        if i == len(cum_weights) - 1:
+            end = num_words
+        else:
+            goal = frac * cum_tokens[-1]
+            end = prev + int(np.argmin(np.abs(cum_tokens[prev:] - goal)))
+        ranges.append((prev, end))
+        prev = end
+    return ranges
+
+
+def _shift(result: AlignmentResult, offset_s: float) -> List[WordSegment]:
+    return [
+        WordSegment(
+            word=w.word,
+            start=w.start + offset_s,
+            end=w.end + offset_s,
+            phonemes=[
+                PhonemeSegment(phoneme=p.phoneme, start=p.start + offset_s, end=p.end + offset_s,
+                               confidence=p.confidence)
+                for p in w.phonemes
+            ],
+        )
+        for w in result.words
+    ]
+
+
+def stitch_results(
+    results: Sequence[AlignmentResult], offsets_s: Sequence[float], duration: float, trimmed_duration: float = 0.0
+) -> AlignmentResult:
+    """将各片段的对齐结果平移到全局时间轴并拼接"""
+    words = []
+    raw_confidence: List[float] = []
+    for result, offset in zip(results, offsets_s):
+        words.extend(_shift(result, offset))
+        raw_confidence.extend(result.raw_confidence)
+    return AlignmentResult(
+        words=words, duration=duration, raw_confidence=raw_confidence, trimmed_duration=trimmed_duration
+    )
+
+
+def align_longform(
+    aligner,
+    feats: torch.Tensor,
+    text: str,
+    num_samples: int,
+    infer_many: InferManyFn,
+    outputs_hidden: bool,
+    config: LongformConfig,
+    span: Optional[TrimSpan] = None,
+) -> AlignmentResult:
+    """分段对齐长音频，返回全局时间轴上的 AlignmentResult
+
+    feats 与 num_samples 对应（裁剪后的）输入音频；span 给出时时间戳再平移到裁剪前的原始时间轴。
+    """
+    segments = split_at_silences(feats, config)
+    outputs = infer_many([feats[start:end] for start, end in segments])
+
+    ref = aligner.get_reference(text)
+    blank_id = aligner.vocab.blank_id
+    emitted = []
+    for output in outputs:
+        if outputs_hidden:
+            weight, bias = ctc_projection(aligner.model.ctc)
+            best = greedy_token_ids(output, weight, bias)
+        else:
+            best = output.argmax(dim=-1)
+        emitted.append(count_emitted_tokens(best.tolist(), blank_id))
+    if sum(emitted) == 0:
+        emitted = [end - start for start, end in segments]
+    word_ranges = anchor_words([len(g) for g in ref.word_token_groups], emitted)
+
+    results, offsets = [], []
+    for (start, end), output, (a, b) in zip(segments, outputs, word_ranges):
+        if b <= a:
+            continue
+        sub_text = " ".join(ref.words[a:b])
+        # 末段包含 fbank 帧之外的尾部采样
+        seg_samples = (end - start) * SAMPLES_PER_FRAME if end < feats.shape[0] \
+            else max(0, num_samples - start * SAMPLES_PER_FRAME)
+        # 分段子文本只出现一次，不进入参考文本 LRU，避免挤掉常用的整句
+        if outputs_hidden:
+            results.append(aligner.align_hidden(output, sub_text, seg_samples, cache_reference=False))
+        else:
+            results.append(aligner.align_posteriors(output, sub_text, seg_samples, cache_reference=False))
+        offsets.append(start * FRAME_SHIFT_S + (span.offset_s if span is not None else 0.0))
+
+    if span is not None:
+        return stitch_results(results, offsets, span.duration_s, span.trimmed_s)
+    return stitch_results(results, offsets, max(0.0, float(num_samples) / SAMPLE_RATE))
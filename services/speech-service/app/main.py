@@ -1,68 +1,359 @@
 import os
 import io
+import json
+import logging
 import uuid
-import shutil
-import tempfile
-from typing import Optional
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+import numpy as np
 
-from .alignment import run_wenet_alignment
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from .audio import AudioDecodeError, AudioTooLarge, decode_audio_bytes, max_audio_size, read_upload_limited
+from .executor import ClientDisconnected, ServiceOverloaded, get_executor, shutdown_executor
+from .metrics import (
+    CONTENT_TYPE_LATEST,
+    IN_FLIGHT,
+    PROMETHEUS_AVAILABLE,
+    REQUESTS,
+    STAGE_DECODE,
+    STAGE_SCORING,
+    STAGE_SERIALIZE,
+    STAGE_UPLOAD_READ,
+    observe_audio,
+    render_latest,
+)
 from .phoneme_confidence import compute_assessment_scores
+from .probes import ProbeConfig, get_deep_check, get_readiness, preload_enabled
+from .profiling import PROFILE_HEADER, ProfilingConfig, profile_requested, run_profiled
+from .registry import get_registry
+from .result_cache import get_result_cache, result_key
+from .results import AlignmentResult
+from .timing import StageTimer, stage
 
 
 app = FastAPI(title="Sylis Speech Service (WeNet)", version="0.1.0")
 
 
+@app.on_event("startup")
+def load_models() -> None:
+    """服务启动时加载一次模型，后续请求共享同一个对齐器"""
+    # 日志在服务启动时配置，导入 app 不修改 root logger
+    logging.basicConfig(level=logging.WARNING)
+    if not preload_enabled():
+        return
+    executor = get_executor()
+    if executor.config.kind == "process":
+        # 进程池模式下由各子进程自行加载模型，这里提交预热任务让子进程尽早启动
+        get_readiness().status()
+        return
+    try:
+        get_registry().load()
+    except Exception:
+        # 加载失败不阻止服务启动：/readyz 会在后台重试加载，请求到来时也会按需加载
+        pass
+
+
+@app.on_event("shutdown")
+def unload_models() -> None:
+    shutdown_executor()
+    get_registry().unload()
+
+
+# multipart 表单除音频外的字段与边界开销上限
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_upload(request: Request, call_next):
+    """在解析表单之前按 Content-Length 拒绝过大的上传"""
+    content_length = request.headers.get("content-length")
+    if request.method == "POST" and content_length and content_length.isdigit():
+        if int(content_length) > max_audio_size() + _FORM_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "audio file too large"})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def track_assessment_requests(request: Request, call_next):
+    """评测接口的进行中请求数与按状态码的请求计数"""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        REQUESTS.labels(status=str(status)).inc()
+
+
+def _decode_upload(
+    contents: bytearray, text: str, enable_phoneme: bool, timer: StageTimer
+) -> Tuple[np.ndarray, int, str]:
+    """解码上传音频（WAV / FLAC / Ogg / MP3，按魔数识别）并计算结果缓存键"""
+    with timer.stage(STAGE_DECODE):
+        samples, sample_rate = decode_audio_bytes(contents)
+    model = get_registry().model_identity()
+    return samples, sample_rate, result_key(samples, sample_rate, text, enable_phoneme, model)
+
+
+def run_wenet_alignment(samples: np.ndarray, text: str, language: str, sample_rate: int) -> AlignmentResult:
+    """WeNet 对齐；对齐模块（torch / WeNet）在首次使用时才导入，不拖慢服务与测试启动"""
+    from .alignment import run_wenet_alignment as _run_wenet_alignment
+
+    return _run_wenet_alignment(samples, text, language=language, sample_rate=sample_rate)
+
+
+def _assess_audio(samples: np.ndarray, sample_rate: int, text: str, language: str, enable_phoneme: bool) -> dict:
+    """对齐 + 评分（CPU 密集，在推理执行器中运行）"""
+    # Run WeNet to obtain word/phoneme alignments (real phoneme alignment)
+    alignment_result = run_wenet_alignment(samples, text, language=language, sample_rate=sample_rate)
+
+    # Compute Azure-like assessment with phoneme confidences
+    with stage(STAGE_SCORING):
+        return compute_assessment_scores(
+            alignment_result=alignment_result,
+            enable_phoneme=enable_phoneme,
+        )
+
+
+def _assess_audio_profiled(
+    samples: np.ndarray,
+    sample_rate: int,
+    text: str,
+    language: str,
+    enable_phoneme: bool,
+    dump_dir: Optional[str],
+    torch_trace: bool,
+) -> Tuple[dict, StageTimer, Optional[str]]:
+    """profile 模式：在工作线程/进程内记录分阶段计时（可选写出 trace）"""
+    return run_profiled(
+        _assess_audio, samples, sample_rate, text, language, enable_phoneme,
+        dump_dir=dump_dir, torch_trace=torch_trace,
+    )
+
+
+def _model_info() -> dict:
+    return {
+        "engine": "WeNet",
+        "description": "使用WeNet真实模型进行对齐",
+        "modelStatus": "✅ WeNet模型"
+    }
+
+
 @app.post("/api/pronunciation/assess")
 async def pronunciation_assess(
-    audio: UploadFile = File(..., description="WAV audio file, mono, 16k preferred"),
+    request: Request,
+    audio: UploadFile = File(..., description="Audio file (WAV, FLAC, Ogg Opus/Vorbis or MP3), mono, 16k preferred"),
     text: str = Form(..., description="Reference text to align"),
     language: str = Form("en-US"),
     enable_phoneme: bool = Form(True),
+    profile: Optional[bool] = Form(None, description="Return a per-stage timing breakdown (requires PROFILING_ENABLED)"),
 ) -> JSONResponse:
     if not text or not text.strip():
         raise HTTPException(status_code=400, detail="text is required")
-    if not audio.filename.lower().endswith((".wav", )):
-        raise HTTPException(status_code=400, detail="Only .wav is supported in this minimal service")
 
-    session_dir = tempfile.mkdtemp(prefix="sylis_speech_")
-    wav_path = os.path.join(session_dir, "audio.wav")
+    profiling = ProfilingConfig.from_env()
+    profiled = profile_requested(profiling, request.headers.get(PROFILE_HEADER), profile)
+    request_start = time.perf_counter()
 
     try:
-        # Save upload to disk
-        contents = await audio.read()
-        with open(wav_path, "wb") as f:
-            f.write(contents)
+        # 分块读入内存并限制大小，直接在内存中解码（不落盘）
+        timer = StageTimer()
+        with timer.stage(STAGE_UPLOAD_READ):
+            contents = await read_upload_limited(audio, max_audio_size())
 
-        # Run WeNet to obtain word/phoneme alignments (real phoneme alignment)
-        alignment_result = run_wenet_alignment(wav_path, text, language=language)
-
-        # Compute Azure-like assessment with phoneme confidences
-        assessment = compute_assessment_scores(
-            alignment_result=alignment_result,
-            enable_phoneme=enable_phoneme,
+        # 在线程中解码（格式由文件头识别，不依赖文件名）并对 PCM 内容做哈希，作为结果缓存键
+        loop = asyncio.get_running_loop()
+        samples, sample_rate, key = await loop.run_in_executor(
+            None, _decode_upload, contents, text, enable_phoneme, timer
         )
 
+        async def compute() -> dict:
+            # 在有界执行器中运行推理，避免阻塞事件循环；队列满时快速失败
+            start = time.perf_counter()
+            result = await get_executor().run(
+                _assess_audio, samples, sample_rate, text, language, enable_phoneme,
+                is_disconnected=request.is_disconnected,
+            )
+            observe_audio(samples.shape[-1] / float(sample_rate), time.perf_counter() - start)
+            return result
+
+        cache = get_result_cache()
+        trace = None
+        if profiled:
+            # profile 请求需要真实执行，跳过结果缓存；工作线程/进程内的阶段计时随结果返回
+            start = time.perf_counter()
+            assessment, worker_timer, trace = await get_executor().run(
+                _assess_audio_profiled, samples, sample_rate, text, language, enable_phoneme,
+                profiling.dump_dir, profiling.torch_trace,
+                is_disconnected=request.is_disconnected,
+            )
+            observe_audio(samples.shape[-1] / float(sample_rate), time.perf_counter() - start)
+            timer.merge(worker_timer)
+            cache_status = "bypass"
+        else:
+            # 重传/重放的相同请求直接命中缓存，并发的相同请求共享一次计算
+            assessment, cache_status = await cache.get_or_compute(key, compute, retry_on=(ClientDisconnected,))
+
         # 添加模型使用状态信息 - 只使用WeNet
-        assessment["modelInfo"] = {
-            "engine": "WeNet",
-            "description": "使用WeNet真实模型进行对齐",
-            "modelStatus": "✅ WeNet模型"
+        assessment["modelInfo"] = _model_info()
+        assessment["cache"] = {
+            "status": cache_status,
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "coalesced": cache.coalesced,
         }
+        assessment["timings"] = timer.as_dict()
+        if profiled:
+            assessment["timings"]["stages"] = timer.breakdown()
+            assessment["timings"]["totalMs"] = round((time.perf_counter() - request_start) * 1000.0, 3)
+            if trace:
+                assessment["timings"]["trace"] = trace
 
-        return JSONResponse(content=assessment)
+        with stage(STAGE_SERIALIZE):
+            return JSONResponse(content=assessment)
 
+    except AudioTooLarge:
+        raise HTTPException(status_code=413, detail="audio file too large")
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"invalid audio: {e}")
+    except ServiceOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail="service overloaded, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ClientDisconnected:
+        # 客户端已断开，响应不会被读取
+        return JSONResponse(status_code=499, content={"detail": "client disconnected"})
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"internal error: {e}")
-    finally:
+
+
+_stream_slots: Optional[threading.BoundedSemaphore] = None
+_stream_slots_lock = threading.Lock()
+
+
+def _stream_semaphore() -> threading.BoundedSemaphore:
+    """流式会话并发上限（STREAM_MAX_SESSIONS），首次建立流式连接时创建"""
+    global _stream_slots
+    if _stream_slots is None:
+        with _stream_slots_lock:
+            if _stream_slots is None:
+                from .streaming import stream_max_sessions
+
+                _stream_slots = threading.BoundedSemaphore(stream_max_sessions())
+    return _stream_slots
+
+
+def _finish_stream(session, enable_phoneme: bool) -> dict:
+    """结束流式会话：处理剩余 chunk、对齐并评分"""
+    return compute_assessment_scores(
+        alignment_result=session.result(),
+        enable_phoneme=enable_phoneme,
+    )
+
+
+async def _close_stream(websocket: WebSocket, content: dict, code: int) -> None:
+    try:
+        await websocket.send_json(content)
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
+
+@app.websocket("/ws/pronunciation/assess")
+async def pronunciation_assess_stream(websocket: WebSocket) -> None:
+    """流式发音评估
+
+    协议：
+    1. 客户端先发送 JSON：{"text": "...", "language": "en-US", "enable_phoneme": true}
+    2. 随后以二进制消息发送 16kHz 单声道 16-bit PCM（小端）
+    3. 说完后发送 JSON：{"event": "end"}
+    4. 服务端返回与 /api/pronunciation/assess 相同结构的评估结果并关闭连接
+
+    音频累计超过 MAX_AUDIO_SIZE 字节时返回错误并以 1009 关闭；chunk 推理与最终评分
+    在有界执行器中执行，队列满时返回错误并以 1013 关闭。
+    """
+    from .streaming import StreamingSession, stream_chunk_size, stream_num_left_chunks
+
+    await websocket.accept()
+    slots = _stream_semaphore()
+    if not slots.acquire(blocking=False):
+        await websocket.send_json({"error": "service overloaded, please retry later"})
+        await websocket.close(code=1013)
+        return
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        start = await websocket.receive_json()
+        text = str(start.get("text", "")).strip()
+        if not text:
+            await websocket.send_json({"error": "text is required"})
+            await websocket.close(code=1008)
+            return
+        enable_phoneme = bool(start.get("enable_phoneme", True))
+
+        aligner = await loop.run_in_executor(None, get_registry().get_aligner)
+        if aligner.model is None:
+            # 流式 chunk 推理依赖 PyTorch 编码器的注意力/卷积缓存
+            await websocket.send_json({"error": "streaming requires WENET_BACKEND=torch"})
+            await websocket.close(code=1011)
+            return
+        session = StreamingSession(
+            aligner, text,
+            chunk_size=stream_chunk_size(),
+            num_left_chunks=stream_num_left_chunks(),
+            max_bytes=max_audio_size(),
+        )
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                # 编码器按 chunk 增量计算，在有界执行器中（本进程内）执行，队列满时快速失败
+                await executor.run(session.accept_pcm16, message["bytes"], local=True)
+            elif message.get("text") is not None:
+                try:
+                    event = json.loads(message["text"]).get("event")
+                except (ValueError, AttributeError):
+                    event = None
+                if event == "end":
+                    break
+
+        assessment = await executor.run(_finish_stream, session, enable_phoneme, local=True)
+        assessment["modelInfo"] = _model_info()
+        await websocket.send_json(assessment)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except AudioTooLarge:
+        await _close_stream(websocket, {"error": "audio too large"}, code=1009)
+    except ServiceOverloaded as e:
+        await _close_stream(
+            websocket, {"error": "service overloaded, please retry later", "retryAfter": e.retry_after}, code=1013
+        )
+    except Exception as e:
         try:
-            shutil.rmtree(session_dir, ignore_errors=True)
+            await websocket.send_json({"error": f"internal error: {e}"})
+            await websocket.close(code=1011)
         except Exception:
             pass
+    finally:
+        slots.release()
 
 
 @app.get("/")
@@ -70,13 +361,63 @@ def root() -> dict:
     return {"service": "sylis-speech-wenet", "status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus 指标（需安装 prometheus_client）"""
+    if not PROMETHEUS_AVAILABLE:
+        return JSONResponse(status_code=503, content={"detail": "prometheus_client is not installed"})
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/livez")
+async def livez() -> dict:
+    """存活探针：事件循环能响应即视为存活"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readyz(deep: Optional[bool] = None):
+    """就绪探针：不阻塞等待模型加载；deep=true 时附加按间隔缓存的合成推理检查"""
+    ready, content = get_readiness().status()
+    if not ready:
+        return JSONResponse(status_code=503, content=content)
+
+    if deep is None:
+        deep = ProbeConfig.from_env().deep_by_default
+    # 深度检查使用本进程内的模型：懒加载尚未加载或进程池模式下跳过
+    if not deep or not get_registry().is_loaded:
+        return content
+
+    check = get_deep_check()
+    result = check.result() if check.is_fresh() else await run_in_threadpool(check.result)
+    if not result.get("ok"):
+        return JSONResponse(status_code=503, content={"status": "degraded", "deep": result})
+    return {"status": "ready", "deep": result}
+
+
 @app.get("/health")
 def health() -> dict:
-    from .alignment import WeNetAlignment
+    registry = get_registry()
 
-    # 检查WeNet模型状态
+    # 检查WeNet模型状态（只读注册表，不在健康检查中触发加载）
     try:
-        aligner = WeNetAlignment()
+        if not registry.is_loaded:
+            ready, content = get_readiness().status()
+            if not ready:
+                raise RuntimeError(content.get("error") or f"model {content['status']}")
+            # 懒加载尚未加载，或模型只加载在进程池子进程中
+            return {
+                "status": "healthy",
+                "model": "WeNet",
+                "modelInfo": {
+                    "engine": "WeNet",
+                    "state": content.get("model", "worker"),
+                    "resultCache": get_result_cache().stats(),
+                    "description": "WeNet模型运行正常"
+                }
+            }
+        aligner = registry.get_aligner()
+        stats = registry.stats()
         return {
             "status": "healthy",
             "model": "WeNet",
@@ -84,6 +425,15 @@ def health() -> dict:
                 "engine": "WeNet",
                 "vocabSize": aligner.vocab_size,
                 "modelPath": aligner.model_path,
+                "backend": stats["backend"],
+                "precision": stats["precision"],
+                "loadMode": stats["loadMode"],
+                "loadTimeMs": stats["loadTimeMs"],
+                "modelBytes": stats["modelBytes"],
+                "rssBytes": stats["rssBytes"],
+                "memory": stats["memory"],
+                "referenceCache": stats["references"],
+                "resultCache": get_result_cache().stats(),
                 "description": "WeNet模型运行正常"
             }
         }
@@ -0,0 +1,148 @@
+"""
+Prometheus 指标
+
+/metrics 以 Prometheus 文本格式暴露：
+- sylis_stage_seconds{stage}：各流水线阶段耗时直方图（上传读取、解码、重采样、fbank+CMVN、
+  encoder 前向、CTC 对数后验、Viterbi、词/音素分段、G2P、评分、JSON 序列化）；
+- 请求计数、进行中的请求、处理的音频秒数与实时率（RTF）；
+- 抓取时读取的状态：推理队列深度、微批处理队列深度、各缓存命中率、进程 RSS。
+
+prometheus_client 为可选依赖（pip install .[metrics]），未安装时所有记录函数为空操作，
+/metrics 返回 503。
+"""
+from typing import Any, Callable, Optional, Tuple
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_UPLOAD_READ = "upload_read"
+STAGE_DECODE = "decode"
+STAGE_RESAMPLE = "resample"
+STAGE_FBANK = "fbank"
+STAGE_ENCODER = "encoder"
+STAGE_CTC = "ctc"
+STAGE_VITERBI = "viterbi"
+STAGE_SEGMENTATION = "segmentation"
+STAGE_G2P = "g2p"
+STAGE_SCORING = "scoring"
+STAGE_SERIALIZE = "serialize"
+
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+
+
+class _NoopMetric:
+    """prometheus_client 不可用时的占位指标"""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1.0) -> None:
+        pass
+
+    def dec(self, amount: float = 1.0) -> None:
+        pass
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        pass
+
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_SECONDS = Histogram(
+        "sylis_stage_seconds", "Pipeline stage latency in seconds", ["stage"], buckets=_STAGE_BUCKETS
+    )
+    REQUESTS = Counter("sylis_requests_total", "Assessment requests by HTTP status", ["status"])
+    IN_FLIGHT = Gauge("sylis_requests_in_flight", "Assessment requests currently being handled")
+    AUDIO_SECONDS = Counter("sylis_audio_seconds_total", "Seconds of audio assessed (cache misses)")
+    REAL_TIME_FACTOR = Histogram(
+        "sylis_real_time_factor", "Inference wall time divided by audio duration", buckets=_RTF_BUCKETS
+    )
+    INFERENCE_QUEUE_DEPTH = Gauge("sylis_inference_queue_depth", "Inference tasks waiting for a worker")
+    INFERENCE_INFLIGHT = Gauge("sylis_inference_inflight", "Inference tasks submitted and not finished")
+    BATCHER_QUEUE_DEPTH = Gauge("sylis_batcher_queue_depth", "Encoder requests waiting in the micro-batcher")
+    CACHE_HIT_RATIO = Gauge("sylis_cache_hit_ratio", "Cache hit ratio", ["cache"])
+    PROCESS_RSS = Gauge("sylis_process_rss_bytes", "Resident set size of the service process")
+else:
+    STAGE_SECONDS = REQUESTS = IN_FLIGHT = AUDIO_SECONDS = REAL_TIME_FACTOR = _NoopMetric()
+    INFERENCE_QUEUE_DEPTH = INFERENCE_INFLIGHT = BATCHER_QUEUE_DEPTH = _NoopMetric()
+    CACHE_HIT_RATIO = PROCESS_RSS = _NoopMetric()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """记录阶段耗时（通常经由 app.timing.stage 调用）"""
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+
+def observe_audio(audio_seconds: float, inference_seconds: float) -> None:
+    """记录一次推理处理的音频时长与实时率"""
+    if audio_seconds <= 0:
+        return
+    AUDIO_SECONDS.inc(audio_seconds)
+    REAL_TIME_FACTOR.observe(inference_seconds / audio_seconds)
+
+
+# ---------------------- 抓取时读取的状态 ----------------------
+def _inference_depths() -> Tuple[int, int]:
+    from .executor import current_executor
+
+    executor = current_executor()
+    if executor is None:
+        return 0, 0
+    inflight = executor.inflight
+    return max(0, inflight - executor.config.workers), inflight
+
+
+def _batcher_depth() -> float:
+    from .registry import get_registry
+
+    return float(get_registry().batcher_queue_depth())
+
+
+def _component_hit_ratio(name: str) -> float:
+    from .registry import get_registry
+
+    stats = get_registry().component_stats(name)
+    if not stats:
+        return 0.0
+    if "hitRatio" in stats:
+        return float(stats["hitRatio"])
+    # 发音词典：LRU 与磁盘词典命中之外都需调用 G2P
+    hits = stats.get("hits", 0) + stats.get("storeHits", 0)
+    lookups = hits + stats.get("g2pCalls", 0)
+    return hits / lookups if lookups else 0.0
+
+
+def _result_cache_hit_ratio() -> float:
+    from .result_cache import get_result_cache
+
+    return float(get_result_cache().stats()["hitRatio"])
+
+
+def _rss() -> float:
+    from .registry import current_rss_bytes
+
+    rss: Optional[int] = current_rss_bytes()
+    return float(rss) if rss is not None else 0.0
+
+
+INFERENCE_QUEUE_DEPTH.set_function(lambda: _inference_depths()[0])
+INFERENCE_INFLIGHT.set_function(lambda: _inference_depths()[1])
+BATCHER_QUEUE_DEPTH.set_function(_batcher_depth)
+CACHE_HIT_RATIO.labels(cache="result").set_function(_result_cache_hit_ratio)
+CACHE_HIT_RATIO.labels(cache="reference").set_function(lambda: _component_hit_ratio("references"))
+CACHE_HIT_RATIO.labels(cache="lexicon").set_function(lambda: _component_hit_ratio("lexicon"))
+PROCESS_RSS.set_function(_rss)
+
+
+def render_latest() -> bytes:
+    """当前指标的 Prometheus 文本格式"""
+    if not PROMETHEUS_AVAILABLE:
+        raise RuntimeError("prometheus_client is not installed")
+    return generate_latest()
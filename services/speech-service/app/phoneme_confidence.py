@@ -1,6 +1,6 @@
 from typing import Dict, List
 
-from .alignment import AlignmentResult, WordSegment, PhonemeSegment
+from .results import AlignmentResult, WordSegment, PhonemeSegment
 
 
 EXPECTED_PHONE_MS = 200.0  # simple global expectation for minimal viable scoring (adjusted for realistic phoneme duration)
@@ -65,6 +65,7 @@ def compute_assessment_scores(alignment_result: AlignmentResult, enable_phoneme:
         "fluencyScore": fluency,
         "completenessScore": completeness,
         "duration": round(alignment_result.duration, 3),
+        "trimmedDuration": round(alignment_result.trimmed_duration, 3),
         "words": words_out,
     }
 
@@ -0,0 +1,72 @@
+"""
+推理精度模式
+
+模型加载时按 WENET_PRECISION 选择：
+- fp32（默认）：原始精度；
+- int8：对 encoder 中的 Linear 层做动态 int8 量化（仅 CPU），CTC 头保持 fp32；
+- bf16：前向时启用 CPU bfloat16 autocast，CPU 不支持时回退到 fp32。
+
+实际生效的模式由 /health 报告；scripts/eval_precision.py 用于比较各模式的延迟与评分漂移。
+"""
+import contextlib
+import logging
+import os
+import warnings
+from typing import Any, ContextManager
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+PRECISION_FP32 = "fp32"
+PRECISION_INT8 = "int8"
+PRECISION_BF16 = "bf16"
+PRECISION_MODES = (PRECISION_FP32, PRECISION_INT8, PRECISION_BF16)
+
+
+def precision_mode() -> str:
+    return os.getenv("WENET_PRECISION", PRECISION_FP32).lower()
+
+
+def bf16_supported() -> bool:
+    """CPU 是否支持 bfloat16 计算（AVX512-BF16 / AMX 等）"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def apply_precision(model: Any, mode: str, device: torch.device) -> str:
+    """按精度模式处理已加载的模型，返回实际生效的模式"""
+    if mode not in PRECISION_MODES:
+        raise ValueError(f"unknown WENET_PRECISION: {mode} (expected one of {', '.join(PRECISION_MODES)})")
+
+    if mode == PRECISION_INT8:
+        if device.type != "cpu":
+            logger.warning("int8 dynamic quantization is CPU-only, falling back to fp32")
+            return PRECISION_FP32
+        try:
+            from torch.ao.quantization import quantize_dynamic
+        except ImportError:  # torch < 1.10
+            from torch.quantization import quantize_dynamic
+
+        with warnings.catch_warnings():
+            # 新版 torch 对 eager 模式量化 API 给出弃用提示，功能不受影响
+            warnings.simplefilter("ignore")
+            model.encoder = quantize_dynamic(model.encoder, {torch.nn.Linear}, dtype=torch.qint8)
+        return PRECISION_INT8
+
+    if mode == PRECISION_BF16:
+        if device.type == "cpu" and not bf16_supported():
+            logger.warning("CPU does not support bfloat16, falling back to fp32")
+            return PRECISION_FP32
+        return PRECISION_BF16
+
+    return PRECISION_FP32
+
+
+def inference_context(mode: str, device: torch.device) -> ContextManager:
+    """前向计算的 autocast 上下文（仅 bf16 模式生效）"""
+    if mode == PRECISION_BF16:
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
@@ -0,0 +1,238 @@
+"""
+预 fork 多 worker 服务
+
+uvicorn --workers N 会让每个 worker 各自加载一份 conformer。这里改为：
+
+- 主进程加载模型、G2P 与发音词典等查找表，并绑定监听 socket；
+- gc.freeze() 后再 fork 出 N 个 worker，模型权重以写时复制的方式在 worker 间共享
+  （冻结后的对象不再被垃圾回收遍历，避免 GC 写对象头导致页面被复制）；
+- 每个 worker 设置自己的 torch intra-op / inter-op 线程数，可选绑定到一组 CPU；
+- 主进程定期从 /proc/<pid>/smaps_rollup 汇报各 worker 的 RSS、PSS 与共享内存，异常退出的 worker 会被重新 fork。
+
+主进程加载模型时只用单线程，避免 OpenMP 线程池在 fork 后失效；ONNX 后端的 onnxruntime 会话
+不能跨 fork 使用，由各 worker 自行创建。
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from .registry import get_registry, memory_usage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreforkConfig:
+    host: str = "0.0.0.0"
+    port: int = 8080
+    workers: int = 2
+    # 每个 worker 的 torch intra-op 线程数，0 表示使用分到的全部 CPU
+    torch_threads: int = 0
+    interop_threads: int = 1
+    # CPU 绑定：空为不绑定，auto 为平均切分可用 CPU，或用 ; 分隔每个 worker 的 CPU 列表（如 0-3;4-7）
+    cpu_affinity: str = ""
+    # 内存汇报间隔（秒），0 表示只在启动后汇报一次
+    memory_report_s: float = 60.0
+    backlog: int = 2048
+
+    @classmethod
+    def from_env(cls) -> "PreforkConfig":
+        return cls(
+            host=os.getenv("SERVE_HOST", "0.0.0.0"),
+            port=int(os.getenv("SERVE_PORT", "8080")),
+            workers=max(1, int(os.getenv("SERVE_WORKERS", "2"))),
+            torch_threads=max(0, int(os.getenv("SERVE_TORCH_THREADS", "0"))),
+            interop_threads=max(1, int(os.getenv("SERVE_TORCH_INTEROP_THREADS", "1"))),
+            cpu_affinity=os.getenv("SERVE_CPU_AFFINITY", "").strip(),
+            memory_report_s=max(0.0, float(os.getenv("SERVE_MEMORY_REPORT_S", "60"))),
+        )
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """解析 0-3,8,10-11 形式的 CPU 列表"""
+    cpus: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def cpu_sets(workers: int, spec: str, available: Sequence[int]) -> List[Optional[List[int]]]:
+    """每个 worker 绑定的 CPU（None 表示不绑定）"""
+    if not spec:
+        return [None] * workers
+    if spec == "auto":
+        available = sorted(available)
+        if len(available) < workers:
+            raise ValueError(f"cannot pin {workers} workers to {len(available)} CPUs")
+        per_worker = len(available) // workers
+        return [available[i * per_worker:(i + 1) * per_worker] for i in range(workers)]
+    sets = [parse_cpu_list(group) for group in spec.split(";") if group.strip()]
+    if len(sets) != workers:
+        raise ValueError(f"SERVE_CPU_AFFINITY lists {len(sets)} CPU sets for {workers} workers")
+    return sets
+
+
+def worker_threads(config: PreforkConfig, cpus: Optional[List[int]]) -> int:
+    """worker 的 torch intra-op 线程数：绑定的 CPU 数，不绑定时平分全部 CPU"""
+    if config.torch_threads > 0:
+        return config.torch_threads
+    return len(cpus) if cpus else max(1, (os.cpu_count() or 1) // config.workers)
+
+
+def _available_cpus() -> List[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def preload() -> None:
+    """在主进程中加载模型与查找表，随后冻结 GC 以便 fork 后共享"""
+    import torch
+
+    # 主进程只用单线程，避免 fork 前创建 OpenMP 线程池
+    torch.set_num_threads(1)
+    registry = get_registry()
+    registry.load()
+    from .backends import backend_kind
+
+    if backend_kind() == "torch":
+        registry.get_backend()
+    # 在 fork 前导入应用（含对齐模块），其代码对象同样由 worker 共享
+    from . import main  # noqa: F401
+
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded model in master (pid {os.getpid()}), {gc.get_freeze_count()} objects frozen")
+
+
+def _run_worker(index: int, sock: socket.socket, config: PreforkConfig, cpus: Optional[List[int]]) -> None:
+    """worker 子进程：设置 CPU 绑定与线程数后在共享 socket 上运行 uvicorn"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+
+    import torch
+    import uvicorn
+
+    threads = worker_threads(config, cpus)
+    # 推理执行器按 INFERENCE_TORCH_THREADS 设置 intra-op 线程数
+    os.environ["INFERENCE_TORCH_THREADS"] = str(threads)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(config.interop_threads)
+    except RuntimeError as e:
+        logger.warning(f"Worker {index}: cannot set inter-op threads: {e}")
+    logger.info(f"Worker {index} (pid {os.getpid()}) started: cpus={cpus or 'all'} torch_threads={threads}")
+
+    from .main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    server.run(sockets=[sock])
+
+
+def _bind(config: PreforkConfig) -> socket.socket:
+    family = socket.AF_INET6 if ":" in config.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.host, config.port))
+    sock.listen(config.backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _log_memory(workers: Dict[int, int]) -> None:
+    usages = {index: memory_usage(pid) for index, pid in sorted(workers.items())}
+    master = memory_usage()
+    if master is None or any(u is None for u in usages.values()):
+        logger.info("Memory report unavailable (needs /proc/<pid>/smaps_rollup)")
+        return
+    mb = 1024 * 1024
+    logger.info(
+        f"master pid {os.getpid()}: rss {master['rssBytes'] / mb:.0f}MB pss {master['pssBytes'] / mb:.0f}MB"
+    )
+    for index, usage in usages.items():
+        logger.info(
+            f"worker {index} pid {workers[index]}: rss {usage['rssBytes'] / mb:.0f}MB "
+            f"pss {usage['pssBytes'] / mb:.0f}MB shared {usage['sharedBytes'] / mb:.0f}MB "
+            f"private {usage['privateBytes'] / mb:.0f}MB"
+        )
+    total_pss = master["pssBytes"] + sum(u["pssBytes"] for u in usages.values())
+    logger.info(f"total pss {total_pss / mb:.0f}MB for {len(usages)} workers")
+
+
+def serve(config: Optional[PreforkConfig] = None) -> None:
+    """主进程：加载模型、绑定 socket、fork worker 并监督其运行"""
+    config = config or PreforkConfig.from_env()
+    sets = cpu_sets(config.workers, config.cpu_affinity, _available_cpus())
+    preload()
+    sock = _bind(config)
+    logger.info(f"Serving on {config.host}:{config.port} with {config.workers} pre-forked workers")
+
+    workers: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(index, sock, config, sets[index])
+            except Exception as e:
+                logger.error(f"Worker {index} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[index] = pid
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in workers.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(config.workers):
+        spawn(index)
+
+    next_report = time.monotonic() + min(10.0, config.memory_report_s or 10.0)
+    reported = False
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            index = next((i for i, p in workers.items() if p == pid), None)
+            if index is not None:
+                del workers[index]
+                if not stopping:
+                    logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+                    # 避免持续崩溃时频繁 fork
+                    time.sleep(1.0)
+                    spawn(index)
+            continue
+        if not stopping and time.monotonic() >= next_report and (config.memory_report_s > 0 or not reported):
+            _log_memory(workers)
+            reported = True
+            next_report = time.monotonic() + (config.memory_report_s or float("inf"))
+        time.sleep(0.2)
+    sock.close()
+    logger.info("All workers stopped")
@@ -0,0 +1,256 @@
+"""
+存活 / 就绪探针
+
+/livez 与 /readyz 只读取缓存的状态，不会阻塞等待模型加载，开销在微秒级，
+适合 Kubernetes 每隔几秒调用。
+
+可选的深度检查（/readyz?deep=true 或 READYZ_DEEP=true）用一段合成音频跑一次
+特征提取 + 编码器前向，结果缓存 READYZ_DEEP_INTERVAL_S 秒；同一时间只有一个探针执行检查，
+其余探针直接返回上一次的结果。
+
+就绪状态按加载方式区分：
+- 线程池模式：模型未加载或加载失败时在后台线程加载，间隔 READYZ_LOAD_RETRY_S 秒重试；
+- WENET_PRELOAD=false（懒加载）：模型尚未加载时视为就绪，由首个请求加载；
+- 进程池模式：主进程不加载模型，就绪状态来自提交到进程池的预热任务（确认子进程已加载模型）。
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 合成输入：0.5 秒 16kHz 的正弦 + 噪声
+_SYNTHETIC_SAMPLES = 8000
+
+
+@dataclass
+class ProbeConfig:
+    # /readyz 默认是否执行深度检查
+    deep_by_default: bool = False
+    # 深度检查结果的缓存时间（秒）
+    deep_interval_s: float = 60.0
+    # 后台加载 / 子进程预热的重试间隔（秒）
+    load_retry_s: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "ProbeConfig":
+        return cls(
+            deep_by_default=os.getenv("READYZ_DEEP", "false").lower() in ("1", "true", "yes"),
+            deep_interval_s=max(0.0, float(os.getenv("READYZ_DEEP_INTERVAL_S", "60"))),
+            load_retry_s=max(0.0, float(os.getenv("READYZ_LOAD_RETRY_S", "10"))),
+        )
+
+
+def preload_enabled() -> bool:
+    """WENET_PRELOAD=false 时模型在首个请求时加载"""
+    return os.getenv("WENET_PRELOAD", "true").lower() not in ("0", "false", "no")
+
+
+def _synthetic_waveform():
+    import torch
+
+    rng = np.random.default_rng(0)
+    t = np.arange(_SYNTHETIC_SAMPLES) / 16000.0
+    samples = 0.1 * np.sin(2 * np.pi * 220.0 * t) + 0.01 * rng.standard_normal(_SYNTHETIC_SAMPLES)
+    return torch.from_numpy(samples.astype(np.float32))
+
+
+class DeepCheck:
+    """按间隔缓存的合成推理检查"""
+
+    def __init__(self, registry: Any, interval_s: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.registry = registry
+        self.interval_s = interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self.runs = 0
+
+    def is_fresh(self) -> bool:
+        return self._checked_at is not None and self._clock() - self._checked_at < self.interval_s
+
+    def result(self) -> Dict[str, Any]:
+        """返回缓存的检查结果；过期时（且没有其它探针正在检查）重新执行"""
+        if self.is_fresh():
+            return self._result
+        if not self._lock.acquire(blocking=False):
+            # 其它探针正在检查：返回上一次的结果，首次检查期间视为通过
+            return self._result or {"ok": True, "pending": True}
+        try:
+            if not self.is_fresh():
+                self._result = self._run()
+                self._checked_at = self._clock()
+            return self._result
+        finally:
+            self._lock.release()
+
+    def _run(self) -> Dict[str, Any]:
+        self.runs += 1
+        if not self.registry.is_loaded:
+            return {"ok": False, "error": f"model {self.registry.state}"}
+        start = time.perf_counter()
+        try:
+            aligner = self.registry.get_aligner()
+            backend = self.registry.get_backend()
+            backend.check_ready()
+            feats = aligner.compute_features(_synthetic_waveform())
+            output = backend.forward([feats])[0]
+            if output.shape[0] == 0 or not bool(output.isfinite().all()):
+                raise RuntimeError("encoder produced empty or non-finite output")
+        except Exception as e:
+            logger.error(f"Deep readiness check failed: {e}")
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "latencyMs": round((time.perf_counter() - start) * 1000.0, 2)}
+
+
+def worker_model_state() -> Dict[str, Any]:
+    """在进程池子进程中执行：返回模型状态，未加载（如初始化时加载失败）时重试加载"""
+    from .registry import get_registry
+
+    registry = get_registry()
+    try:
+        registry.load()
+    except Exception:
+        pass
+    return {"state": registry.state, "error": registry.last_error}
+
+
+class ModelReadiness:
+    """模型就绪状态，探针调用时不阻塞，需要加载时在后台进行"""
+
+    def __init__(
+        self,
+        registry: Any,
+        get_executor: Optional[Callable[[], Any]] = None,
+        preload: bool = True,
+        retry_s: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.registry = registry
+        # 每次探针时取当前的执行器（关闭后会重新创建）
+        self._get_executor = get_executor
+        self.preload = preload
+        self.retry_s = retry_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        self._load_at: Optional[float] = None
+        self._warmup: Optional[Future] = None
+        self._warmup_at: Optional[float] = None
+        self._worker: Optional[Dict[str, Any]] = None
+
+    def status(self) -> Tuple[bool, Dict[str, Any]]:
+        """返回 (是否就绪, 探针响应内容)"""
+        executor = self._get_executor() if self._get_executor is not None else None
+        if executor is not None and executor.config.kind == "process":
+            return self._worker_status(executor)
+
+        state = self.registry.state
+        if state == "loaded":
+            return True, {"status": "ready"}
+        if state == "unloaded" and not self.preload:
+            return True, {"status": "ready", "model": "lazy"}
+        if state != "loading":
+            self._start_load()
+        content = {"status": state}
+        if self.registry.last_error is not None:
+            content["error"] = self.registry.last_error
+        return False, content
+
+    def _start_load(self) -> None:
+        """在后台线程加载模型；同一时间只有一个加载线程，失败后按间隔重试"""
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            now = self._clock()
+            if self._load_at is not None and now - self._load_at < self.retry_s:
+                return
+            self._load_at = now
+            self._loader = threading.Thread(target=self._load, name="model-loader", daemon=True)
+            self._loader.start()
+
+    def _load(self) -> None:
+        try:
+            self.registry.load()
+        except Exception:
+            # 错误已记录在注册表中，由探针报告
+            pass
+
+    def _worker_status(self, executor: Any) -> Tuple[bool, Dict[str, Any]]:
+        from .executor import ServiceOverloaded
+
+        with self._lock:
+            warmup = self._warmup
+            if warmup is not None and warmup.done():
+                self._worker = self._read(warmup)
+            now = self._clock()
+            if warmup is None or (warmup.done() and now - self._warmup_at >= self.retry_s):
+                try:
+                    self._warmup = executor.submit(worker_model_state)
+                    self._warmup_at = now
+                except ServiceOverloaded:
+                    # 队列已满：沿用上一次的结果
+                    pass
+            worker = self._worker
+
+        if worker is None:
+            return False, {"status": "loading"}
+        if worker["state"] == "loaded":
+            return True, {"status": "ready"}
+        content = {"status": worker["state"]}
+        if worker.get("error") is not None:
+            content["error"] = worker["error"]
+        return False, content
+
+    def _read(self, future: Future) -> Optional[Dict[str, Any]]:
+        if future.cancelled():
+            return self._worker
+        error = future.exception()
+        if error is not None:
+            return {"state": "error", "error": str(error)}
+        return future.result()
+
+
+_deep_check: Optional[DeepCheck] = None
+_deep_check_lock = threading.Lock()
+
+
+def get_deep_check() -> DeepCheck:
+    """返回进程级共享的深度检查（基于共享模型注册表）"""
+    global _deep_check
+    if _deep_check is None:
+        with _deep_check_lock:
+            if _deep_check is None:
+                from .registry import get_registry
+
+                _deep_check = DeepCheck(get_registry(), ProbeConfig.from_env().deep_interval_s)
+    return _deep_check
+
+
+_readiness: Optional[ModelReadiness] = None
+_readiness_lock = threading.Lock()
+
+
+def get_readiness() -> ModelReadiness:
+    """返回进程级共享的就绪状态（基于共享模型注册表和推理执行器）"""
+    global _readiness
+    if _readiness is None:
+        with _readiness_lock:
+            if _readiness is None:
+                from .executor import get_executor
+                from .registry import get_registry
+
+                _readiness = ModelReadiness(
+                    get_registry(),
+                    get_executor,
+                    preload=preload_enabled(),
+                    retry_s=ProbeConfig.from_env().load_retry_s,
+                )
+    return _readiness
@@ -0,0 +1,90 @@
+"""
+单请求 profile 模式
+
+服务端开启 PROFILING_ENABLED 后，客户端可通过请求头 X-Sylis-Profile: 1 或表单字段 profile=true
+请求分阶段计时。该请求跳过结果缓存，响应中的 timings 额外包含每个阶段的墙钟 / CPU 毫秒数；
+设置 PROFILE_DIR 时还会在推理工作线程/进程中记录 cProfile（可选 torch profiler 的 Chrome trace），
+写入本地目录供离线分析。
+"""
+import cProfile
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from .timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-sylis-profile"
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+@dataclass
+class ProfilingConfig:
+    enabled: bool = False
+    # trace 输出目录，为空时只返回计时
+    dump_dir: Optional[str] = None
+    # 同时记录 torch profiler 的 Chrome trace
+    torch_trace: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ProfilingConfig":
+        return cls(
+            enabled=os.getenv("PROFILING_ENABLED", "false").lower() in _TRUE_VALUES,
+            dump_dir=os.getenv("PROFILE_DIR") or None,
+            torch_trace=os.getenv("PROFILE_TORCH_TRACE", "false").lower() in _TRUE_VALUES,
+        )
+
+
+def profile_requested(config: ProfilingConfig, header_value: Optional[str], form_value: Optional[bool]) -> bool:
+    """请求是否开启 profile（服务端未启用时忽略客户端的请求）"""
+    if not config.enabled:
+        return False
+    if form_value:
+        return True
+    return (header_value or "").strip().lower() in _TRUE_VALUES
+
+
+def run_profiled(
+    fn: Callable[..., Any],
+    *args: Any,
+    dump_dir: Optional[str] = None,
+    torch_trace: bool = False,
+) -> Tuple[Any, StageTimer, Optional[str]]:
+    """在新的请求计时器下执行 fn，返回 (结果, 计时器, trace 文件前缀)"""
+    timer = StageTimer()
+    profiler = cProfile.Profile() if dump_dir else None
+    torch_prof = None
+    if dump_dir and torch_trace:
+        import torch.profiler
+
+        torch_prof = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True)
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    with timer.activate():
+        if torch_prof is not None:
+            torch_prof.__enter__()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if torch_prof is not None:
+                torch_prof.__exit__(None, None, None)
+    # 工作线程/进程内的总耗时（含未单独计时的部分）
+    timer.add("inference", (time.perf_counter() - start) * 1000.0, (time.process_time() - cpu_start) * 1000.0)
+
+    prefix = None
+    if dump_dir:
+        os.makedirs(dump_dir, exist_ok=True)
+        prefix = os.path.join(dump_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+        profiler.dump_stats(prefix + ".prof")
+        if torch_prof is not None:
+            torch_prof.export_chrome_trace(prefix + ".trace.json")
+        logger.info(f"Profile written to {prefix}.prof")
+    return result, timer, prefix
@@ -0,0 +1,150 @@
+"""
+参考文本编译缓存
+
+同一条朗读文本会被大量学习者重复评估。CompiledReference 把与音频无关的部分
+（token id、扩展 CTC 标签、skip 转移掩码、词边界、每个词的音素）只计算一次，
+并放在有界 LRU 中；每个请求拿到编译结果后直接进入 Viterbi。
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .ctc_head import compact_labels
+from .ctc_viterbi import build_extended_labels, build_skip_mask
+
+
+@dataclass(frozen=True)
+class CompiledReference:
+    text: str
+    words: List[str]
+    token_ids: List[int]
+    token_pieces: List[str]
+    # 插入 blank 的扩展标签序列及其 skip 转移掩码，长度 2L+1
+    ext_labels: np.ndarray
+    skip_mask: np.ndarray
+    # 每个词对应的 token 下标
+    word_token_groups: List[List[int]]
+    # 每个词的 IPA 音素
+    word_phonemes: List[List[str]]
+    # 受限词表后验：需要计算的标签子集（含 blank）及映射到子集下标后的标签
+    label_ids: np.ndarray
+    local_ext_labels: np.ndarray
+    local_token_ids: List[int]
+
+
+def group_tokens_by_word(token_pieces: Sequence[str], num_words: int) -> List[List[int]]:
+    """将 token 分组为词：以 '▁' 开头的 token 视为新词起点，并与词数对齐。
+
+    - 分组不足时补空组占位；
+    - 分组过多时将多余分组合并到最后一组。
+    """
+    if num_words <= 0 or not token_pieces:
+        return []
+
+    groups: List[List[int]] = []
+    current: List[int] = []
+    for idx, piece in enumerate(token_pieces):
+        if piece.startswith('▁') and current:
+            groups.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        groups.append(current)
+
+    if len(groups) < num_words:
+        while len(groups) < num_words:
+            groups.append([])
+    elif len(groups) > num_words:
+        rest: List[int] = []
+        for g in groups[num_words - 1:]:
+            rest.extend(g)
+        groups = groups[:num_words - 1] + [rest]
+    return groups
+
+
+def compile_reference(
+    text: str,
+    token_ids: List[int],
+    token_pieces: List[str],
+    phonemize: Callable[[str], List[str]],
+    blank_id: int = 0,
+) -> CompiledReference:
+    """由分词结果与 G2P 函数构建 CompiledReference。"""
+    words = text.strip().split()
+    ext = build_extended_labels(token_ids, blank_id)
+    ext.setflags(write=False)
+    mask = build_skip_mask(ext, blank_id)
+    mask.setflags(write=False)
+    label_ids, local_ext, local_tokens = compact_labels(token_ids, ext, blank_id)
+    label_ids.setflags(write=False)
+    local_ext.setflags(write=False)
+    return CompiledReference(
+        text=text,
+        words=words,
+        token_ids=list(token_ids),
+        token_pieces=list(token_pieces),
+        ext_labels=ext,
+        skip_mask=mask,
+        word_token_groups=group_tokens_by_word(token_pieces, len(words)),
+        word_phonemes=[list(phonemize(w)) for w in words],
+        label_ids=label_ids,
+        local_ext_labels=local_ext,
+        local_token_ids=local_tokens,
+    )
+
+
+class ReferenceCache:
+    """按参考文本缓存 CompiledReference 的有界 LRU（线程安全）"""
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = max(0, capacity)
+        self._items: "OrderedDict[str, CompiledReference]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ReferenceCache":
+        return cls(int(os.getenv("REFERENCE_CACHE_SIZE", "4096")))
+
+    @staticmethod
+    def key(text: str) -> str:
+        return text.strip()
+
+    def get_or_compile(self, text: str, compile_fn: Callable[[str], CompiledReference]) -> CompiledReference:
+        key = self.key(text)
+        with self._lock:
+            ref = self._items.get(key)
+            if ref is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return ref
+            self.misses += 1
+
+        # 编译在锁外进行；并发编译同一文本时结果相同，后写入者覆盖即可
+        ref = compile_fn(key)
+        if self.capacity > 0:
+            with self._lock:
+                self._items[key] = ref
+                self._items.move_to_end(key)
+                while len(self._items) > self.capacity:
+                    self._items.popitem(last=False)
+        return ref
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,295 @@
+"""
+进程级 WeNet 模型注册表
+
+模型（配置、词表、SentencePiece、CMVN、checkpoint）只在服务启动时加载一次，
+之后所有请求共享同一个只读的 WeNetAlignment 实例。
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> Optional[int]:
+    """读取当前进程常驻内存（RSS），不可用时返回 None。"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        # ru_maxrss 在 Linux 上单位为 KB，macOS 上为字节；这里只作为峰值近似
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return None
+
+
+_SMAPS_FIELDS = {
+    "Rss": "rssBytes",
+    "Pss": "pssBytes",
+    "Shared_Clean": "sharedBytes",
+    "Shared_Dirty": "sharedBytes",
+    "Private_Clean": "privateBytes",
+    "Private_Dirty": "privateBytes",
+}
+
+
+def parse_smaps_rollup(text: str) -> Dict[str, int]:
+    """解析 /proc/<pid>/smaps_rollup：RSS、PSS、与其它进程共享的页和私有页（字节）"""
+    usage = {"rssBytes": 0, "pssBytes": 0, "sharedBytes": 0, "privateBytes": 0}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _SMAPS_FIELDS:
+            usage[_SMAPS_FIELDS[parts[0].rstrip(":")]] += int(parts[1]) * 1024
+    return usage
+
+
+def memory_usage(pid: Any = "self") -> Optional[Dict[str, int]]:
+    """进程的 RSS / PSS / 共享 / 私有内存；预 fork 的 worker 共享的模型权重计入 sharedBytes。
+
+    需要 Linux 4.14+ 的 smaps_rollup，不可用时返回 None。
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            return parse_smaps_rollup(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _model_nbytes(model: Any) -> int:
+    """统计模型参数与 buffer 的字节数。"""
+    if model is None:
+        return 0
+    total = 0
+    for t in list(model.parameters()) + list(model.buffers()):
+        total += t.numel() * t.element_size()
+    return total
+
+
+class ModelRegistry:
+    """持有共享的 WeNetAlignment。
+
+    - load() 幂等，并发调用时只会真正加载一次；
+    - get_aligner() 返回共享实例，未加载时按需加载；
+    - stats() 暴露加载耗时和内存占用，供 /health 使用。
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._aligner: Optional[Any] = None
+        self._loading = False
+        self._last_error: Optional[str] = None
+        self.load_time_s: Optional[float] = None
+        self.model_bytes: int = 0
+        self.rss_delta_bytes: Optional[int] = None
+        self._batcher: Optional[Any] = None
+        self._backend: Optional[Any] = None
+
+    def _create(self) -> Any:
+        if self._factory is not None:
+            return self._factory()
+        from .alignment import WeNetAlignment
+        from .backends import backend_kind
+
+        # ONNX 后端不需要加载 PyTorch 模型权重
+        return WeNetAlignment(load_model=backend_kind() == "torch")
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._aligner is not None
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    @property
+    def state(self) -> str:
+        """loaded | loading | error | unloaded（只读缓存的状态，不触发加载）"""
+        if self._aligner is not None:
+            return "loaded"
+        if self._loading:
+            return "loading"
+        if self._last_error is not None:
+            return "error"
+        return "unloaded"
+
+    def load(self) -> Any:
+        """加载模型（若已加载则直接返回）。"""
+        aligner = self._aligner
+        if aligner is not None:
+            return aligner
+
+        with self._lock:
+            if self._aligner is not None:
+                return self._aligner
+
+            gc.collect()
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            self._loading = True
+            try:
+                aligner = self._create()
+                # G2P 同样在启动阶段加载，避免首个请求承担加载开销
+                ensure_g2p = getattr(aligner, "_ensure_g2p", None)
+                if callable(ensure_g2p):
+                    ensure_g2p()
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error(f"Failed to load WeNet model into registry: {e}")
+                raise
+            finally:
+                self._loading = False
+            self.load_time_s = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+
+            self.model_bytes = _model_nbytes(getattr(aligner, "model", None))
+            if rss_before is not None and rss_after is not None:
+                self.rss_delta_bytes = max(0, rss_after - rss_before)
+            self._last_error = None
+            self._aligner = aligner
+            logger.info(
+                f"WeNet model registered in {self.load_time_s:.2f}s "
+                f"(params {self.model_bytes / 1e6:.1f}MB)"
+            )
+            return aligner
+
+    def get_aligner(self) -> Any:
+        """获取共享的只读对齐器。"""
+        return self._aligner if self._aligner is not None else self.load()
+
+    def get_backend(self) -> Any:
+        """获取共享的编码器推理后端（WENET_BACKEND=torch|onnx）。"""
+        backend = self._backend
+        if backend is not None:
+            return backend
+        aligner = self.get_aligner()
+        with self._lock:
+            if self._backend is None:
+                from .backends import create_backend
+
+                self._backend = create_backend(aligner)
+            return self._backend
+
+    def get_batcher(self) -> Any:
+        """获取共享的编码器微批处理器（基于推理后端的 forward）。"""
+        batcher = self._batcher
+        if batcher is not None:
+            return batcher
+        backend = self.get_backend()
+        with self._lock:
+            if self._batcher is None:
+                from .batching import BatcherConfig, EncoderBatcher
+
+                self._batcher = EncoderBatcher(backend.forward, BatcherConfig.from_env())
+            return self._batcher
+
+    def unload(self) -> None:
+        """释放模型（主要用于测试或服务关闭）。"""
+        with self._lock:
+            if self._batcher is not None:
+                self._batcher.close()
+                self._batcher = None
+            self._backend = None
+            self._aligner = None
+            self.load_time_s = None
+            self.model_bytes = 0
+            self.rss_delta_bytes = None
+
+    def component_stats(self, name: str) -> Optional[Dict[str, Any]]:
+        """已加载对齐器上某个缓存组件（references / lexicon）的统计"""
+        return _component_stats(self._aligner, name)
+
+    def batcher_queue_depth(self) -> int:
+        batcher = self._batcher
+        return batcher.queue_depth if batcher is not None else 0
+
+    def model_identity(self) -> str:
+        """决定评估结果的模型配置，作为结果缓存键的一部分
+
+        包括模型包 / checkpoint 的路径、大小与修改时间，推理后端、CTC 后验模式与精度。
+        已加载时取实际使用的值；未加载时（如进程池模式的主进程）按加载时相同的环境变量解析。
+        """
+        from .backends import backend_kind, default_onnx_path
+        from .ctc_head import ctc_posteriors_mode
+        from .precision import precision_mode
+
+        aligner = self._aligner
+        backend = self._backend
+        if aligner is not None:
+            model_path = aligner.model_path
+            precision = aligner.precision
+        else:
+            from .alignment import model_source_path
+
+            model_path = model_source_path()
+            precision = precision_mode()
+        kind = getattr(backend, "name", None) or backend_kind()
+        parts = [
+            f"model={_file_signature(model_path)}",
+            f"backend={kind}",
+            f"ctc={ctc_posteriors_mode()}",
+            f"precision={precision}",
+        ]
+        if kind == "onnx":
+            parts.append(f"onnx={_file_signature(default_onnx_path())}")
+        return "|".join(parts)
+
+    def stats(self) -> Dict[str, Any]:
+        aligner = self._aligner
+        batcher = self._batcher
+        backend = self._backend
+        return {
+            "loaded": aligner is not None,
+            "loadTimeMs": round(self.load_time_s * 1000.0, 2) if self.load_time_s is not None else None,
+            "modelBytes": self.model_bytes,
+            "rssDeltaBytes": self.rss_delta_bytes,
+            "rssBytes": current_rss_bytes(),
+            "memory": memory_usage(),
+            "vocabSize": getattr(aligner, "vocab_size", None),
+            "modelPath": getattr(aligner, "model_path", None),
+            "device": str(getattr(aligner, "device", "")) or None,
+            "backend": getattr(backend, "name", None),
+            "ctcPosteriors": ("restricted" if getattr(backend, "outputs_hidden", False) else "full") if backend else None,
+            "precision": getattr(aligner, "precision", None),
+            "loadMode": getattr(aligner, "load_mode", None),
+            "batching": {
+                "batchesRun": batcher.batches_run,
+                "itemsRun": batcher.items_run,
+            } if batcher is not None else None,
+            "references": _component_stats(aligner, "references"),
+            "lexicon": _component_stats(aligner, "lexicon"),
+            "error": self._last_error,
+        }
+
+
+def _file_signature(path: Optional[str]) -> str:
+    """路径 + 大小 + 修改时间；模型包目录取其 manifest"""
+    if not path:
+        return ""
+    target = os.path.join(path, "manifest.json") if os.path.isdir(path) else path
+    try:
+        st = os.stat(target)
+    except OSError:
+        return os.path.abspath(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _component_stats(aligner: Any, name: str) -> Optional[Dict[str, Any]]:
+    component = getattr(aligner, name, None)
+    return component.stats() if component is not None else None
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """返回进程级共享的模型注册表。"""
+    return _registry
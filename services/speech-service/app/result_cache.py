@@ -0,0 +1,279 @@
+"""
+评估结果缓存与请求合并
+
+移动端在弱网下会重传上传，apps/api 的 SpeechService 也会重放调用，相同的
+（音频，参考文本）会反复跑完整的 WeNet 流程。这里按解码后 PCM 的内容哈希 +
+参考文本原文（响应中的单词按原文返回）+ enable_phoneme + 模型配置作为键：
+
+- 内存中的有界 LRU，按 TTL 过期，按序列化后的字节数限制总大小；
+- 可选的本地磁盘存储（RESULT_CACHE_DIR），多个 worker 进程与重启后可复用；
+- 相同键的并发请求只计算一次，其余请求等待同一个结果。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STATUS_HIT = "hit"
+STATUS_MISS = "miss"
+STATUS_COALESCED = "coalesced"
+
+
+@dataclass
+class ResultCacheConfig:
+    ttl_s: float = 600.0
+    # 内存中缓存结果（JSON 序列化后）的总字节上限，0 表示不缓存
+    max_bytes: int = 64 * 1024 * 1024
+    # 磁盘存储目录，为空表示只使用内存
+    disk_dir: str = ""
+    disk_max_bytes: int = 512 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "ResultCacheConfig":
+        return cls(
+            ttl_s=float(os.getenv("RESULT_CACHE_TTL_S", "600")),
+            max_bytes=max(0, int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))),
+            disk_dir=os.getenv("RESULT_CACHE_DIR", ""),
+            disk_max_bytes=max(0, int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.max_bytes > 0
+
+
+def result_key(
+    samples: np.ndarray, sample_rate: int, text: str, enable_phoneme: bool, model: str = ""
+) -> str:
+    """解码后 PCM 内容 + 采样率 + 参考文本 + enable_phoneme + 模型配置的哈希
+
+    model 为 ModelRegistry.model_identity()，更换模型、后端或精度后磁盘上的旧结果不再命中。
+    """
+    h = hashlib.blake2b(digest_size=20)
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    h.update(f"{samples.shape}|{int(sample_rate)}|{int(bool(enable_phoneme))}|".encode("utf-8"))
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(memoryview(samples).cast("B"))
+    return h.hexdigest()
+
+
+class DiskResultStore:
+    """以 <key>.json 文件保存结果，按修改时间判断过期与淘汰"""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_s: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    st = entry.stat()
+                    yield entry.path, st.st_mtime, st.st_size
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_s:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, payload: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write result cache entry {key}: {e}")
+            return
+        with self._lock:
+            self._bytes += len(payload)
+            if self._bytes > self.max_bytes:
+                self._prune()
+
+    def _prune(self) -> None:
+        """删除过期文件，并按修改时间从旧到新删除直到低于上限的 90%"""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        now = time.time()
+        for path, mtime, size in entries:
+            if total <= self.max_bytes * 0.9 and now - mtime <= self.ttl_s:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+
+class _LeaderAbandoned(Exception):
+    """负责计算的请求被取消，等待者需要重新发起计算"""
+
+
+class ResultCache:
+    """评估结果缓存（在事件循环中使用，磁盘读写放到线程中执行）"""
+
+    def __init__(self, config: Optional[ResultCacheConfig] = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or ResultCacheConfig()
+        self._clock = clock
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.disk: Optional[DiskResultStore] = None
+        if self.config.enabled and self.config.disk_dir:
+            self.disk = DiskResultStore(self.config.disk_dir, self.config.disk_max_bytes, self.config.ttl_s)
+        self.hits = 0
+        # 命中磁盘存储的次数（同时计入 hits）
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    # ---------------------- 内存 LRU ----------------------
+    def _get_payload(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, payload = item
+        if self._clock() >= expires_at:
+            self._drop(key)
+            return None
+        self._items.move_to_end(key)
+        return payload
+
+    def _put_payload(self, key: str, payload: bytes) -> None:
+        if not self.config.enabled or len(payload) > self.config.max_bytes:
+            return
+        self._drop(key)
+        self._items[key] = (self._clock() + self.config.ttl_s, payload)
+        self._bytes += len(payload)
+        while self._bytes > self.config.max_bytes:
+            old_key = next(iter(self._items))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[1])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """仅查询内存缓存，命中时返回结果副本"""
+        payload = self._get_payload(key)
+        return json.loads(payload) if payload is not None else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> bytes:
+        payload = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._put_payload(key, payload)
+        return payload
+
+    # ---------------------- 查询 + 合并 ----------------------
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ) -> Tuple[Dict[str, Any], str]:
+        """返回 (结果, 状态)，状态为 hit / miss / coalesced。
+
+        计算失败不会被缓存；若负责计算的请求因 retry_on 中的异常（例如客户端断开）
+        或被取消而放弃，等待中的请求会重新发起计算。
+        """
+        while True:
+            payload = self._get_payload(key)
+            if payload is not None:
+                self.hits += 1
+                return json.loads(payload), STATUS_HIT
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                try:
+                    payload = await asyncio.shield(inflight)
+                except (_LeaderAbandoned,) + retry_on:
+                    continue
+                self.coalesced += 1
+                return json.loads(payload), STATUS_COALESCED
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[key] = future
+            try:
+                if self.disk is not None:
+                    payload = await loop.run_in_executor(None, self.disk.get, key)
+                    if payload is not None:
+                        self.hits += 1
+                        self.disk_hits += 1
+                        self._put_payload(key, payload)
+                        future.set_result(payload)
+                        return json.loads(payload), STATUS_HIT
+
+                self.misses += 1
+                result = await compute()
+                payload = self.put(key, result)
+                if self.disk is not None and self.config.enabled:
+                    loop.run_in_executor(None, self.disk.put, key, payload)
+                future.set_result(payload)
+                return result, STATUS_MISS
+            except asyncio.CancelledError:
+                future.set_exception(_LeaderAbandoned())
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                # 没有等待者时避免 "Future exception was never retrieved" 警告
+                if future.done() and not future.cancelled() and future.exception() is not None:
+                    future.exception()
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self._bytes,
+            "maxBytes": self.config.max_bytes,
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+            "hitRatio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """返回进程级共享的结果缓存"""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache(ResultCacheConfig.from_env())
+    return _cache
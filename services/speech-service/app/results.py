@@ -0,0 +1,32 @@
+"""
+对齐结果的数据结构
+
+与对齐实现（torch / WeNet）分离，评分与 API 层只依赖这里，导入时不会加载推理栈。
+"""
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class PhonemeSegment:
+    phoneme: str
+    start: float
+    end: float
+    confidence: float
+
+
+@dataclass
+class WordSegment:
+    word: str
+    start: float
+    end: float
+    phonemes: List[PhonemeSegment]
+
+
+@dataclass
+class AlignmentResult:
+    words: List[WordSegment]
+    duration: float
+    raw_confidence: List[float]
+    # 送入 encoder 前裁掉的首尾静音时长（秒）；duration 始终为原始时长
+    trimmed_duration: float = 0.0
@@ -0,0 +1,168 @@
+"""
+U2++ 流式发音评估
+
+学习者说话时客户端持续发送 PCM 帧，服务端边收边算：
+- StreamingFbank 增量提取 fbank（与整段提取逐帧一致，snip_edges 语义）；
+- StreamingSession 按 chunk 调用 encoder.forward_chunk，携带注意力/卷积缓存，
+  并对每个 chunk 立即计算 ctc.log_softmax；
+- 结束时只需处理最后一个不完整的 chunk 并做 Viterbi 对齐与评分。
+"""
+import logging
+import os
+from typing import Callable, List, Optional
+
+import numpy as np
+import torch
+
+from .audio import AudioTooLarge
+from .precision import PRECISION_FP32, inference_context
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25ms
+FRAME_SHIFT = 160  # 10ms
+MIN_NUM_SAMPLES = 8000  # 与 preprocess_audio 的最短填充长度一致
+
+
+class StreamingFbank:
+    """增量 fbank：只对完整的帧做特征提取，剩余样本留到下一次。"""
+
+    def __init__(self, feature_fn: Callable[[torch.Tensor], torch.Tensor]):
+        self._feature_fn = feature_fn
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.num_samples = 0
+
+    def accept(self, samples: np.ndarray) -> Optional[torch.Tensor]:
+        """追加样本，返回新产生的特征帧 [n, feat_dim]（不足一帧时返回 None）。"""
+        self.num_samples += len(samples)
+        self._pending = np.concatenate([self._pending, samples.astype(np.float32, copy=False)])
+        if len(self._pending) < FRAME_LENGTH:
+            return None
+        num_frames = 1 + (len(self._pending) - FRAME_LENGTH) // FRAME_SHIFT
+        used = (num_frames - 1) * FRAME_SHIFT + FRAME_LENGTH
+        feats = self._feature_fn(torch.from_numpy(self._pending[:used].copy()))
+        self._pending = self._pending[num_frames * FRAME_SHIFT:]
+        return feats
+
+
+class StreamingSession:
+    """一次流式评估会话，持有编码器缓存与已计算的 CTC 后验。"""
+
+    def __init__(
+        self,
+        aligner,
+        text: str,
+        chunk_size: int = 16,
+        num_left_chunks: int = -1,
+        max_bytes: Optional[int] = None,
+    ):
+        self.aligner = aligner
+        self.text = text
+        # 整个会话接收的 PCM 字节上限（与 HTTP 接口的 MAX_AUDIO_SIZE 一致），None 表示不限
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        # 上一条消息末尾不足一个采样点的字节（消息可能在任意字节处切分）
+        self._pending = b""
+        self.encoder = aligner.model.encoder
+        self.ctc = aligner.model.ctc
+        self.chunk_size = chunk_size
+        self.required_cache_size = chunk_size * num_left_chunks
+
+        subsampling = self.encoder.embed.subsampling_rate
+        context = self.encoder.embed.right_context + 1
+        self.decoding_window = (chunk_size - 1) * subsampling + context
+        self.stride = subsampling * chunk_size
+        self.context = context
+
+        self.fbank = StreamingFbank(aligner.compute_features)
+        self._feats: Optional[torch.Tensor] = None
+        self._offset = 0
+        self._att_cache = torch.zeros((0, 0, 0, 0), device=aligner.device)
+        self._cnn_cache = torch.zeros((0, 0, 0, 0), device=aligner.device)
+        self._ctc_chunks: List[torch.Tensor] = []
+        self.finished = False
+
+    @property
+    def num_frames(self) -> int:
+        """已输出的编码器帧数"""
+        return self._offset
+
+    def accept_pcm16(self, data: bytes) -> None:
+        """接收 16kHz 单声道 16-bit PCM（小端），累计超过 max_bytes 时抛出 AudioTooLarge"""
+        if self.max_bytes is not None and self.num_bytes + len(data) > self.max_bytes:
+            raise AudioTooLarge(self.max_bytes)
+        self.num_bytes += len(data)
+        if self._pending:
+            data = self._pending + data
+        usable = len(data) - len(data) % 2
+        self._pending = bytes(data[usable:])
+        pcm = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        self.accept_waveform(pcm.astype(np.float32) / 32768.0)
+
+    def accept_waveform(self, samples: np.ndarray) -> None:
+        if self.finished:
+            raise RuntimeError("streaming session already finished")
+        feats = self.fbank.accept(samples)
+        if feats is not None:
+            self._append_feats(feats)
+            self._run_chunks(final=False)
+
+    def _append_feats(self, feats: torch.Tensor) -> None:
+        self._feats = feats if self._feats is None else torch.cat([self._feats, feats], dim=0)
+
+    def _forward_chunk(self, chunk: torch.Tensor) -> None:
+        device = self.aligner.device
+        with torch.no_grad():
+            with inference_context(getattr(self.aligner, "precision", PRECISION_FP32), device):
+                y, self._att_cache, self._cnn_cache = self.encoder.forward_chunk(
+                    chunk.unsqueeze(0).to(device),
+                    self._offset,
+                    self.required_cache_size,
+                    self._att_cache,
+                    self._cnn_cache,
+                )
+            self._offset += y.size(1)
+            self._ctc_chunks.append(self.ctc.log_softmax(y.float()).squeeze(0).cpu())
+
+    def _run_chunks(self, final: bool) -> None:
+        while self._feats is not None and self._feats.size(0) >= self.decoding_window:
+            self._forward_chunk(self._feats[:self.decoding_window])
+            self._feats = self._feats[self.stride:]
+        if final and self._feats is not None and self._feats.size(0) >= self.context:
+            self._forward_chunk(self._feats)
+            self._feats = None
+
+    def finish(self) -> torch.Tensor:
+        """结束输入，处理剩余特征，返回整段的 [T, V] CTC 对数后验"""
+        if not self.finished:
+            if self._pending:
+                logger.warning("Streaming PCM ended with an odd number of bytes, dropping the last byte")
+            # 与整段评估一致：过短的音频补零到 0.5 秒
+            if self.fbank.num_samples < MIN_NUM_SAMPLES:
+                pad = np.zeros(MIN_NUM_SAMPLES - self.fbank.num_samples, dtype=np.float32)
+                feats = self.fbank.accept(pad)
+                if feats is not None:
+                    self._append_feats(feats)
+            self._run_chunks(final=True)
+            self.finished = True
+        if not self._ctc_chunks:
+            raise ValueError("audio too short for alignment")
+        return torch.cat(self._ctc_chunks, dim=0)
+
+    def result(self):
+        """结束输入并返回对齐结果 AlignmentResult"""
+        ctc_probs = self.finish()
+        return self.aligner.align_posteriors(ctc_probs, self.text, self.fbank.num_samples)
+
+
+def stream_chunk_size() -> int:
+    return max(1, int(os.getenv("STREAM_CHUNK_SIZE", "16")))
+
+
+def stream_num_left_chunks() -> int:
+    return int(os.getenv("STREAM_NUM_LEFT_CHUNKS", "-1"))
+
+
+def stream_max_sessions() -> int:
+    return max(1, int(os.getenv("STREAM_MAX_SESSIONS", "8")))
@@ -0,0 +1,107 @@
+"""
+请求阶段计时
+
+流水线各阶段用 stage(name) 包裹：耗时总是记录到 Prometheus 直方图
+（sylis_stage_seconds），若当前上下文中有活动的 StageTimer，还会累加该请求的墙钟与 CPU 时间，
+随响应以 {"decodeMs": ...} 的形式返回（profile 模式下给出完整的分阶段明细）。
+
+CPU 时间取 time.process_time()，包含 torch intra-op 线程池；并发请求时会混入其它请求的开销，
+复现单条慢请求时应在空闲实例上进行。
+"""
+import contextlib
+import contextvars
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .metrics import observe_stage
+
+_current_timer: contextvars.ContextVar[Optional["StageTimer"]] = contextvars.ContextVar("stage_timer", default=None)
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class StageTimer:
+    def __init__(self):
+        self._wall: Dict[str, float] = {}
+        self._cpu: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["StageTimer"]:
+        """在当前上下文中启用该计时器，期间的 stage() 记录到这里"""
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self.activate(), stage(name):
+            yield
+
+    def add(self, name: str, wall_ms: float, cpu_ms: float = 0.0) -> None:
+        self._wall[name] = self._wall.get(name, 0.0) + wall_ms
+        self._cpu[name] = self._cpu.get(name, 0.0) + cpu_ms
+
+    def merge(self, other: "StageTimer") -> None:
+        """合并另一计时器（如推理工作线程/进程返回的计时）"""
+        for name, wall_ms in other._wall.items():
+            self.add(name, wall_ms, other._cpu.get(name, 0.0))
+
+    def as_dict(self) -> Dict[str, float]:
+        """各阶段墙钟耗时：{"decodeMs": ...}"""
+        return {f"{_camel(name)}Ms": round(ms, 3) for name, ms in self._wall.items()}
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """各阶段墙钟与 CPU 耗时：{"fbank": {"wallMs": ..., "cpuMs": ...}}"""
+        return {
+            name: {"wallMs": round(wall_ms, 3), "cpuMs": round(self._cpu.get(name, 0.0), 3)}
+            for name, wall_ms in self._wall.items()
+        }
+
+
+class _FanOutTimer:
+    """把一次计时同时记到多个计时器（微批处理中一次前向服务多个请求）"""
+
+    def __init__(self, timers: Sequence[StageTimer]):
+        self._timers = timers
+
+    def add(self, name: str, wall_ms: float, cpu_ms: float = 0.0) -> None:
+        for timer in self._timers:
+            timer.add(name, wall_ms, cpu_ms)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current_timer.get()
+
+
+@contextlib.contextmanager
+def record_into(timers: List[Optional[StageTimer]]) -> Iterator[None]:
+    """在给定计时器（忽略 None）的上下文中执行，用于跨线程把阶段耗时记回各请求"""
+    active = [t for t in timers if t is not None]
+    if not active:
+        yield
+        return
+    token = _current_timer.set(_FanOutTimer(active))  # type: ignore[arg-type]
+    try:
+        yield
+    finally:
+        _current_timer.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """记录代码块耗时（Prometheus 直方图 + 当前请求的 StageTimer）"""
+    timer = _current_timer.get()
+    start = time.perf_counter()
+    cpu_start = time.process_time() if timer is not None else 0.0
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_stage(name, elapsed)
+        if timer is not None:
+            timer.add(name, elapsed * 1000.0, (time.process_time() - cpu_start) * 1000.0)
@@ -0,0 +1,103 @@
+"""
+首尾静音裁剪（默认关闭，AUDIO_TRIM_SILENCE=true 开启）
+
+学习者录音前后通常各有一两秒静音，preprocess_audio 还会把短音频补零到 8000 个采样，
+这些帧都会进入 fbank 与 encoder。裁剪阶段在特征提取之前：
+- 以 10ms 为块计算采样能量（dB），低于 最响块 + AUDIO_TRIM_THRESHOLD_DB 视为非语音；
+- 保留首个与末个语音块之间的区间，两侧各留 AUDIO_TRIM_MARGIN_MS 余量；
+- 对齐结果中的词/音素时间按裁剪起点平移回原始时间轴，duration 仍为原始时长，
+  裁掉的时长通过 AlignmentResult.trimmed_duration 报告（流利度评分不受影响）。
+"""
+import os
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+import torch
+
+SAMPLE_RATE = 16000
+BLOCK_SAMPLES = 160  # 10ms
+# 裁剪后的最短长度，与 preprocess_audio 的补零长度一致
+MIN_SAMPLES = 8000
+
+
+@dataclass
+class TrimConfig:
+    enabled: bool = False
+    # 相对最响块的阈值（dB）
+    threshold_db: float = -35.0
+    # 绝对下限（dBFS），整段低于该值时视为无语音，不裁剪
+    floor_db: float = -70.0
+    # 语音两侧保留的余量（毫秒）
+    margin_ms: float = 200.0
+
+    @classmethod
+    def from_env(cls) -> "TrimConfig":
+        return cls(
+            enabled=os.getenv("AUDIO_TRIM_SILENCE", "false").lower() in ("1", "true", "yes"),
+            threshold_db=float(os.getenv("AUDIO_TRIM_THRESHOLD_DB", "-35")),
+            margin_ms=max(0.0, float(os.getenv("AUDIO_TRIM_MARGIN_MS", "200"))),
+        )
+
+
+@dataclass(frozen=True)
+class TrimSpan:
+    """保留区间 [start, end)（采样下标）与原始总采样数"""
+    start: int
+    end: int
+    total: int
+
+    @property
+    def num_samples(self) -> int:
+        return self.end - self.start
+
+    @property
+    def offset_s(self) -> float:
+        return self.start / SAMPLE_RATE
+
+    @property
+    def duration_s(self) -> float:
+        return self.total / SAMPLE_RATE
+
+    @property
+    def trimmed_s(self) -> float:
+        return (self.total - self.num_samples) / SAMPLE_RATE
+
+
+def block_energy_db(samples: np.ndarray) -> np.ndarray:
+    """每 10ms 块的平均能量（dBFS）"""
+    num_blocks = samples.shape[-1] // BLOCK_SAMPLES
+    if num_blocks == 0:
+        return np.zeros(0)
+    blocks = samples[:num_blocks * BLOCK_SAMPLES].reshape(num_blocks, BLOCK_SAMPLES).astype(np.float64)
+    return 10.0 * np.log10(np.mean(blocks * blocks, axis=1) + 1e-12)
+
+
+def speech_span(waveform: Union[torch.Tensor, np.ndarray], config: TrimConfig) -> TrimSpan:
+    """检测首尾非语音，返回需要保留的区间（未启用或未检测到语音时返回整段）"""
+    samples = waveform.numpy() if isinstance(waveform, torch.Tensor) else np.asarray(waveform)
+    samples = samples.reshape(-1)
+    total = int(samples.shape[0])
+    full = TrimSpan(0, total, total)
+    if not config.enabled or total <= MIN_SAMPLES:
+        return full
+
+    energy = block_energy_db(samples)
+    if energy.size == 0 or energy.max() < config.floor_db:
+        return full
+    # 3 块滑动平均，避免孤立的咔嗒声被当成语音边界
+    if energy.size >= 3:
+        energy = np.convolve(energy, np.ones(3) / 3.0, mode="same")
+    speech = np.flatnonzero(energy >= max(energy.max() + config.threshold_db, config.floor_db))
+    if speech.size == 0:
+        return full
+
+    margin = int(config.margin_ms / 1000.0 * SAMPLE_RATE)
+    start = max(0, int(speech[0]) * BLOCK_SAMPLES - margin)
+    end = min(total, (int(speech[-1]) + 1) * BLOCK_SAMPLES + margin)
+
+    # 保证最短长度，优先向后扩展
+    if end - start < MIN_SAMPLES:
+        end = min(total, start + MIN_SAMPLES)
+        start = max(0, end - MIN_SAMPLES)
+    return TrimSpan(start, end, total)
@@ -0,0 +1,72 @@
+"""
+模型词表
+
+加载时由 WeNet 的 units 符号表（piece → id）构建一次：
+- id → piece 使用按 id 索引的列表，O(1) 反查；
+- piece → id 使用字典；
+- blank / unk / '▁' 的 id 预先缓存；
+- 提供批量 encode / decode，分词、对齐与按词分组共用同一实例。
+"""
+from typing import Dict, Iterable, List, Optional
+
+BLANK_PIECE = '<blank>'
+UNK_PIECE = '<unk>'
+SPACE_PIECE = '▁'
+
+
+class Vocabulary:
+    """SentencePiece / 字符词表的双向索引"""
+
+    def __init__(self, symbol_table: Dict[str, int]):
+        self.symbol_table: Dict[str, int] = dict(symbol_table)
+        size = max(self.symbol_table.values()) + 1 if self.symbol_table else 0
+        # 词表 id 一般连续；若有空洞则以空串占位
+        self.id_to_piece: List[str] = [''] * size
+        for piece, idx in self.symbol_table.items():
+            self.id_to_piece[idx] = piece
+
+        self.blank_id = self.symbol_table.get(BLANK_PIECE, 0)
+        self.unk_id = self.symbol_table.get(UNK_PIECE, 1)
+        self.space_id: Optional[int] = self.symbol_table.get(SPACE_PIECE)
+        # 字符级回退时空格对应的 piece
+        self.space_piece = SPACE_PIECE if self.space_id is not None else ' '
+
+    def __len__(self) -> int:
+        return len(self.symbol_table)
+
+    def __contains__(self, piece: str) -> bool:
+        return piece in self.symbol_table
+
+    def id_of(self, piece: str) -> int:
+        """piece → id，未登录时返回 unk_id"""
+        return self.symbol_table.get(piece, self.unk_id)
+
+    def piece_of(self, token_id: int) -> Optional[str]:
+        """id → piece，越界或空洞时返回 None"""
+        if 0 <= token_id < len(self.id_to_piece):
+            return self.id_to_piece[token_id] or None
+        return None
+
+    def encode(self, pieces: Iterable[str]) -> List[int]:
+        get, unk = self.symbol_table.get, self.unk_id
+        return [get(p, unk) for p in pieces]
+
+    def decode(self, token_ids: Iterable[int]) -> List[str]:
+        """批量 id → piece，未知 id 返回空串"""
+        table, size = self.id_to_piece, len(self.id_to_piece)
+        return [table[i] if 0 <= i < size else '' for i in token_ids]
+
+    def encode_sentencepiece(self, pieces: Iterable[str]) -> List[int]:
+        """SentencePiece 切分结果 → id。
+
+        WeNet LibriSpeech 模型词表为大写子词，统一为大写以避免 <unk>。
+        """
+        return self.encode(
+            SPACE_PIECE + p[1:].upper() if p.startswith(SPACE_PIECE) else p.upper()
+            for p in pieces
+        )
+
+    def encode_chars(self, text: str) -> List[int]:
+        """字符级回退：小写逐字符编码，空格映射到 '▁'（若存在）"""
+        space = self.space_piece
+        return self.encode(space if ch == ' ' else ch for ch in text.lower())
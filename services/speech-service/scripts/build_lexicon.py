@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+发音词典预热脚本
+将词书词汇（单词及例句中的词）预先转换为 IPA，写入可 mmap 的磁盘词典，
+服务运行时只有词典外的词才会调用神经网络 G2P
+"""
+import os
+import re
+import sys
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, List, Set
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.lexicon import (  # noqa: E402
+    NeuralG2P,
+    cmudict_entries,
+    normalize_word,
+    read_lexicon,
+    simple_ipa,
+    write_lexicon,
+)
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join(str(project_root), "models", "lexicon.tsv")
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z']*")
+
+
+def _load_book_entries(path: str) -> List[dict]:
+    """读取词书 JSON（数组或每行一个对象）"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    try:
+        data = json.loads(content)
+        return data if isinstance(data, list) else [data]
+    except json.JSONDecodeError:
+        entries = []
+        for line in content.splitlines():
+            line = line.strip().rstrip(",")
+            if line.startswith("{"):
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+
+def book_vocabulary(path: str) -> Set[str]:
+    """收集词书中的单词与例句词汇"""
+    words: Set[str] = set()
+    for entry in _load_book_entries(path):
+        head = entry.get("headWord")
+        if head:
+            words.update(_WORD_RE.findall(head))
+        content = entry.get("content", {}).get("word", {}).get("content", {})
+        for sentence in content.get("sentence", {}).get("sentences", []):
+            words.update(_WORD_RE.findall(sentence.get("sContent", "")))
+    return {normalize_word(w) for w in words if normalize_word(w)}
+
+
+def build_lexicon(books: Iterable[str], output: str, use_cmudict: bool = False, merge: bool = True) -> int:
+    entries = read_lexicon(output) if merge and os.path.exists(output) else {}
+    logger.info(f"已有词条: {len(entries)}")
+
+    if use_cmudict:
+        try:
+            for word, phones in cmudict_entries():
+                entries.setdefault(normalize_word(word), phones)
+            logger.info(f"合并 CMUdict 后词条: {len(entries)}")
+        except Exception as e:
+            logger.warning(f"无法加载 CMUdict（需要 pip install -e .[cmudict] 及 nltk cmudict 语料）: {e}")
+
+    vocab: Set[str] = set()
+    for book in books:
+        words = book_vocabulary(book)
+        logger.info(f"{book}: {len(words)} 个词")
+        vocab.update(words)
+
+    g2p = NeuralG2P()
+    if not g2p.available:
+        logger.warning("g2p_en 不可用，词典外的词将使用简单字符映射")
+    missing = sorted(w for w in vocab if w not in entries)
+    logger.info(f"需要 G2P 转换的词: {len(missing)}")
+    for i, word in enumerate(missing, 1):
+        phones = g2p(word)
+        entries[word] = phones if phones is not None else simple_ipa(word)
+        if i % 1000 == 0:
+            logger.info(f"已转换 {i}/{len(missing)}")
+
+    write_lexicon(output, entries)
+    logger.info(f"✅ 词典已写入 {output}（{len(entries)} 个词条）")
+    return len(entries)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='发音词典预热工具')
+    parser.add_argument('--book', '-b', action='append', default=[],
+                        help='词书 JSON 文件（可重复指定）')
+    parser.add_argument('--book-dir',
+                        help='词书目录，处理其中所有 *.json')
+    parser.add_argument('--cmudict', action='store_true',
+                        help='同时导入完整 CMUdict')
+    parser.add_argument('--output', '-o', default=os.getenv("LEXICON_PATH", DEFAULT_OUTPUT),
+                        help=f'输出词典路径 (默认: {DEFAULT_OUTPUT})')
+    parser.add_argument('--no-merge', action='store_true',
+                        help='不合并已有词典，重新生成')
+
+    args = parser.parse_args()
+
+    books = list(args.book)
+    if args.book_dir:
+        books.extend(sorted(str(p) for p in Path(args.book_dir).glob("*.json")))
+    if not books and not args.cmudict:
+        parser.error("请至少指定 --book、--book-dir 或 --cmudict")
+
+    build_lexicon(books, args.output, use_cmudict=args.cmudict, merge=not args.no_merge)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+导入耗时检查脚本
+在新的解释器中用 python -X importtime 导入 app.main，解析各模块的累计导入耗时；
+总耗时超出预算，或导入了应当延迟加载的推理栈（torch / torchaudio / WeNet 等）时返回非零退出码，
+可放在 CI 中防止服务冷启动变慢。
+"""
+import os
+import re
+import subprocess
+import sys
+import logging
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODULE = "app.main"
+DEFAULT_BUDGET_MS = 1500.0
+# 只应在模型加载时导入的重量级依赖
+HEAVY_MODULES = ("torch", "torchaudio", "wenet", "yaml", "onnxruntime", "sentencepiece", "g2p_en")
+
+# import time:       self [us] |  cumulative | imported package
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 输出，返回 (模块, 自身微秒, 累计微秒, 嵌套深度)"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure(module: str = DEFAULT_MODULE) -> List[Tuple[str, int, int, int]]:
+    """在子进程中导入 module 并返回 importtime 记录"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(project_root), env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def check(
+    rows: Sequence[Tuple[str, int, int, int]],
+    budget_ms: float,
+    heavy_modules: Sequence[str] = HEAVY_MODULES,
+) -> List[str]:
+    """返回违规项（为空表示通过）"""
+    problems = []
+    # 顶层模块的累计耗时之和即总导入耗时
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000.0
+    if total_ms > budget_ms:
+        problems.append(f"total import time {total_ms:.0f}ms exceeds budget {budget_ms:.0f}ms")
+    imported = {name for name, _, _, _ in rows}
+    for heavy in heavy_modules:
+        if heavy in imported:
+            problems.append(f"{heavy} is imported eagerly")
+    return problems
+
+
+def slowest(rows: Sequence[Tuple[str, int, int, int]], top: int) -> Dict[str, float]:
+    """自身耗时最长的模块（毫秒）"""
+    ranked = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {name: self_us / 1000.0 for name, self_us, _, _ in ranked}
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='服务导入耗时预算检查')
+    parser.add_argument('--module', default=DEFAULT_MODULE, help=f'要导入的模块 (默认: {DEFAULT_MODULE})')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help=f'总导入耗时预算，毫秒 (默认: {DEFAULT_BUDGET_MS:.0f}，或 IMPORT_TIME_BUDGET_MS)')
+    parser.add_argument('--top', type=int, default=10, help='列出自身耗时最长的模块数')
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000.0
+    logger.info(f"import {args.module}: {total_ms:.0f}ms across {len(rows)} modules (budget {args.budget_ms:.0f}ms)")
+    for name, ms in slowest(rows, args.top).items():
+        logger.info(f"  {ms:8.1f}ms  {name}")
+
+    problems = check(rows, args.budget_ms)
+    for problem in problems:
+        logger.error(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    logger.info("✅ import time within budget")
+
+
+if __name__ == "__main__":
+    main()
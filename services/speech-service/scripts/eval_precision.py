@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+推理精度评估脚本
+在参考音频集上比较 int8 / bf16 与 fp32 的编码器延迟和评分漂移
+（overallScore 差值、逐音素置信度差值），用于选择评分稳定且开销最低的精度模式
+"""
+import sys
+import json
+import time
+import logging
+import statistics
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.precision import PRECISION_FP32, PRECISION_MODES  # noqa: E402
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUDIO = project_root / "tests" / "hello.wav"
+
+
+def load_reference_set(manifest: str = None, audio: str = None, text: str = None) -> List[Tuple[str, str]]:
+    """读取参考集：JSONL 清单（每行 {"audio": 路径, "text": 文本}）或单条音频"""
+    if manifest:
+        items = []
+        base = Path(manifest).parent
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                path = Path(obj["audio"])
+                items.append((str(path if path.is_absolute() else base / path), obj["text"]))
+        return items
+    return [(audio or str(DEFAULT_AUDIO), text or "hello")]
+
+
+def run_mode(mode: str, items: List[Tuple[str, str]], repeat: int) -> Dict:
+    """加载指定精度的模型，返回每条音频的延迟、评分与音素置信度"""
+    from app.alignment import WeNetAlignment
+    from app.phoneme_confidence import compute_assessment_scores
+
+    aligner = WeNetAlignment(precision=mode)
+    outputs = []
+    for path, text in items:
+        waveform = aligner.preprocess_audio(path)
+        feats = aligner.compute_features(waveform)
+        aligner.forward_ctc([feats])  # 预热
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ctc_probs = aligner.forward_ctc([feats])[0]
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+        result = aligner.align_posteriors(ctc_probs, text, int(waveform.shape[-1]))
+        scores = compute_assessment_scores(result, enable_phoneme=True)
+        outputs.append({
+            "latencyMs": statistics.median(latencies),
+            "overallScore": scores["overallScore"],
+            "phonemeConfidences": [p.confidence for w in result.words for p in w.phonemes],
+        })
+    return {"mode": mode, "effective": aligner.precision, "items": outputs}
+
+
+def summarize(run: Dict, baseline: Dict) -> Dict:
+    overall_deltas = []
+    phone_deltas = []
+    for item, base in zip(run["items"], baseline["items"]):
+        overall_deltas.append(abs(item["overallScore"] - base["overallScore"]))
+        phone_deltas.extend(
+            abs(a - b) for a, b in zip(item["phonemeConfidences"], base["phonemeConfidences"])
+        )
+    latency = statistics.mean(i["latencyMs"] for i in run["items"])
+    base_latency = statistics.mean(i["latencyMs"] for i in baseline["items"])
+    return {
+        "mode": run["mode"],
+        "effective": run["effective"],
+        "latencyMs": round(latency, 2),
+        "speedup": round(base_latency / latency, 2) if latency > 0 else None,
+        "overallDeltaMean": round(statistics.mean(overall_deltas), 3) if overall_deltas else 0.0,
+        "overallDeltaMax": round(max(overall_deltas), 3) if overall_deltas else 0.0,
+        "phonemeDeltaMean": round(statistics.mean(phone_deltas), 4) if phone_deltas else 0.0,
+        "phonemeDeltaMax": round(max(phone_deltas), 4) if phone_deltas else 0.0,
+    }
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='推理精度评估工具')
+    parser.add_argument('--manifest', '-m',
+                        help='参考集 JSONL，每行 {"audio": "xx.wav", "text": "..."}')
+    parser.add_argument('--audio', help=f'单条参考音频 (默认: {DEFAULT_AUDIO})')
+    parser.add_argument('--text', help='单条参考文本 (默认: hello)')
+    parser.add_argument('--modes', nargs='+', default=list(PRECISION_MODES), choices=PRECISION_MODES,
+                        help='需要评估的精度模式')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='每条音频的计时次数（取中位数）')
+    parser.add_argument('--json', action='store_true',
+                        help='以 JSON 输出结果')
+
+    args = parser.parse_args()
+
+    items = load_reference_set(args.manifest, args.audio, args.text)
+    logger.info(f"参考集: {len(items)} 条音频")
+
+    modes = [PRECISION_FP32] + [m for m in args.modes if m != PRECISION_FP32]
+    runs = [run_mode(mode, items, args.repeat) for mode in modes]
+    summary = [summarize(run, runs[0]) for run in runs]
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"{'模式':<6} {'生效':<6} {'延迟ms':>9} {'加速':>6} {'Δoverall均值':>14} {'Δoverall最大':>14} "
+          f"{'Δ音素均值':>10} {'Δ音素最大':>10}")
+    for row in summary:
+        print(f"{row['mode']:<6} {row['effective']:<6} {row['latencyMs']:>9.2f} {row['speedup'] or 0:>6.2f} "
+              f"{row['overallDeltaMean']:>14.3f} {row['overallDeltaMax']:>14.3f} "
+              f"{row['phonemeDeltaMean']:>10.4f} {row['phonemeDeltaMax']:>10.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
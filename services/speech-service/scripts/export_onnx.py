@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+ONNX 导出脚本
+将 WeNet 模型的 encoder + CTC 头导出为时间轴动态的 ONNX 图，
+供 WENET_BACKEND=onnx 时由 onnxruntime 执行
+"""
+import os
+import sys
+import logging
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.backends import DEFAULT_OPSET, OnnxBackend, default_onnx_path, export_encoder_ctc  # noqa: E402
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def verify(aligner, onnx_path: str, lengths=(120, 457)) -> float:
+    """用随机特征比较 torch 与 onnxruntime 的输出，返回最大绝对误差"""
+    feats_list = [torch.randn(n, 80) for n in lengths]
+    torch_out = aligner.forward_ctc(feats_list)
+    onnx_out = OnnxBackend(onnx_path).forward_ctc(feats_list)
+    max_diff = 0.0
+    for a, b in zip(torch_out, onnx_out):
+        if a.shape != b.shape:
+            raise RuntimeError(f"shape mismatch: torch {tuple(a.shape)} vs onnx {tuple(b.shape)}")
+        max_diff = max(max_diff, float(np.max(np.abs(a.numpy() - b.numpy()))))
+    return max_diff
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='WeNet encoder+CTC ONNX 导出工具')
+    parser.add_argument('--output', '-o', default=default_onnx_path(),
+                        help='输出 ONNX 路径 (默认: models/encoder_ctc.onnx)')
+    parser.add_argument('--opset', type=int, default=DEFAULT_OPSET,
+                        help=f'ONNX opset 版本 (默认: {DEFAULT_OPSET})')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='跳过与 PyTorch 输出的一致性检查')
+
+    args = parser.parse_args()
+
+    from app.alignment import WeNetAlignment
+
+    aligner = WeNetAlignment()
+    model = aligner.model.cpu()
+    aligner.device = torch.device("cpu")
+
+    logger.info(f"正在导出 encoder + CTC 到 {args.output}")
+    export_encoder_ctc(model.encoder, model.ctc, args.output, opset=args.opset)
+    logger.info(f"✅ 导出完成: {args.output} ({os.path.getsize(args.output) / 1e6:.1f}MB)")
+
+    if not args.no_verify:
+        max_diff = verify(aligner, args.output)
+        logger.info(f"torch / onnxruntime 最大绝对误差: {max_diff:.2e}")
+        if max_diff > 1e-3:
+            logger.error("❌ ONNX 输出与 PyTorch 不一致")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
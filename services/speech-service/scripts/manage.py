@@ -14,13 +14,18 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 
-def start_service(host: str = "0.0.0.0", port: int = 8080, reload: bool = False):
+def start_service(host: str = "0.0.0.0", port: int = 8080, reload: bool = False, workers: int = 1,
+                  cpu_affinity: str = None, torch_threads: int = None):
     """启动语音服务"""
     print(f"🚀 启动语音服务 - {host}:{port}")
 
     # 切换到项目根目录
     os.chdir(project_root)
 
+    if workers > 1 and not reload:
+        serve_prefork(host, port, workers, cpu_affinity, torch_threads)
+        return
+
     cmd = [
         "uvicorn", "app.main:app",
         "--host", host,
@@ -39,6 +44,27 @@ def start_service(host: str = "0.0.0.0", port: int = 8080, reload: bool = False)
         sys.exit(1)
 
 
+def serve_prefork(host: str, port: int, workers: int, cpu_affinity: str = None, torch_threads: int = None):
+    """预 fork 模式：主进程加载一次模型，worker 写时复制共享权重"""
+    import logging
+
+    from app.prefork import PreforkConfig, serve
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    config = PreforkConfig.from_env()
+    config.host, config.port, config.workers = host, port, workers
+    if cpu_affinity is not None:
+        config.cpu_affinity = cpu_affinity
+    if torch_threads is not None:
+        config.torch_threads = torch_threads
+    print(f"🔀 预 fork {workers} 个 worker（共享模型权重）")
+    try:
+        serve(config)
+    except Exception as e:
+        print(f"❌ 启动失败: {e}")
+        sys.exit(1)
+
+
 def test_service():
     """测试语音服务"""
     print("🧪 运行服务测试...")
@@ -77,6 +103,28 @@ def download_models():
     subprocess.run([sys.executable, "scripts/download_models.py"])
 
 
+def build_lexicon(extra_args):
+    """预热发音词典"""
+    print("📖 预热发音词典...")
+
+    # 切换到项目根目录
+    os.chdir(project_root)
+
+    # 运行词典构建脚本
+    subprocess.run([sys.executable, "scripts/build_lexicon.py"] + list(extra_args))
+
+
+def export_onnx(extra_args):
+    """导出 ONNX encoder+CTC"""
+    print("📤 导出 ONNX 模型...")
+
+    # 切换到项目根目录
+    os.chdir(project_root)
+
+    # 运行导出脚本
+    subprocess.run([sys.executable, "scripts/export_onnx.py"] + list(extra_args))
+
+
 def health_check():
     """健康检查"""
     import requests
@@ -116,6 +164,12 @@ def main():
     start_parser.add_argument("--host", default="0.0.0.0", help="绑定主机 (默认: 0.0.0.0)")
     start_parser.add_argument("--port", type=int, default=8080, help="绑定端口 (默认: 8080)")
     start_parser.add_argument("--reload", action="store_true", help="启用自动重载")
+    start_parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "1")),
+                              help="worker 进程数，大于 1 时主进程加载模型后预 fork (默认: 1)")
+    start_parser.add_argument("--cpu-affinity", default=None,
+                              help="worker CPU 绑定：auto 或 0-3;4-7 (默认: SERVE_CPU_AFFINITY)")
+    start_parser.add_argument("--torch-threads", type=int, default=None,
+                              help="每个 worker 的 torch intra-op 线程数 (默认: 分到的全部 CPU)")
 
     # test 命令
     subparsers.add_parser("test", help="运行测试")
@@ -129,6 +183,14 @@ def main():
     # health 命令
     subparsers.add_parser("health", help="健康检查")
 
+    # lexicon 命令
+    lexicon_parser = subparsers.add_parser("lexicon", help="预热发音词典（参数透传给 build_lexicon.py）")
+    lexicon_parser.add_argument("args", nargs=argparse.REMAINDER, help="例如: --book-dir <词书目录> --cmudict")
+
+    # export-onnx 命令
+    onnx_parser = subparsers.add_parser("export-onnx", help="导出 ONNX encoder+CTC（参数透传给 export_onnx.py）")
+    onnx_parser.add_argument("args", nargs=argparse.REMAINDER, help="例如: --output models/encoder_ctc.onnx")
+
     # logs 命令
     subparsers.add_parser("logs", help="显示日志")
 
@@ -139,7 +201,7 @@ def main():
         return
 
     if args.command == "start":
-        start_service(args.host, args.port, args.reload)
+        start_service(args.host, args.port, args.reload, args.workers, args.cpu_affinity, args.torch_threads)
     elif args.command == "test":
         test_service()
     elif args.command == "setup":
@@ -148,6 +210,10 @@ def main():
         download_models()
     elif args.command == "health":
         health_check()
+    elif args.command == "lexicon":
+        build_lexicon(args.args)
+    elif args.command == "export-onnx":
+        export_onnx(args.args)
     elif args.command == "logs":
         show_logs()
     else:
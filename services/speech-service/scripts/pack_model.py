@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+模型打包脚本
+将下载的 WeNet 模型目录（final.pt、units.txt、global_cmvn、SentencePiece 模型、YAML 配置）
+转换为单个带版本号的模型包（manifest.json + 按 64 字节对齐的 tensors.bin），
+服务通过 WENET_BUNDLE_PATH（默认 models/bundle）以 mmap 方式加载
+"""
+import os
+import sys
+import glob
+import logging
+import time
+from pathlib import Path
+
+import torch
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.bundle import TENSORS_NAME, ModelBundle, cmvn_from_json, read_units, write_bundle  # noqa: E402
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = project_root / "downloads" / "20210610_u2pp_conformer_exp"
+DEFAULT_OUTPUT = project_root / "models" / "bundle"
+# 对齐只需要 encoder 与 CTC 头
+MODEL_PREFIXES = ("encoder.", "ctc.")
+
+
+def _first_existing(*paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            return str(path)
+    return None
+
+
+def load_state(checkpoint: str):
+    """读取 checkpoint 中 encoder + CTC 的张量"""
+    try:
+        state = torch.load(checkpoint, map_location="cpu", mmap=True, weights_only=True)
+    except (TypeError, RuntimeError):
+        state = torch.load(checkpoint, map_location="cpu")
+    return {k: v for k, v in state.items() if k.startswith(MODEL_PREFIXES)}
+
+
+def verify(bundle_dir: str, state, symbol_table, cmvn) -> None:
+    """重新打开模型包并与源文件逐一比较"""
+    start = time.perf_counter()
+    bundle = ModelBundle.open(bundle_dir)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    loaded = bundle.state_dict()
+    if loaded.keys() != state.keys():
+        raise RuntimeError("bundle tensor names differ from checkpoint")
+    for name, tensor in state.items():
+        if not torch.equal(loaded[name], tensor):
+            raise RuntimeError(f"tensor {name} differs from checkpoint")
+    if bundle.symbol_table() != symbol_table:
+        raise RuntimeError("bundle vocabulary differs from units file")
+    if cmvn is not None and not all(torch.equal(a, b) for a, b in zip(bundle.cmvn, cmvn)):
+        raise RuntimeError("bundle CMVN differs from global_cmvn")
+    logger.info(f"校验通过，打开模型包耗时 {elapsed_ms:.1f}ms")
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='WeNet 模型打包工具（mmap 加载的模型包）')
+    parser.add_argument('--model-dir', default=str(DEFAULT_MODEL_DIR),
+                        help='下载的模型目录 (默认: downloads/20210610_u2pp_conformer_exp)')
+    parser.add_argument('--checkpoint', help='checkpoint 路径 (默认: <model-dir>/final.pt)')
+    parser.add_argument('--config', help='YAML 配置 (默认: WENET_CONFIG_PATH 或 config/wenet_config.yaml)')
+    parser.add_argument('--units', help='词典路径 (默认: <model-dir>/units.txt)')
+    parser.add_argument('--cmvn', help='global_cmvn 路径 (默认: <model-dir>/global_cmvn)')
+    parser.add_argument('--spm', help='SentencePiece 模型 (默认: <model-dir>/*.model)')
+    parser.add_argument('--output', '-o', default=str(DEFAULT_OUTPUT), help='输出目录 (默认: models/bundle)')
+    parser.add_argument('--no-verify', action='store_true', help='跳过打包后的一致性检查')
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    checkpoint = _first_existing(args.checkpoint, os.path.join(model_dir, "final.pt"))
+    # 与服务默认使用的配置一致
+    config_path = _first_existing(args.config, os.getenv("WENET_CONFIG_PATH"),
+                                  project_root / "config" / "wenet_config.yaml",
+                                  os.path.join(model_dir, "train.yaml"))
+    units_path = _first_existing(args.units, os.path.join(model_dir, "units.txt"))
+    cmvn_path = _first_existing(args.cmvn, os.path.join(model_dir, "global_cmvn"))
+    spm_path = _first_existing(args.spm, *sorted(glob.glob(os.path.join(model_dir, "*.model"))))
+    if checkpoint is None or units_path is None or config_path is None:
+        logger.error("❌ 找不到 checkpoint、词典或配置文件，请检查 --model-dir 或单独指定路径")
+        return 1
+
+    import yaml
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    state = load_state(checkpoint)
+    symbol_table = read_units(units_path)
+    cmvn = cmvn_from_json(cmvn_path) if cmvn_path else None
+    spm_model = Path(spm_path).read_bytes() if spm_path else None
+
+    logger.info(f"正在打包 {len(state)} 个 encoder/CTC 张量、{len(symbol_table)} 个词表项到 {args.output}")
+    write_bundle(
+        args.output, state, config, symbol_table, cmvn=cmvn, spm_model=spm_model,
+        source={
+            "checkpoint": os.path.abspath(checkpoint),
+            "config": os.path.abspath(config_path),
+            "units": os.path.abspath(units_path),
+            "cmvn": os.path.abspath(cmvn_path) if cmvn_path else None,
+            "spm": os.path.abspath(spm_path) if spm_path else None,
+        },
+    )
+    size = os.path.getsize(os.path.join(args.output, TENSORS_NAME))
+    logger.info(f"✅ 打包完成: {args.output} ({size / 1e6:.1f}MB)")
+
+    if not args.no_verify:
+        verify(args.output, state, symbol_table, cmvn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,26 @@ Integration tests for API endpoints
 """
 import pytest
 import io
+import wave
+import numpy as np
+from concurrent.futures import Future
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 
 from app.main import app
+from app.probes import ModelReadiness, worker_model_state
+
+
+def _wav_bytes(seed: int = 0, num_samples: int = 16000) -> bytes:
+    """生成 16kHz 单声道 16-bit WAV"""
+    pcm = np.random.default_rng(seed).integers(-3000, 3000, num_samples, dtype=np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
 
 
 class TestAPI:
@@ -32,6 +48,76 @@ class TestAPI:
         assert "status" in data
         assert "model" in data
 
+    def test_livez_endpoint(self):
+        """存活探针始终返回 200"""
+        response = self.client.get("/livez")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+
+    def test_readyz_reports_unloaded_model(self):
+        """模型加载失败时就绪探针返回 503，并在后台重试加载而不阻塞探针"""
+        registry = MagicMock(state="error", last_error="model missing")
+        readiness = ModelReadiness(registry)
+        with patch('app.main.get_readiness', return_value=readiness):
+            response = self.client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json() == {"status": "error", "error": "model missing"}
+        readiness._loader.join(timeout=5)
+        registry.load.assert_called_once()
+        registry.get_aligner.assert_not_called()
+
+    def test_readyz_lazy_mode(self):
+        """WENET_PRELOAD=false 时模型尚未加载也视为就绪，且不触发加载"""
+        registry = MagicMock(state="unloaded", last_error=None, is_loaded=False)
+        readiness = ModelReadiness(registry, preload=False)
+        with patch('app.main.get_registry', return_value=registry), \
+                patch('app.main.get_readiness', return_value=readiness):
+            response = self.client.get("/readyz", params={"deep": "true"})
+            assert response.status_code == 200
+            assert response.json() == {"status": "ready", "model": "lazy"}
+            assert self.client.get("/health").json()["status"] == "healthy"
+        registry.load.assert_not_called()
+
+    def test_readyz_process_mode(self):
+        """进程池模式下就绪状态来自子进程的预热任务"""
+        registry = MagicMock(state="unloaded", last_error=None, is_loaded=False)
+        executor = MagicMock(config=MagicMock(kind="process"))
+        warmup = Future()
+        executor.submit.return_value = warmup
+        readiness = ModelReadiness(registry, lambda: executor)
+        with patch('app.main.get_registry', return_value=registry), \
+                patch('app.main.get_readiness', return_value=readiness):
+            response = self.client.get("/readyz")
+            assert response.status_code == 503
+            assert response.json() == {"status": "loading"}
+            executor.submit.assert_called_once_with(worker_model_state)
+
+            warmup.set_result({"state": "loaded", "error": None})
+            response = self.client.get("/readyz")
+            assert response.status_code == 200
+            assert response.json() == {"status": "ready"}
+            assert self.client.get("/health").json()["status"] == "healthy"
+        registry.load.assert_not_called()
+
+    def test_readyz_deep_check(self):
+        """deep=true 时附加缓存的合成推理检查结果"""
+        registry = MagicMock(state="loaded", last_error=None, is_loaded=True)
+        check = MagicMock()
+        check.is_fresh.return_value = True
+        check.result.return_value = {"ok": True, "latencyMs": 1.5}
+        with patch('app.main.get_registry', return_value=registry), \
+                patch('app.main.get_readiness', return_value=ModelReadiness(registry)), \
+                patch('app.main.get_deep_check', return_value=check):
+            assert self.client.get("/readyz").json() == {"status": "ready"}
+            response = self.client.get("/readyz", params={"deep": "true"})
+            assert response.status_code == 200
+            assert response.json()["deep"]["ok"] is True
+
+            check.result.return_value = {"ok": False, "error": "boom"}
+            response = self.client.get("/readyz", params={"deep": "true"})
+            assert response.status_code == 503
+            assert response.json()["status"] == "degraded"
+
     @patch('app.alignment.run_wenet_alignment')
     @patch('app.phoneme_confidence.compute_assessment_scores')
     def test_pronunciation_assess_mock(self, mock_compute, mock_alignment):
@@ -84,7 +170,7 @@ class TestAPI:
         assert response.status_code == 422  # 缺少必需参数
 
     def test_pronunciation_assess_invalid_file_type(self):
-        """测试无效文件类型的发音评估"""
+        """无法识别的音频格式返回 400（按内容识别，与文件名无关）"""
         audio_content = b"fake audio content"
 
         response = self.client.post(
@@ -99,7 +185,187 @@ class TestAPI:
 
         assert response.status_code == 400
         data = response.json()
-        assert "Only .wav is supported" in data["detail"]
+        assert "unsupported audio format" in data["detail"]
+
+    @patch('app.main.get_executor')
+    def test_pronunciation_assess_compressed_audio(self, mock_get_executor):
+        """FLAC 上传在内存中解码后进入推理，响应包含解码耗时"""
+        import soundfile as sf
+
+        received = []
+
+        async def run(fn, samples, sample_rate, *args, **kwargs):
+            received.append((samples, sample_rate))
+            return {"overallScore": 80.0, "words": []}
+
+        mock_get_executor.return_value.run = run
+        pcm = np.random.default_rng(3).integers(-3000, 3000, 16000, dtype=np.int16)
+        buf = io.BytesIO()
+        sf.write(buf, pcm, 16000, format="FLAC", subtype="PCM_16")
+
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("recording.bin", io.BytesIO(buf.getvalue()), "application/octet-stream")},
+            data={"text": "hello world"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["timings"]["decodeMs"] >= 0
+        samples, sample_rate = received[0]
+        assert sample_rate == 16000
+        np.testing.assert_allclose(samples[0], pcm / 32768.0, atol=1e-6)
+
+    @patch('app.main.get_executor')
+    def test_pronunciation_assess_overloaded(self, mock_get_executor):
+        """推理队列已满时返回 503 与 Retry-After"""
+        from app.executor import ServiceOverloaded
+
+        async def overloaded(*args, **kwargs):
+            raise ServiceOverloaded(retry_after=2)
+
+        mock_get_executor.return_value.run = overloaded
+
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(_wav_bytes(seed=1)), "audio/wav")},
+            data={"text": "hello world"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+
+    def test_pronunciation_assess_invalid_audio(self):
+        """无法解码的音频在进入推理队列前返回 400"""
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(b"fake audio content"), "audio/wav")},
+            data={"text": "hello world"}
+        )
+
+        assert response.status_code == 400
+
+    @patch('app.main.get_executor')
+    def test_pronunciation_assess_cached_retry(self, mock_get_executor):
+        """相同音频与文本的重传命中结果缓存，不再重新推理"""
+        calls = []
+
+        async def run(fn, *args, **kwargs):
+            calls.append(args)
+            return {"overallScore": 90.0, "words": []}
+
+        mock_get_executor.return_value.run = run
+        audio_content = _wav_bytes(seed=2)
+
+        first = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(audio_content), "audio/wav")},
+            data={"text": "Hello  world"}
+        )
+        second = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("retry.wav", io.BytesIO(audio_content), "audio/wav")},
+            data={"text": "Hello  world"}
+        )
+        # 响应中的单词按参考文本原文返回，大小写或空白不同的文本不共享结果
+        third = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("retry.wav", io.BytesIO(audio_content), "audio/wav")},
+            data={"text": "hello world"}
+        )
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert len(calls) == 2
+        assert first.json()["cache"]["status"] == "miss"
+        assert second.json()["cache"]["status"] == "hit"
+        assert second.json()["overallScore"] == 90.0
+        assert third.json()["cache"]["status"] == "miss"
+
+    @patch('app.main.run_wenet_alignment')
+    def test_pronunciation_assess_profile(self, mock_align, monkeypatch, tmp_path):
+        """profile 模式跳过结果缓存，返回分阶段的墙钟 / CPU 计时与 trace 路径"""
+        from app.alignment import AlignmentResult
+        from app.timing import stage
+
+        def align(samples, text, language="en-US", sample_rate=None):
+            with stage("fbank"):
+                pass
+            with stage("viterbi"):
+                pass
+            return AlignmentResult(words=[], duration=1.0, raw_confidence=[])
+
+        mock_align.side_effect = align
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(_wav_bytes(seed=4)), "audio/wav")},
+            data={"text": "hello world"},
+            headers={"X-Sylis-Profile": "1"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cache"]["status"] == "bypass"
+        stages = data["timings"]["stages"]
+        for name in ("upload_read", "decode", "fbank", "viterbi", "scoring", "inference"):
+            assert set(stages[name]) == {"wallMs", "cpuMs"}
+        assert data["timings"]["totalMs"] >= stages["inference"]["wallMs"]
+        assert (tmp_path / (data["timings"]["trace"].split("/")[-1] + ".prof")).exists()
+
+    @patch('app.main.get_executor')
+    def test_profile_ignored_when_disabled(self, mock_get_executor):
+        """服务端未开启 PROFILING_ENABLED 时忽略客户端的 profile 请求"""
+        async def run(fn, *args, **kwargs):
+            return {"overallScore": 70.0, "words": []}
+
+        mock_get_executor.return_value.run = run
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(_wav_bytes(seed=5)), "audio/wav")},
+            data={"text": "hello world", "profile": "true"},
+        )
+
+        assert response.status_code == 200
+        assert "stages" not in response.json()["timings"]
+        assert response.json()["cache"]["status"] != "bypass"
+
+    def test_metrics_endpoint(self):
+        """/metrics 暴露阶段直方图与请求指标"""
+        pytest.importorskip("prometheus_client")
+        self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(b"fake audio content"), "audio/wav")},
+            data={"text": "hello world"}
+        )
+
+        response = self.client.get("/metrics")
+        assert response.status_code == 200
+        body = response.text
+        assert 'sylis_stage_seconds_count{stage="upload_read"}' in body
+        assert 'sylis_requests_total{status="400"}' in body
+        assert "sylis_requests_in_flight" in body
+        assert 'sylis_cache_hit_ratio{cache="result"}' in body
+        assert "sylis_process_rss_bytes" in body
+
+    @patch.dict('os.environ', {"MAX_AUDIO_SIZE": "1024"})
+    def test_pronunciation_assess_too_large(self):
+        """超过 MAX_AUDIO_SIZE 的上传返回 413"""
+        response = self.client.post(
+            "/api/pronunciation/assess",
+            files={"audio": ("test.wav", io.BytesIO(bytes(256 * 1024)), "audio/wav")},
+            data={"text": "hello world"}
+        )
+
+        assert response.status_code == 413
+
+    def test_pronunciation_stream_requires_text(self):
+        """流式评估缺少文本时返回错误"""
+        with self.client.websocket_connect("/ws/pronunciation/assess") as ws:
+            ws.send_json({"language": "en-US"})
+            data = ws.receive_json()
+            assert data["error"] == "text is required"
 
     def test_pronunciation_assess_with_real_audio(self, hello_audio_file):
         """测试使用真实音频文件的发音评估"""
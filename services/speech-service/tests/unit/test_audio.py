@@ -0,0 +1,117 @@
+"""
+Unit tests for in-memory audio decoding
+"""
+import asyncio
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.audio import (
+    AudioDecodeError,
+    AudioTooLarge,
+    decode_audio_bytes,
+    decode_wav_pcm,
+    detect_format,
+    read_upload_limited,
+)
+
+
+def _pcm16_wav(samples: np.ndarray, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def _float32_wav(samples: np.ndarray, sample_rate: int = 16000) -> bytes:
+    data = samples.astype("<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, sample_rate, sample_rate * 4, 4, 32)
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", len(data)) + data)
+
+
+class _FakeUpload:
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buf.read(size)
+
+
+class TestAudioDecode:
+    """内存音频解码测试"""
+
+    def test_pcm16_matches_soundfile(self, hello_audio_file):
+        """PCM16 解码结果与 soundfile 一致"""
+        with open(hello_audio_file, "rb") as f:
+            data = f.read()
+        samples, sr = decode_wav_pcm(data)
+        expected, expected_sr = sf.read(hello_audio_file, dtype="float32", always_2d=True)
+        assert sr == expected_sr
+        assert samples.shape == expected.T.shape
+        np.testing.assert_array_equal(samples, expected.T)
+
+    def test_stereo_pcm16(self):
+        """多声道按 [channels, samples] 返回"""
+        interleaved = np.array([1, -1, 2, -2, 3, -3], dtype=np.int16)
+        samples, sr = decode_wav_pcm(_pcm16_wav(interleaved, 8000, channels=2))
+        assert sr == 8000
+        np.testing.assert_allclose(samples * 32768.0, [[1, 2, 3], [-1, -2, -3]])
+
+    def test_float32_is_zero_copy(self):
+        """float WAV 在可写缓冲区上直接返回视图"""
+        raw = np.linspace(-0.5, 0.5, 100, dtype=np.float32)
+        data = bytearray(_float32_wav(raw))
+        samples, _ = decode_wav_pcm(data)
+        np.testing.assert_array_equal(samples[0], raw)
+        assert np.shares_memory(samples, np.frombuffer(data, dtype=np.uint8))
+
+    def test_not_wav_raises(self):
+        """非 WAV 数据无法解码"""
+        with pytest.raises(AudioDecodeError):
+            decode_wav_pcm(b"fake audio content")
+        with pytest.raises(AudioDecodeError):
+            decode_audio_bytes(b"fake audio content")
+
+    @pytest.mark.parametrize("fmt,subtype,expected", [
+        ("FLAC", "PCM_16", "flac"),
+        ("OGG", "OPUS", "ogg"),
+        ("OGG", "VORBIS", "ogg"),
+        ("MP3", "MPEG_LAYER_III", "mp3"),
+    ])
+    def test_compressed_formats(self, fmt, subtype, expected):
+        """压缩格式按魔数识别并在内存中解码"""
+        t = np.arange(16000) / 16000.0
+        tone = (0.3 * np.sin(2 * np.pi * 440.0 * t)).astype(np.float32)
+        buf = io.BytesIO()
+        sf.write(buf, tone, 16000, format=fmt, subtype=subtype)
+        data = buf.getvalue()
+
+        assert detect_format(data) == expected
+        samples, sr = decode_audio_bytes(data)
+        assert sr == 16000
+        assert samples.shape[0] == 1 and samples.dtype == np.float32
+        # 有损编码：只检查能量与时长大致一致
+        assert abs(samples.shape[1] - 16000) < 2000
+        assert abs(np.sqrt(np.mean(samples ** 2)) - np.sqrt(np.mean(tone ** 2))) < 0.05
+
+    def test_detect_format(self):
+        assert detect_format(_pcm16_wav(np.zeros(10))) == "wav"
+        assert detect_format(b"ID3\x04\x00") == "mp3"
+        assert detect_format(b"\xff\xf1\x50\x80") is None  # AAC ADTS
+        assert detect_format(b"") is None
+
+    def test_read_upload_limited(self):
+        """分块读取并在超过上限时中止"""
+        data = bytes(200 * 1024)
+        assert len(asyncio.run(read_upload_limited(_FakeUpload(data), len(data)))) == len(data)
+        with pytest.raises(AudioTooLarge):
+            asyncio.run(read_upload_limited(_FakeUpload(data), len(data) - 1))
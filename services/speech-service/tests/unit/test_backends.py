@@ -0,0 +1,117 @@
+"""
+Unit tests for inference backends
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+
+from app.backends import EncoderCTC, OnnxBackend, create_backend, default_onnx_path, export_encoder_ctc
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+class _ToyEncoder(torch.nn.Module):
+    """与 WeNet encoder 接口一致的小模型：conv2d 4 倍下采样，返回 (out, mask[B, 1, T'])"""
+
+    def __init__(self, feat_dim: int = 80, d_model: int = 16):
+        super().__init__()
+        self.conv = torch.nn.Sequential(
+            torch.nn.Conv2d(1, 4, 3, 2), torch.nn.ReLU(),
+            torch.nn.Conv2d(4, 4, 3, 2), torch.nn.ReLU(),
+        )
+        self.out = torch.nn.Linear(4 * (((feat_dim - 1) // 2 - 1) // 2), d_model)
+
+    def forward(self, xs, xs_lens):
+        x = self.conv(xs.unsqueeze(1))
+        b, c, t, f = x.size()
+        x = self.out(x.transpose(1, 2).contiguous().view(b, t, c * f))
+        lens = ((xs_lens - 1) // 2 - 1) // 2
+        mask = torch.arange(t, device=xs.device).unsqueeze(0) < lens.unsqueeze(1)
+        return x, mask.unsqueeze(1)
+
+
+class _ToyCTC(torch.nn.Module):
+    def __init__(self, d_model: int = 16, vocab: int = 10):
+        super().__init__()
+        self.ctc_lo = torch.nn.Linear(d_model, vocab)
+
+    def log_softmax(self, hs):
+        return torch.log_softmax(self.ctc_lo(hs), dim=2)
+
+
+class TestBackends:
+    """推理后端测试"""
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_backend(object(), kind="tensorrt")
+
+    def test_torch_backend_delegates(self):
+        class _Aligner:
+            def forward_ctc(self, feats_list):
+                return ["ok"] * len(feats_list)
+
+            def _check_ready(self):
+                pass
+
+        backend = create_backend(_Aligner(), kind="torch")
+        assert backend.name == "torch"
+        assert backend.forward_ctc([torch.zeros(1), torch.zeros(1)]) == ["ok", "ok"]
+
+    def test_onnx_parity_with_torch(self, tmp_path):
+        """导出的 ONNX 图在不同长度的批量输入上与 PyTorch 输出一致"""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+        torch.manual_seed(0)
+        encoder, ctc = _ToyEncoder().eval(), _ToyCTC().eval()
+        path = export_encoder_ctc(encoder, ctc, str(tmp_path / "encoder_ctc.onnx"))
+
+        feats_list = [torch.randn(n, 80) for n in (57, 300, 123)]
+        onnx_out = OnnxBackend(path).forward_ctc(feats_list)
+
+        reference = EncoderCTC(encoder, ctc).eval()
+        with torch.no_grad():
+            for feats, got in zip(feats_list, onnx_out):
+                log_probs, lens = reference(feats.unsqueeze(0), torch.tensor([feats.size(0)]))
+                expected = log_probs[0, :int(lens[0])]
+                assert got.shape == expected.shape
+                assert torch.allclose(got, expected, atol=1e-4)
+
+    def test_onnx_missing_model(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        with pytest.raises(RuntimeError):
+            OnnxBackend(str(tmp_path / "missing.onnx"))
+
+    def test_onnx_mode_does_not_need_wenet(self):
+        """ONNX 模式的对齐器只读取词表与前端，不导入 WeNet 也能构建"""
+        from app.alignment import WeNetAlignment
+
+        aligner = WeNetAlignment(load_model=False)
+        assert aligner.model is None
+        assert aligner.load_mode == "none"
+        assert aligner.vocab_size > 0
+
+    def test_real_model_onnx_parity(self):
+        """真实导出的 ONNX 模型与 PyTorch 模型输出一致（缺少导出文件、模型或 WeNet 时跳过）"""
+        pytest.importorskip("onnxruntime")
+        from app.alignment import WeNetAlignment, model_source_path, wenet_available
+
+        onnx_path = default_onnx_path()
+        if not os.path.exists(onnx_path):
+            pytest.skip(f"{onnx_path} not exported (make export-onnx)")
+        if not wenet_available():
+            pytest.skip("WeNet not available")
+        if not os.path.exists(model_source_path()):
+            pytest.skip("WeNet model not downloaded")
+
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from export_onnx import verify
+
+        aligner = WeNetAlignment(precision="fp32")
+        aligner.model.cpu()
+        aligner.device = torch.device("cpu")
+        assert verify(aligner, onnx_path) < 1e-3
+
@@ -0,0 +1,127 @@
+"""
+Unit tests for encoder micro-batching
+"""
+import threading
+
+import pytest
+import torch
+
+from app.batching import BatcherConfig, EncoderBatcher, _Pending, pad_features
+
+
+def _fake_forward(batches):
+    """模拟 encoder + CTC：每帧输出 [sum(feat)]，并记录批大小"""
+    def forward(feats_list):
+        batches.append(len(feats_list))
+        padded, lengths = pad_features(feats_list)
+        out = padded.sum(dim=-1, keepdim=True)
+        return [out[i, :int(lengths[i])] for i in range(len(feats_list))]
+    return forward
+
+
+class TestEncoderBatcher:
+    """微批处理测试"""
+
+    def test_pad_features(self):
+        """填充与长度"""
+        padded, lengths = pad_features([torch.ones(3, 2), torch.ones(5, 2)])
+        assert padded.shape == (2, 5, 2)
+        assert lengths.tolist() == [3, 5]
+        assert padded[0, 3:].abs().sum() == 0
+
+    def test_concurrent_requests_are_batched(self):
+        """并发请求合并为批，且结果回到各自调用方"""
+        batches = []
+        batcher = EncoderBatcher(
+            _fake_forward(batches),
+            BatcherConfig(max_batch_size=8, max_wait_ms=200.0, bucket_frames=1000),
+        )
+        results = {}
+        barrier = threading.Barrier(6)
+
+        def worker(i):
+            feats = torch.full((10 + i, 4), float(i))
+            barrier.wait()
+            results[i] = batcher.infer(feats, timeout=5.0)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batcher.close()
+
+        for i in range(6):
+            assert results[i].shape == (10 + i, 1)
+            assert torch.allclose(results[i], torch.full((10 + i, 1), 4.0 * i))
+        assert sum(batches) == 6
+        assert max(batches) > 1
+
+    def test_length_buckets_split_batches(self):
+        """不同长度桶分开执行"""
+        batches = []
+        batcher = EncoderBatcher(_fake_forward(batches), BatcherConfig(bucket_frames=10))
+        items = [_Pending(torch.zeros(n, 2)) for n in (3, 5, 25, 27)]
+        buckets = batcher._buckets(items)
+        assert [len(b) for b in buckets] == [2, 2]
+
+    def test_disabled_batching_runs_inline(self):
+        """max_batch_size=1 时在调用线程中直接执行"""
+        batches = []
+        batcher = EncoderBatcher(_fake_forward(batches), BatcherConfig(max_batch_size=1))
+        out = batcher.infer(torch.ones(4, 3))
+        assert out.shape == (4, 1)
+        assert batches == [1]
+        assert batcher._thread is None
+
+    def test_forward_error_propagates(self):
+        """前向异常传递给调用方"""
+        def failing(feats_list):
+            raise ValueError("boom")
+
+        batcher = EncoderBatcher(failing, BatcherConfig(max_batch_size=1))
+        with pytest.raises(ValueError, match="boom"):
+            batcher.infer(torch.ones(2, 2))
+
+    def test_infer_times_out(self):
+        """前向迟迟不返回时 infer 超时，排队中的请求被取消"""
+        gate = threading.Event()
+
+        def slow(feats_list):
+            gate.wait(timeout=5.0)
+            return [f.sum(dim=-1, keepdim=True) for f in feats_list]
+
+        batcher = EncoderBatcher(slow, BatcherConfig(max_batch_size=2, max_wait_ms=0, timeout_s=0.05))
+        try:
+            with pytest.raises(TimeoutError):
+                batcher.infer(torch.ones(2, 2))
+        finally:
+            gate.set()
+            batcher.close()
+
+    def test_close_fails_pending_requests(self):
+        """close 时仍在排队的请求以错误结束，之后不再接受新请求"""
+        gate = threading.Event()
+        started = threading.Event()
+
+        def slow(feats_list):
+            started.set()
+            gate.wait(timeout=5.0)
+            return [f.sum(dim=-1, keepdim=True) for f in feats_list]
+
+        batcher = EncoderBatcher(slow, BatcherConfig(max_batch_size=2, max_wait_ms=0, timeout_s=0))
+        running = batcher.submit(torch.ones(2, 2))
+        assert started.wait(timeout=5.0)
+        queued = [batcher.submit(torch.ones(2, 2)) for _ in range(3)]
+
+        closer = threading.Thread(target=batcher.close)
+        closer.start()
+        gate.set()
+        closer.join(timeout=10.0)
+
+        assert running.result(timeout=1.0).shape == (2, 1)
+        for future in queued:
+            with pytest.raises(RuntimeError, match="closed"):
+                future.result(timeout=1.0)
+        with pytest.raises(RuntimeError, match="closed"):
+            batcher.submit(torch.ones(2, 2))
@@ -0,0 +1,180 @@
+"""
+Unit tests for the memory-mapped model bundle
+"""
+import json
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import torch
+
+from app.alignment import WeNetAlignment
+from app.bundle import (
+    ALIGNMENT,
+    MANIFEST_NAME,
+    TENSORS_NAME,
+    ModelBundle,
+    cmvn_from_json,
+    read_units,
+    write_bundle,
+)
+
+_SYMBOLS = {"<blank>": 0, "<unk>": 1, "▁": 2, "▁HELLO": 3, "ö": 4}
+
+
+class _ToyEncoder(torch.nn.Module):
+    def __init__(self, input_size, output_size=8, **kwargs):
+        super().__init__()
+        self.embed = torch.nn.Linear(input_size, output_size)
+        self._output_size = output_size
+
+    def output_size(self):
+        return self._output_size
+
+
+class _ToyCTC(torch.nn.Module):
+    def __init__(self, odim, encoder_output_size, blank_id=0):
+        super().__init__()
+        self.ctc_lo = torch.nn.Linear(encoder_output_size, odim)
+
+
+def _toy_state():
+    torch.manual_seed(0)
+    encoder, ctc = _ToyEncoder(4), _ToyCTC(5, 8)
+    state = {f"encoder.{k}": v for k, v in encoder.state_dict().items()}
+    state.update({f"ctc.{k}": v for k, v in ctc.state_dict().items()})
+    return state
+
+
+class TestModelBundle:
+    """模型包读写测试"""
+
+    def test_roundtrip(self, tmp_path):
+        """张量、词表、CMVN、SentencePiece 与配置原样还原，且按 64 字节对齐"""
+        state = dict(_toy_state())
+        state["encoder.step"] = torch.tensor(7, dtype=torch.int64)
+        state["encoder.half"] = torch.randn(3, 5).to(torch.bfloat16)
+        state["encoder.empty"] = torch.zeros(0, 4)
+        cmvn = (torch.randn(80), torch.rand(80))
+        manifest = write_bundle(str(tmp_path), state, {"encoder": "conformer"}, _SYMBOLS,
+                                cmvn=cmvn, spm_model=b"\x00spm\xff")
+
+        assert all(entry["offset"] % ALIGNMENT == 0 for entry in manifest["tensors"].values())
+        bundle = ModelBundle.open(str(tmp_path))
+        loaded = bundle.state_dict()
+        assert loaded.keys() == state.keys()
+        for name, tensor in state.items():
+            assert loaded[name].dtype == tensor.dtype
+            assert torch.equal(loaded[name], tensor)
+        assert bundle.symbol_table() == _SYMBOLS
+        assert all(torch.equal(a, b) for a, b in zip(bundle.cmvn, cmvn))
+        assert bundle.spm_model == b"\x00spm\xff"
+        assert bundle.config == {"encoder": "conformer"}
+
+    def test_tensors_are_views_of_one_mapping(self, tmp_path):
+        """所有张量共享同一块映射，assign 加载后参数不复制"""
+        write_bundle(str(tmp_path), _toy_state(), {}, _SYMBOLS)
+        bundle = ModelBundle.open(str(tmp_path))
+        state = bundle.state_dict()
+        base = state["encoder.embed.weight"].untyped_storage().data_ptr()
+        assert all(t.untyped_storage().data_ptr() == base for t in state.values())
+
+        encoder = _ToyEncoder(4)
+        encoder.load_state_dict({k[len("encoder."):]: v for k, v in state.items() if k.startswith("encoder.")},
+                                assign=True)
+        assert encoder.embed.weight.untyped_storage().data_ptr() == base
+
+    def test_rejects_other_versions_and_truncated_files(self, tmp_path):
+        write_bundle(str(tmp_path), _toy_state(), {}, _SYMBOLS)
+        manifest_path = tmp_path / MANIFEST_NAME
+        manifest = json.loads(manifest_path.read_text())
+
+        manifest_path.write_text(json.dumps(dict(manifest, version=99)))
+        with pytest.raises(ValueError, match="version"):
+            ModelBundle.open(str(tmp_path))
+
+        manifest_path.write_text(json.dumps(manifest))
+        with open(tmp_path / TENSORS_NAME, "r+b") as f:
+            f.truncate(16)
+        with pytest.raises(ValueError, match="truncated"):
+            ModelBundle.open(str(tmp_path))
+
+    def test_units_and_cmvn_parsers(self, tmp_path):
+        units = tmp_path / "units.txt"
+        units.write_text("".join(f"{p} {i}\n" for p, i in _SYMBOLS.items()), encoding="utf-8")
+        assert read_units(str(units)) == _SYMBOLS
+
+        stats = {"mean_stat": [20.0, 40.0], "var_stat": [500.0, 900.0], "frame_num": 10}
+        cmvn = tmp_path / "global_cmvn"
+        cmvn.write_text(json.dumps(stats))
+        mean, istd = cmvn_from_json(str(cmvn))
+        assert mean.dtype == torch.float32
+        assert np.allclose(mean.numpy(), [2.0, 4.0])
+        assert np.allclose(istd.numpy(), 1.0 / np.sqrt([46.0, 74.0]))
+
+
+class TestBundleLoading:
+    """对齐器从模型包加载 encoder + CTC"""
+
+    def test_init_bundle_model(self, tmp_path):
+        state = _toy_state()
+        write_bundle(str(tmp_path), state, {}, _SYMBOLS)
+        aligner = WeNetAlignment.__new__(WeNetAlignment)
+        aligner.config = {'encoder': 'conformer', 'input_dim': 4, 'output_dim': 5,
+                          'encoder_conf': {'output_size': 8}}
+        aligner.vocab_size = 5
+        aligner.bundle = ModelBundle.open(str(tmp_path))
+
+        with patch('app.alignment.ConformerEncoder', _ToyEncoder, create=True), \
+                patch('app.alignment.TransformerEncoder', _ToyEncoder, create=True), \
+                patch('app.alignment.CTC', _ToyCTC, create=True):
+            model = aligner._init_bundle_model()
+
+        assert torch.equal(model.encoder.embed.weight, state["encoder.embed.weight"])
+        assert torch.equal(model.ctc.ctc_lo.bias, state["ctc.ctc_lo.bias"])
+        mapped = aligner.bundle.tensors[next(iter(aligner.bundle.tensors))].untyped_storage().data_ptr()
+        assert model.ctc.ctc_lo.weight.untyped_storage().data_ptr() == mapped
+
+    def test_default_bundle_path(self, monkeypatch, tmp_path):
+        from app.bundle import default_bundle_path
+
+        monkeypatch.setenv("WENET_BUNDLE_PATH", str(tmp_path))
+        assert default_bundle_path() == str(tmp_path)
+        monkeypatch.delenv("WENET_BUNDLE_PATH")
+        # 未设置时仅在 models/bundle 存在时使用
+        packed = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "models", "bundle")
+        assert default_bundle_path() in (None, os.path.normpath(packed))
+
+    def test_file_overrides_disable_auto_bundle(self, monkeypatch):
+        """单独指定了任一模型文件时不自动使用 models/bundle"""
+        from app.bundle import FILE_OVERRIDE_VARS, default_bundle_path
+
+        monkeypatch.delenv("WENET_BUNDLE_PATH", raising=False)
+        for name in FILE_OVERRIDE_VARS:
+            monkeypatch.delenv(name, raising=False)
+        for name in FILE_OVERRIDE_VARS:
+            monkeypatch.setenv(name, "/custom/file")
+            assert default_bundle_path() is None
+            monkeypatch.delenv(name)
+        # 显式设置 WENET_BUNDLE_PATH 时总是使用
+        monkeypatch.setenv("WENET_MODEL_PATH", "/custom/final.pt")
+        monkeypatch.setenv("WENET_BUNDLE_PATH", "/packed")
+        assert default_bundle_path() == "/packed"
+
+    def test_stale_reason(self, tmp_path):
+        """打包来源与配置的 checkpoint 不同、或 checkpoint 在打包后被修改时给出原因"""
+        checkpoint = tmp_path / "final.pt"
+        checkpoint.write_bytes(b"weights")
+        out = tmp_path / "bundle"
+        write_bundle(str(out), _toy_state(), {}, _SYMBOLS, source={"checkpoint": str(checkpoint)})
+        bundle = ModelBundle.open(str(out))
+
+        assert bundle.stale_reason(str(checkpoint)) is None
+        assert bundle.stale_reason(str(tmp_path / "missing.pt")) is None
+        other = tmp_path / "other.pt"
+        other.write_bytes(b"weights")
+        assert "packed from" in bundle.stale_reason(str(other))
+        later = os.path.getmtime(out / TENSORS_NAME) + 10
+        os.utime(checkpoint, (later, later))
+        assert "modified after packing" in bundle.stale_reason(str(checkpoint))
@@ -0,0 +1,86 @@
+"""
+Unit tests for restricted-vocabulary CTC posteriors
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from app.alignment import WeNetAlignment
+from app.ctc_head import (
+    CTC_FULL,
+    CTC_RESTRICTED,
+    compact_labels,
+    ctc_posteriors_mode,
+    restricted_log_posteriors,
+)
+from app.ctc_viterbi import build_extended_labels
+from app.lexicon import PronunciationLexicon
+from app.reference import ReferenceCache
+from app.vocabulary import Vocabulary
+
+
+class TestCompactLabels:
+    """标签子集映射测试"""
+
+    def test_mapping(self):
+        ext = build_extended_labels([42, 7, 42])
+        label_ids, local_ext, local_tokens = compact_labels([42, 7, 42], ext, blank_id=0)
+        assert label_ids.tolist() == [0, 7, 42]
+        assert local_tokens == [2, 1, 2]
+        np.testing.assert_array_equal(label_ids[local_ext], ext)
+
+
+class TestPosteriorsMode:
+    """后验模式配置测试"""
+
+    def test_full_by_default(self, monkeypatch):
+        """受限模式计算量更大，默认使用完整 log_softmax"""
+        monkeypatch.delenv("WENET_CTC_POSTERIORS", raising=False)
+        assert ctc_posteriors_mode() == CTC_FULL
+        monkeypatch.setenv("WENET_CTC_POSTERIORS", "Restricted")
+        assert ctc_posteriors_mode() == CTC_RESTRICTED
+
+
+class TestRestrictedPosteriors:
+    """受限 CTC 后验测试"""
+
+    def test_matches_full_log_softmax(self):
+        """子集列与完整 log_softmax 的对应列一致（跨多个时间分块）"""
+        torch.manual_seed(0)
+        hidden = torch.randn(70, 16)
+        weight, bias = torch.randn(500, 16), torch.randn(500)
+        label_ids = np.array([0, 3, 99, 499])
+
+        got = restricted_log_posteriors(hidden, weight, bias, label_ids, chunk_frames=32)
+        full = torch.log_softmax(hidden @ weight.t() + bias, dim=-1)
+        assert got.shape == (70, 4)
+        assert torch.allclose(got, full[:, label_ids], atol=1e-5)
+
+    def test_align_hidden_matches_full_path(self):
+        """受限模式的对齐结果与完整后验路径一致"""
+        torch.manual_seed(1)
+        pieces = ['<blank>', '<unk>', '▁'] + [f'▁W{i}' for i in range(40)]
+        aligner = WeNetAlignment.__new__(WeNetAlignment)
+        aligner.vocab = Vocabulary({p: i for i, p in enumerate(pieces)})
+        aligner.spm = SimpleNamespace(EncodeAsPieces=lambda text: [f'▁W{len(w)}' for w in text.split()])
+        aligner.lexicon = PronunciationLexicon()
+        aligner.references = ReferenceCache(4)
+        ctc_lo = torch.nn.Linear(8, len(pieces))
+        aligner.model = SimpleNamespace(ctc=SimpleNamespace(ctc_lo=ctc_lo))
+
+        hidden = torch.randn(50, 8)
+        with torch.no_grad():
+            full = torch.log_softmax(ctc_lo(hidden), dim=-1)
+
+        text = "the quick brown fox"
+        expected = aligner.align_posteriors(full, text, 32000)
+        got = aligner.align_hidden(hidden, text, 32000)
+
+        assert [w.word for w in got.words] == [w.word for w in expected.words]
+        for gw, ew in zip(got.words, expected.words):
+            assert gw.start == ew.start and gw.end == ew.end
+            for gp, ep in zip(gw.phonemes, ew.phonemes):
+                assert gp.phoneme == ep.phoneme
+                assert abs(gp.confidence - ep.confidence) < 1e-5
+        np.testing.assert_allclose(got.raw_confidence, expected.raw_confidence, atol=1e-5)
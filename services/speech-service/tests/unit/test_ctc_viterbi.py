@@ -0,0 +1,190 @@
+"""
+Unit tests for vectorized CTC Viterbi
+"""
+from typing import List
+
+import numpy as np
+import pytest
+import torch
+
+from app.ctc_viterbi import (
+    _full_viterbi,
+    banded_viterbi_path,
+    build_extended_labels,
+    build_skip_mask,
+    ctc_viterbi_path,
+    ctc_viterbi_path_ext,
+)
+
+
+def _reference_viterbi_path(ctc_probs: torch.Tensor, labels: List[int], blank_id: int = 0) -> List[int]:
+    """原逐元素循环实现（WeNetAlignment._compute_ctc_alignments 中的 DP），作为对照"""
+    T, _ = ctc_probs.shape
+    ext: List[int] = []
+    for lid in labels:
+        ext.append(blank_id)
+        ext.append(lid)
+    ext.append(blank_id)
+    S = len(ext)
+
+    neg_inf = -1e10
+    dp = torch.full((T, S), neg_inf, dtype=ctc_probs.dtype)
+    bp = torch.full((T, S), -1, dtype=torch.long)
+    dp[0, 0] = ctc_probs[0, ext[0]]
+    if S > 1:
+        dp[0, 1] = ctc_probs[0, ext[1]]
+        bp[0, 1] = 1
+
+    for t in range(1, T):
+        for s in range(S):
+            emit = ctc_probs[t, ext[s]]
+            best = dp[t-1, s]
+            arg = 0
+            if s-1 >= 0:
+                v = dp[t-1, s-1]
+                if v > best:
+                    best = v
+                    arg = 1
+            if s-2 >= 0 and ext[s] != blank_id and ext[s] != ext[s-2]:
+                v = dp[t-1, s-2]
+                if v > best:
+                    best = v
+                    arg = 2
+            dp[t, s] = best + emit
+            bp[t, s] = arg
+
+    last_s = S-1
+    alt_s = S-2 if S-2 >= 0 else S-1
+    if dp[T-1, alt_s] > dp[T-1, last_s]:
+        last_s = alt_s
+
+    path_states = [last_s]
+    cur_s = last_s
+    for t in range(T-1, 0, -1):
+        move = int(bp[t, cur_s].item())
+        if move == 0:
+            prev_s = cur_s
+        elif move == 1:
+            prev_s = cur_s - 1
+        else:
+            prev_s = cur_s - 2
+        path_states.append(prev_s)
+        cur_s = prev_s
+    path_states.reverse()
+    return path_states
+
+
+class TestCTCViterbi:
+    """向量化 Viterbi 测试"""
+
+    def test_extended_labels_and_skip_mask(self):
+        """扩展标签与跳转掩码"""
+        ext = build_extended_labels([5, 5, 7], blank_id=0)
+        assert ext.tolist() == [0, 5, 0, 5, 0, 7, 0]
+        mask = build_skip_mask(ext, blank_id=0)
+        # 重复标签 5,5 之间不能跳过 blank；blank 本身也不能跳转
+        assert mask.tolist() == [False, False, False, False, False, True, False]
+
+    @pytest.mark.parametrize("seed", range(12))
+    def test_matches_reference_on_random_posteriors(self, seed):
+        """随机后验上与原循环实现逐帧一致"""
+        rng = np.random.default_rng(seed)
+        T = int(rng.integers(1, 40))
+        V = int(rng.integers(3, 12))
+        L = int(rng.integers(1, 10))
+        # 较小的词表使重复标签经常出现
+        labels = rng.integers(1, V, size=L).tolist()
+        logits = torch.from_numpy(rng.normal(scale=3.0, size=(T, V)).astype(np.float32))
+        ctc_probs = torch.log_softmax(logits, dim=-1)
+
+        expected = _reference_viterbi_path(ctc_probs, labels)
+        actual = ctc_viterbi_path(ctc_probs.numpy(), labels)
+        assert actual == expected
+
+    def test_matches_reference_with_ties(self):
+        """平坦后验（大量并列）下的取舍规则一致"""
+        ctc_probs = torch.full((15, 4), float(np.log(0.25)))
+        labels = [1, 2, 2, 3]
+        assert ctc_viterbi_path(ctc_probs.numpy(), labels) == _reference_viterbi_path(ctc_probs, labels)
+
+    def test_path_is_monotonic(self):
+        """路径状态单调不减且每步最多前进 2"""
+        rng = np.random.default_rng(0)
+        logits = rng.normal(size=(60, 8)).astype(np.float32)
+        log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        path = ctc_viterbi_path(log_probs, [1, 3, 5, 7])
+        assert len(path) == 60
+        steps = np.diff(path)
+        assert steps.min() >= 0 and steps.max() <= 2
+
+
+def _synthetic_long_posteriors(seed: int, L: int = 200, V: int = 50, lead_silence: int = 0):
+    """模拟长朗读：token 以不均匀语速出现，可在开头加入长静音（使路径偏离对角线）"""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(1, V, size=L).tolist()
+    frames = [0] * lead_silence
+    for lid in labels:
+        frames.extend([lid] * int(rng.integers(1, 4)))
+        frames.extend([0] * int(rng.integers(0, 6)))
+    logits = rng.normal(scale=1.0, size=(len(frames), V)).astype(np.float32)
+    logits[np.arange(len(frames)), frames] += 6.0
+    log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+    return log_probs, labels
+
+
+class TestBandedViterbi:
+    """带状 Viterbi 测试"""
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_matches_full_dp(self, seed):
+        """带状搜索在带内得到可证明的最优路径，与完整 DP 逐帧一致"""
+        log_probs, labels = _synthetic_long_posteriors(seed)
+        ext = build_extended_labels(labels)
+        mask = build_skip_mask(ext)
+        full = ctc_viterbi_path_ext(log_probs, ext, mask, band=0)
+        assert banded_viterbi_path(log_probs, ext, mask, 32) == full
+        banded = ctc_viterbi_path_ext(log_probs, ext, mask, band=32, band_min_cells=0)
+        assert banded == full
+
+    def test_widens_when_path_leaves_band(self):
+        """路径偏离对角线时窄带失败，自动加宽后结果仍与完整 DP 一致"""
+        log_probs, labels = _synthetic_long_posteriors(7, lead_silence=300)
+        ext = build_extended_labels(labels)
+        mask = build_skip_mask(ext)
+        assert banded_viterbi_path(log_probs, ext, mask, 4) is None
+        full = ctc_viterbi_path_ext(log_probs, ext, mask, band=0)
+        assert ctc_viterbi_path_ext(log_probs, ext, mask, band=4, band_min_cells=0) == full
+
+    def test_unreachable_falls_back_to_full(self):
+        """帧数不足以输出全部 token 时与完整 DP 行为一致"""
+        rng = np.random.default_rng(3)
+        logits = rng.normal(size=(5, 10)).astype(np.float32)
+        log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        labels = list(range(1, 10))
+        ext = build_extended_labels(labels)
+        mask = build_skip_mask(ext)
+        assert ctc_viterbi_path_ext(log_probs, ext, mask, band=1, band_min_cells=0) == \
+            ctc_viterbi_path_ext(log_probs, ext, mask, band=0)
+
+    @pytest.mark.parametrize("seed", range(100))
+    def test_random_posteriors_match_full_dp(self, seed):
+        """随机后验、窄带宽下带状搜索（含加宽与回退）与完整 DP 完全一致"""
+        rng = np.random.default_rng(seed)
+        T = int(rng.integers(1, 80))
+        labels = rng.integers(1, 8, size=int(rng.integers(1, 12))).tolist()
+        logits = rng.normal(size=(T, 8))
+        log_probs = (logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))).astype(np.float32)
+        ext = build_extended_labels(labels)
+        mask = build_skip_mask(ext)
+        full = _full_viterbi(log_probs, ext, mask)
+        for band in (1, 2, 3):
+            assert ctc_viterbi_path_ext(log_probs, ext, mask, band=band, band_min_cells=0) == full
+
+    def test_single_frame(self):
+        """T=1 且扩展标签长于带宽时不越界"""
+        log_probs = np.log(np.full((1, 6), 1.0 / 6, dtype=np.float32))
+        ext = build_extended_labels([1, 2, 3, 4])
+        mask = build_skip_mask(ext)
+        assert banded_viterbi_path(log_probs, ext, mask, 1) is None
+        assert ctc_viterbi_path_ext(log_probs, ext, mask, band=1, band_min_cells=0) == \
+            _full_viterbi(log_probs, ext, mask)
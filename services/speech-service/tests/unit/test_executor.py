@@ -0,0 +1,110 @@
+"""
+Unit tests for the bounded inference executor
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.executor import ClientDisconnected, ExecutorConfig, InferenceExecutor, ServiceOverloaded
+
+
+def _blocking(event: threading.Event, value):
+    event.wait(timeout=5.0)
+    return value
+
+
+class TestInferenceExecutor:
+    """推理执行器测试"""
+
+    def test_run_returns_result(self):
+        """任务在线程池中执行并返回结果"""
+        executor = InferenceExecutor(ExecutorConfig(workers=1, max_queue=1))
+        try:
+            assert asyncio.run(executor.run(lambda x: x * 2, 21)) == 42
+            assert executor.inflight == 0
+        finally:
+            executor.shutdown()
+
+    def test_saturated_queue_rejects(self):
+        """超过 workers + max_queue 时拒绝新任务"""
+        executor = InferenceExecutor(ExecutorConfig(workers=1, max_queue=1, retry_after_s=3))
+        gate = threading.Event()
+        try:
+            f1 = executor.submit(_blocking, gate, 1)
+            f2 = executor.submit(_blocking, gate, 2)
+            with pytest.raises(ServiceOverloaded) as exc:
+                executor.submit(_blocking, gate, 3)
+            assert exc.value.retry_after == 3
+
+            gate.set()
+            assert f1.result(timeout=5.0) == 1
+            assert f2.result(timeout=5.0) == 2
+            # 释放后可以再次提交
+            assert executor.submit(lambda: 4).result(timeout=5.0) == 4
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    def test_disconnect_cancels_queued_task(self):
+        """客户端断开时取消排队中的任务"""
+        executor = InferenceExecutor(ExecutorConfig(workers=1, max_queue=2, disconnect_poll_s=0.01))
+        gate = threading.Event()
+        ran = []
+
+        async def disconnected():
+            return True
+
+        async def scenario():
+            executor.submit(_blocking, gate, 1)
+            with pytest.raises(ClientDisconnected):
+                await executor.run(ran.append, "queued", is_disconnected=disconnected)
+
+        try:
+            asyncio.run(scenario())
+            gate.set()
+            executor.submit(lambda: None).result(timeout=5.0)
+            assert ran == []
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    def test_local_tasks_share_queue_limit(self):
+        """进程池模式下 local 任务在本进程线程中执行，并计入同一队列上限"""
+        executor = InferenceExecutor(ExecutorConfig(kind="process", workers=1, max_queue=0))
+        gate = threading.Event()
+        try:
+            # 闭包无法序列化到子进程，只能在本进程执行
+            future = executor.submit(lambda: (gate.wait(timeout=5.0), threading.current_thread().name)[1], local=True)
+            with pytest.raises(ServiceOverloaded):
+                executor.submit(_blocking, gate, 2, local=True)
+            gate.set()
+            assert future.result(timeout=5.0).startswith("inference-local")
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    @pytest.mark.parametrize("cancel_futures", [True, False])
+    def test_shutdown_cancels_queued_tasks(self, monkeypatch, cancel_futures):
+        """关闭时取消排队中的任务（Python 3.8 没有 cancel_futures 时手动取消）"""
+        monkeypatch.setattr("app.executor._HAS_CANCEL_FUTURES", cancel_futures)
+        executor = InferenceExecutor(ExecutorConfig(workers=1, max_queue=2))
+        gate = threading.Event()
+        running = executor.submit(_blocking, gate, 1)
+        queued = executor.submit(_blocking, gate, 2)
+        try:
+            executor.shutdown()
+            assert queued.cancelled()
+        finally:
+            gate.set()
+        assert running.result(timeout=5.0) == 1
+
+    def test_threads_follow_encoder_concurrency(self, monkeypatch):
+        """微批处理时编码器串行执行，使用全部 CPU；关闭时在工作线程之间划分"""
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        monkeypatch.setenv("WENET_BATCH_MAX_SIZE", "8")
+        assert ExecutorConfig(workers=4).threads_per_worker() == 8
+        assert ExecutorConfig(kind="process", workers=4).threads_per_worker() == 2
+        monkeypatch.setenv("WENET_BATCH_MAX_SIZE", "1")
+        assert ExecutorConfig(workers=4).threads_per_worker() == 2
+        assert ExecutorConfig(workers=4, torch_threads=3).threads_per_worker() == 3
@@ -0,0 +1,61 @@
+"""
+Unit tests for the cached feature frontend
+"""
+import torch
+import torchaudio
+import torchaudio.compliance.kaldi as kaldi
+
+from app.frontend import FeatureFrontend
+
+
+def _reference_features(waveform, mean=None, istd=None):
+    """原实现：kaldi.fbank 后再做 CMVN"""
+    fbank = kaldi.fbank(
+        waveform.unsqueeze(0),
+        num_mel_bins=80,
+        sample_frequency=16000,
+        frame_length=25.0,
+        frame_shift=10.0,
+        dither=0.0,
+        window_type='hamming',
+        use_energy=False,
+    )
+    if mean is not None:
+        return (fbank - mean) * istd
+    return fbank
+
+
+class TestFeatureFrontend:
+    """特征前端测试"""
+
+    def test_identical_to_kaldi_fbank(self):
+        """与 kaldi.fbank + CMVN 逐位一致"""
+        torch.manual_seed(0)
+        mean, istd = torch.randn(80), torch.rand(80) + 0.5
+        frontend = FeatureFrontend(mean, istd)
+        for num_samples in (400, 8000, 16000 * 3 + 123):
+            waveform = torch.randn(num_samples) * 0.1
+            assert torch.equal(frontend.compute(waveform), _reference_features(waveform, mean, istd))
+
+    def test_without_cmvn(self):
+        waveform = torch.randn(8000) * 0.1
+        assert torch.equal(FeatureFrontend().compute(waveform.unsqueeze(0)), _reference_features(waveform))
+
+    def test_batch_matches_single(self):
+        torch.manual_seed(1)
+        frontend = FeatureFrontend(torch.randn(80), torch.rand(80) + 0.5)
+        waveforms = [torch.randn(n) * 0.1 for n in (8000, 16000, 12345)]
+        batch = frontend.compute_batch(waveforms)
+        assert [f.shape[0] for f in batch] == [48, 98, 75]
+        for feats, waveform in zip(batch, waveforms):
+            assert torch.equal(feats, frontend.compute(waveform))
+        assert frontend.compute_batch([]) == []
+
+    def test_resampler_cached_per_rate(self):
+        frontend = FeatureFrontend()
+        waveform = torch.randn(1, 8000)
+        assert frontend.resampler(8000) is frontend.resampler(8000)
+        assert frontend.resampler(8000) is not frontend.resampler(44100)
+        assert frontend.resample(waveform, 16000) is waveform
+        expected = torchaudio.transforms.Resample(8000, 16000)(waveform)
+        assert torch.equal(frontend.resample(waveform, 8000), expected)
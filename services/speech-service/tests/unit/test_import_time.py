@@ -0,0 +1,49 @@
+"""
+Unit tests for lazy imports and the import-time budget check
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from check_import_time import check, parse_importtime  # noqa: E402
+
+_SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:      2000 |       5000 |   numpy
+import time:      1000 |       9000 | app.main
+import time:       500 |        500 |   torch
+import time:       300 |       1300 | app.other
+"""
+
+
+class TestImportTime:
+    """导入耗时测试"""
+
+    def test_import_main_does_not_load_inference_stack(self):
+        """导入 app.main 不导入 torch / WeNet，也不修改 root logger"""
+        code = (
+            "import logging, sys\n"
+            "import app.main\n"
+            "heavy = [m for m in ('torch', 'torchaudio', 'wenet', 'yaml') if m in sys.modules]\n"
+            "assert not heavy, heavy\n"
+            "root = logging.getLogger()\n"
+            "assert not root.handlers and not root.filters\n"
+        )
+        proc = subprocess.run([sys.executable, "-c", code], cwd=str(PROJECT_ROOT), capture_output=True, text=True)
+        assert proc.returncode == 0, proc.stderr
+
+    def test_parse_importtime(self):
+        rows = parse_importtime(_SAMPLE)
+        assert rows[0] == ("_io", 120, 120, 2)
+        assert ("app.main", 1000, 9000, 0) in rows
+
+    def test_check_budget_and_heavy_modules(self):
+        rows = parse_importtime(_SAMPLE)
+        assert check(rows, budget_ms=100.0, heavy_modules=("wenet",)) == []
+
+        problems = check(rows, budget_ms=5.0)
+        assert "total import time 10ms exceeds budget 5ms" in problems
+        assert "torch is imported eagerly" in problems
@@ -0,0 +1,80 @@
+"""
+Unit tests for the pronunciation lexicon
+"""
+from app.lexicon import (
+    LexiconStore,
+    PronunciationLexicon,
+    arpabet_to_ipa,
+    normalize_word,
+    read_lexicon,
+    write_lexicon,
+)
+
+
+class TestLexicon:
+    """发音词典测试"""
+
+    def test_normalize_word(self):
+        """去掉首尾标点并小写"""
+        assert normalize_word("Hello,") == "hello"
+        assert normalize_word('"don\'t"') == "don't"
+        assert normalize_word("--") == ""
+
+    def test_arpabet_to_ipa(self):
+        """ARPABET 映射与非重读 AH"""
+        assert arpabet_to_ipa("HH") == "h"
+        assert arpabet_to_ipa("AH0") == "ə"
+        assert arpabet_to_ipa("AH1") == "ʌ"
+
+    def test_store_binary_search(self, tmp_path):
+        """mmap 词典可查到所有词条，未收录的词返回 None"""
+        path = str(tmp_path / "lexicon.tsv")
+        entries = {f"word{i:04d}": ["w", str(i)] for i in range(500)}
+        entries["hello"] = ["h", "ə", "l", "oʊ"]
+        entries["café"] = ["k", "æ", "f", "eɪ"]
+        entries["a"] = []
+        write_lexicon(path, entries)
+
+        store = LexiconStore(path)
+        try:
+            for word, phones in entries.items():
+                assert store.get(word) == phones
+            assert store.get("missing") is None
+            assert store.get("") is None
+            assert store.get("zzzz") is None
+        finally:
+            store.close()
+        assert read_lexicon(path) == entries
+
+    def test_empty_store(self, tmp_path):
+        """空文件不会报错"""
+        path = tmp_path / "empty.tsv"
+        path.write_bytes(b"")
+        assert LexiconStore(str(path)).get("hello") is None
+
+    def test_lookup_layers(self, tmp_path):
+        """LRU → 磁盘词典 → G2P，G2P 只用于词典外的词"""
+        path = str(tmp_path / "lexicon.tsv")
+        write_lexicon(path, {"hello": ["h", "ə", "l", "oʊ"]})
+        calls = []
+
+        def g2p(word):
+            calls.append(word)
+            return ["w", "ɝ", "l", "d"]
+
+        lexicon = PronunciationLexicon(LexiconStore(path), g2p, cache_size=2)
+        assert lexicon.lookup("Hello!") == ["h", "ə", "l", "oʊ"]
+        assert lexicon.lookup("world") == ["w", "ɝ", "l", "d"]
+        assert lexicon.lookup("world,") == ["w", "ɝ", "l", "d"]
+        assert calls == ["world"]
+        assert lexicon.stats()["storeHits"] == 1
+        assert lexicon.stats()["hits"] == 1
+
+    def test_lru_eviction_and_fallback(self):
+        """容量受限时淘汰最旧的词；G2P 不可用时使用简单映射"""
+        lexicon = PronunciationLexicon(None, lambda w: None, cache_size=2)
+        assert lexicon.lookup("cat") == ["k", "æ", "t"]
+        lexicon.lookup("dog")
+        lexicon.lookup("fish")
+        assert "cat" not in lexicon._cache
+        assert len(lexicon._cache) == 2
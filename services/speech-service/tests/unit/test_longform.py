@@ -0,0 +1,128 @@
+"""
+Unit tests for long-form segmentation and stitched alignment
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from app.alignment import WeNetAlignment
+from app.lexicon import PronunciationLexicon
+from app.longform import (
+    LongformConfig,
+    align_longform,
+    anchor_words,
+    count_emitted_tokens,
+    split_at_silences,
+)
+from app.reference import ReferenceCache
+from app.vocabulary import Vocabulary
+
+SUBSAMPLE = 4
+
+
+def _speech_feats(num_frames: int, pauses, seed: int = 0) -> torch.Tensor:
+    """语音帧能量高、停顿帧能量低的合成特征"""
+    rng = np.random.default_rng(seed)
+    feats = rng.normal(1.0, 0.3, size=(num_frames, 80))
+    for start, end in pauses:
+        feats[start:end] = rng.normal(-3.0, 0.3, size=(end - start, 80))
+    return torch.from_numpy(feats.astype(np.float32))
+
+
+def _toy_aligner() -> WeNetAlignment:
+    pieces = ['<blank>', '<unk>', '▁'] + [f'▁W{i}' for i in range(40)]
+    aligner = WeNetAlignment.__new__(WeNetAlignment)
+    aligner.vocab = Vocabulary({p: i for i, p in enumerate(pieces)})
+    aligner.spm = SimpleNamespace(EncodeAsPieces=lambda text: [f'▁W{len(w)}' for w in text.split()])
+    aligner.lexicon = PronunciationLexicon()
+    aligner.references = ReferenceCache(16)
+    return aligner
+
+
+class TestSegmentation:
+    """静音切分测试"""
+
+    def test_short_audio_single_segment(self):
+        config = LongformConfig(target_seconds=5, max_seconds=8)
+        assert split_at_silences(_speech_feats(700, []), config) == [(0, 700)]
+
+    def test_cuts_inside_pauses(self):
+        """切分点落在停顿中，片段连续覆盖整段且不超过上限"""
+        pauses = [(480, 520), (1010, 1060), (1490, 1530), (2020, 2050)]
+        config = LongformConfig(target_seconds=5, max_seconds=8, min_silence_ms=200)
+        segments = split_at_silences(_speech_feats(2600, pauses), config)
+
+        assert segments[0][0] == 0 and segments[-1][1] == 2600
+        for (_, end), (start, _) in zip(segments, segments[1:]):
+            assert end == start
+            assert any(p0 <= end < p1 for p0, p1 in pauses)
+        assert all(end - start <= 800 for start, end in segments)
+
+    def test_no_pause_falls_back_to_max_length(self):
+        config = LongformConfig(target_seconds=5, max_seconds=8)
+        segments = split_at_silences(_speech_feats(2000, []), config)
+        assert segments[-1][1] == 2000
+        assert all(end - start <= 800 for start, end in segments)
+
+
+class TestAnchoring:
+    """文本锚定测试"""
+
+    def test_count_emitted_tokens(self):
+        assert count_emitted_tokens([0, 5, 5, 0, 5, 7, 7, 0], blank_id=0) == 3
+        assert count_emitted_tokens([], blank_id=0) == 0
+
+    def test_anchor_by_emissions(self):
+        # 6 个词各 1~2 个 token；片段发射数 3 / 0 / 6
+        ranges = anchor_words([1, 2, 1, 1, 2, 2], [3, 0, 6])
+        assert ranges == [(0, 2), (2, 2), (2, 6)]
+
+    def test_anchor_covers_all_words(self):
+        ranges = anchor_words([1] * 5, [0, 0])
+        assert ranges[0][0] == 0 and ranges[-1][1] == 5
+        assert all(a <= b for a, b in ranges)
+
+
+class TestAlignLongform:
+    """分段对齐与拼接测试"""
+
+    def test_stitched_global_timestamps(self):
+        """按真实时间轴合成后验，拼接结果的词时间与真实位置一致"""
+        aligner = _toy_aligner()
+        words = ["a", "bb", "ccc", "dddd", "eeeee", "ffffff"]
+        # 每个词的发音帧区间（10ms 帧）
+        spans = [(100, 300), (350, 550), (650, 850), (900, 1100), (1200, 1400), (1450, 1650)]
+        pauses = [(0, 100), (550, 650), (1100, 1200), (1650, 1800)]
+        feats = _speech_feats(1800, pauses)
+        vocab_size = len(aligner.vocab)
+
+        def infer_many(feats_list):
+            outputs, offset = [], 0
+            for seg in feats_list:
+                T = seg.shape[0] // SUBSAMPLE
+                logits = torch.full((T, vocab_size), -10.0)
+                logits[:, 0] = 0.0
+                for word, (s, e) in zip(words, spans):
+                    token = aligner.vocab.id_of(f'▁W{len(word)}')
+                    for t in range(T):
+                        frame = offset + t * SUBSAMPLE
+                        if s <= frame < s + 40:
+                            logits[t, token] = 5.0
+                outputs.append(torch.log_softmax(logits, dim=-1))
+                offset += seg.shape[0]
+            return outputs
+
+        config = LongformConfig(target_seconds=5, max_seconds=8, min_silence_ms=200)
+        assert len(split_at_silences(feats, config)) > 1
+        result = align_longform(aligner, feats, " ".join(words), 1800 * 160, infer_many, False, config)
+
+        assert [w.word for w in result.words] == words
+        assert abs(result.duration - 18.0) < 1e-6
+        for word, (s, _) in zip(result.words, spans):
+            assert abs(word.start - s / 100.0) < 0.1
+        starts = [w.start for w in result.words]
+        assert starts == sorted(starts)
+        assert len(result.raw_confidence) == len(words)
+        # 只有整段参考文本进入 LRU，分段子文本不缓存
+        assert aligner.references.stats()["size"] == 1
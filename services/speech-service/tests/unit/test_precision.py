@@ -0,0 +1,63 @@
+"""
+Unit tests for reduced-precision inference modes
+"""
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from app import precision
+from app.precision import apply_precision, inference_context
+
+
+class _ToyModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.encoder = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 16))
+        self.ctc = torch.nn.Linear(16, 8)
+
+
+class TestPrecision:
+    """精度模式测试"""
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            apply_precision(_ToyModel(), "fp8", torch.device("cpu"))
+
+    def test_fp32_unchanged(self):
+        model = _ToyModel()
+        encoder = model.encoder
+        assert apply_precision(model, "fp32", torch.device("cpu")) == "fp32"
+        assert model.encoder is encoder
+
+    def test_int8_quantizes_encoder_linear_only(self):
+        """int8 只量化 encoder 的 Linear 层，CTC 头保持 fp32，输出接近原模型"""
+        torch.manual_seed(0)
+        model = _ToyModel().eval()
+        x = torch.randn(4, 16)
+        with torch.no_grad():
+            expected = model.encoder(x)
+
+        assert apply_precision(model, "int8", torch.device("cpu")) == "int8"
+        assert not any(type(m) is torch.nn.Linear for m in model.encoder.modules())
+        assert type(model.ctc) is torch.nn.Linear
+        with torch.no_grad():
+            got = model.encoder(x)
+        assert torch.allclose(got, expected, atol=0.05)
+
+    def test_int8_cpu_only(self):
+        model = _ToyModel()
+        assert apply_precision(model, "int8", torch.device("cuda")) == "fp32"
+
+    def test_bf16_falls_back_when_unsupported(self):
+        with patch.object(precision, "bf16_supported", return_value=False):
+            assert apply_precision(_ToyModel(), "bf16", torch.device("cpu")) == "fp32"
+
+    def test_bf16_autocast(self):
+        """bf16 模式下 Linear 在 autocast 中以 bfloat16 计算"""
+        layer = torch.nn.Linear(4, 4)
+        with inference_context("bf16", torch.device("cpu")):
+            out = layer(torch.randn(2, 4))
+        assert out.dtype == torch.bfloat16
+        with inference_context("fp32", torch.device("cpu")):
+            assert layer(torch.randn(2, 4)).dtype == torch.float32
@@ -0,0 +1,77 @@
+"""
+Unit tests for pre-fork serving helpers
+"""
+import os
+
+import pytest
+
+from app.prefork import PreforkConfig, cpu_sets, parse_cpu_list, worker_threads
+from app.registry import memory_usage, parse_smaps_rollup
+
+_SMAPS = """55b551e53000-7ffd10437000 ---p 00000000 00:00 0                          [rollup]
+Rss:                1412 kB
+Pss:                 377 kB
+Pss_Dirty:           100 kB
+Shared_Clean:       1272 kB
+Shared_Dirty:          0 kB
+Private_Clean:        40 kB
+Private_Dirty:       100 kB
+Referenced:         1412 kB
+"""
+
+
+class TestCpuSets:
+    """worker CPU 绑定测试"""
+
+    def test_parse_cpu_list(self):
+        assert parse_cpu_list("0-3,8, 10-11") == [0, 1, 2, 3, 8, 10, 11]
+        assert parse_cpu_list("") == []
+
+    def test_auto_splits_available_cpus(self):
+        assert cpu_sets(2, "auto", [7, 0, 1, 2, 3, 4, 5, 6]) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+        assert cpu_sets(3, "", range(8)) == [None, None, None]
+        with pytest.raises(ValueError):
+            cpu_sets(4, "auto", [0, 1])
+
+    def test_explicit_sets(self):
+        assert cpu_sets(2, "0-1;2,3", range(4)) == [[0, 1], [2, 3]]
+        with pytest.raises(ValueError):
+            cpu_sets(3, "0-1;2-3", range(4))
+
+    def test_worker_threads(self, monkeypatch):
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        assert worker_threads(PreforkConfig(workers=2), None) == 4
+        config = PreforkConfig(workers=2)
+        assert worker_threads(config, [0, 1, 2, 3]) == 4
+        assert worker_threads(config, [0]) == 1
+        assert worker_threads(PreforkConfig(torch_threads=3), [0]) == 3
+
+
+class TestMemoryUsage:
+    """smaps_rollup 内存统计测试"""
+
+    def test_parse_smaps_rollup(self):
+        assert parse_smaps_rollup(_SMAPS) == {
+            "rssBytes": 1412 * 1024,
+            "pssBytes": 377 * 1024,
+            "sharedBytes": 1272 * 1024,
+            "privateBytes": 140 * 1024,
+        }
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="smaps_rollup not available")
+    def test_current_process(self):
+        usage = memory_usage(os.getpid())
+        assert usage["rssBytes"] > 0
+        assert usage["rssBytes"] == usage["sharedBytes"] + usage["privateBytes"]
+
+    def test_missing_process(self):
+        assert memory_usage("no-such-pid") is None
+
+
+class TestPreforkConfig:
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("SERVE_WORKERS", "4")
+        monkeypatch.setenv("SERVE_CPU_AFFINITY", " auto ")
+        monkeypatch.setenv("SERVE_TORCH_THREADS", "2")
+        config = PreforkConfig.from_env()
+        assert (config.workers, config.cpu_affinity, config.torch_threads) == (4, "auto", 2)
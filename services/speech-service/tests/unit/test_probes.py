@@ -0,0 +1,167 @@
+"""
+Unit tests for readiness probes
+"""
+import torch
+
+from app.probes import DeepCheck, ModelReadiness, ProbeConfig
+
+
+class _FakeAligner:
+    def compute_features(self, waveform):
+        return torch.zeros(waveform.shape[-1] // 160, 80)
+
+
+class _FakeBackend:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def check_ready(self):
+        pass
+
+    def forward(self, feats_list):
+        self.calls += 1
+        if self.fail:
+            return [torch.full((feats.shape[0] // 4, 8), float("nan")) for feats in feats_list]
+        return [torch.zeros(feats.shape[0] // 4, 8) for feats in feats_list]
+
+
+class _FakeRegistry:
+    def __init__(self, backend, loaded=True):
+        self.backend = backend
+        self.is_loaded = loaded
+        self.state = "loaded" if loaded else "unloaded"
+
+    def get_aligner(self):
+        return _FakeAligner()
+
+    def get_backend(self):
+        return self.backend
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeepCheck:
+    """深度就绪检查测试"""
+
+    def test_result_cached_within_interval(self):
+        """间隔内复用缓存结果，过期后重新推理"""
+        backend, clock = _FakeBackend(), _Clock()
+        check = DeepCheck(_FakeRegistry(backend), interval_s=30.0, clock=clock)
+
+        assert check.result()["ok"] is True
+        clock.now = 10.0
+        assert check.result()["ok"] is True
+        assert backend.calls == 1
+
+        clock.now = 31.0
+        check.result()
+        assert backend.calls == 2
+
+    def test_non_finite_output_fails(self):
+        check = DeepCheck(_FakeRegistry(_FakeBackend(fail=True)))
+        result = check.result()
+        assert result["ok"] is False
+        assert "non-finite" in result["error"]
+
+    def test_unloaded_model_not_loaded(self):
+        """模型未加载时直接失败，不触发推理"""
+        backend = _FakeBackend()
+        result = DeepCheck(_FakeRegistry(backend, loaded=False)).result()
+        assert result == {"ok": False, "error": "model unloaded"}
+        assert backend.calls == 0
+
+    def test_concurrent_caller_gets_cached_result(self):
+        """已有探针在检查时不阻塞，返回上一次的结果"""
+        check = DeepCheck(_FakeRegistry(_FakeBackend()), interval_s=0.0)
+        first = check.result()
+        with check._lock:
+            assert check.result() is first
+
+
+class TestProbeConfig:
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("READYZ_DEEP", "true")
+        monkeypatch.setenv("READYZ_DEEP_INTERVAL_S", "15")
+        config = ProbeConfig.from_env()
+        assert config.deep_by_default is True
+        assert config.deep_interval_s == 15.0
+        assert config.load_retry_s == 10.0
+
+
+class _LoadingRegistry:
+    def __init__(self, fail=True):
+        self.fail = fail
+        self.loads = 0
+        self.last_error = None
+        self.state = "unloaded"
+
+    def load(self):
+        self.loads += 1
+        if self.fail:
+            self.last_error = "model missing"
+            self.state = "error"
+            raise RuntimeError(self.last_error)
+        self.last_error = None
+        self.state = "loaded"
+
+
+class TestModelReadiness:
+    def _wait(self, readiness):
+        if readiness._loader is not None:
+            readiness._loader.join(timeout=5)
+
+    def test_failed_load_retried_after_interval(self):
+        """加载失败后在后台按间隔重试，成功后就绪"""
+        clock = _Clock()
+        registry = _LoadingRegistry()
+        readiness = ModelReadiness(registry, retry_s=10.0, clock=clock)
+
+        ready, content = readiness.status()
+        self._wait(readiness)
+        assert not ready
+        assert registry.loads == 1
+
+        ready, content = readiness.status()
+        self._wait(readiness)
+        assert content == {"status": "error", "error": "model missing"}
+        assert registry.loads == 1
+
+        registry.fail = False
+        clock.now = 10.0
+        readiness.status()
+        self._wait(readiness)
+        assert registry.loads == 2
+        assert readiness.status() == (True, {"status": "ready"})
+
+    def test_worker_error_resubmitted_after_interval(self):
+        """进程池模式：子进程报告加载失败时按间隔重新提交预热任务"""
+        from concurrent.futures import Future
+        from types import SimpleNamespace
+
+        clock = _Clock()
+        futures = []
+
+        def submit(fn):
+            futures.append(Future())
+            return futures[-1]
+
+        executor = SimpleNamespace(config=SimpleNamespace(kind="process"), submit=submit)
+        readiness = ModelReadiness(_LoadingRegistry(), lambda: executor, retry_s=10.0, clock=clock)
+
+        assert readiness.status() == (False, {"status": "loading"})
+        futures[0].set_result({"state": "error", "error": "model missing"})
+        assert readiness.status() == (False, {"status": "error", "error": "model missing"})
+        assert len(futures) == 1
+
+        clock.now = 10.0
+        readiness.status()
+        assert len(futures) == 2
+        futures[1].set_result({"state": "loaded", "error": None})
+        assert readiness.status() == (True, {"status": "ready"})
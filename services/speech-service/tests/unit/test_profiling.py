@@ -0,0 +1,39 @@
+"""
+Unit tests for the per-request profiling mode
+"""
+import os
+
+from app.profiling import ProfilingConfig, profile_requested, run_profiled
+from app.timing import stage
+
+
+def _pipeline(x):
+    with stage("fbank"):
+        sum(range(1000))
+    with stage("viterbi"):
+        sum(range(1000))
+    return x * 2
+
+
+class TestProfiling:
+    """profile 模式测试"""
+
+    def test_gated_by_config(self):
+        disabled, enabled = ProfilingConfig(enabled=False), ProfilingConfig(enabled=True)
+        assert not profile_requested(disabled, "1", True)
+        assert profile_requested(enabled, "1", None)
+        assert profile_requested(enabled, None, True)
+        assert not profile_requested(enabled, None, None)
+        assert not profile_requested(enabled, "0", False)
+
+    def test_run_profiled_breakdown(self):
+        result, timer, trace = run_profiled(_pipeline, 21)
+        assert result == 42 and trace is None
+        breakdown = timer.breakdown()
+        assert set(breakdown) == {"fbank", "viterbi", "inference"}
+        for stage_times in breakdown.values():
+            assert stage_times["wallMs"] >= 0 and stage_times["cpuMs"] >= 0
+
+    def test_run_profiled_dumps_trace(self, tmp_path):
+        _, _, trace = run_profiled(_pipeline, 1, dump_dir=str(tmp_path))
+        assert os.path.exists(trace + ".prof")
@@ -0,0 +1,92 @@
+"""
+Unit tests for compiled reference cache
+"""
+import numpy as np
+import pytest
+
+from app.ctc_viterbi import build_extended_labels, build_skip_mask
+from app.reference import ReferenceCache, compile_reference, group_tokens_by_word
+
+
+class TestGroupTokensByWord:
+    """token 分词分组测试"""
+
+    def test_word_boundaries(self):
+        """以 '▁' 开头的 token 开始新词"""
+        pieces = ["▁HE", "LLO", "▁WOR", "LD"]
+        assert group_tokens_by_word(pieces, 2) == [[0, 1], [2, 3]]
+
+    def test_pad_missing_words(self):
+        """分组不足时补空组"""
+        assert group_tokens_by_word(["▁HI"], 3) == [[0], [], []]
+
+    def test_merge_extra_groups(self):
+        """分组过多时合并到最后一个词"""
+        pieces = ["▁A", "▁B", "▁C", "D"]
+        assert group_tokens_by_word(pieces, 2) == [[0], [1, 2, 3]]
+
+    def test_empty(self):
+        assert group_tokens_by_word([], 2) == []
+        assert group_tokens_by_word(["▁A"], 0) == []
+
+
+class TestCompileReference:
+    """参考文本编译测试"""
+
+    def test_compile(self):
+        """编译结果包含扩展标签、掩码、分组与音素"""
+        ref = compile_reference("hello world", [5, 6, 7], ["▁HE", "LLO", "▁WORLD"], lambda w: list(w[:2]))
+        assert ref.words == ["hello", "world"]
+        np.testing.assert_array_equal(ref.ext_labels, build_extended_labels([5, 6, 7]))
+        np.testing.assert_array_equal(ref.skip_mask, build_skip_mask(build_extended_labels([5, 6, 7])))
+        assert ref.word_token_groups == [[0, 1], [2]]
+        assert ref.word_phonemes == [["h", "e"], ["w", "o"]]
+
+    def test_arrays_read_only(self):
+        """缓存共享的数组不可被请求修改"""
+        ref = compile_reference("a", [3], ["▁A"], lambda w: [w])
+        with pytest.raises(ValueError):
+            ref.ext_labels[0] = 1
+
+
+class TestReferenceCache:
+    """参考文本 LRU 测试"""
+
+    def _compile(self, calls):
+        def fn(text):
+            calls.append(text)
+            return compile_reference(text, [1], ["▁X"], lambda w: [w])
+        return fn
+
+    def test_hit_and_miss(self):
+        """相同文本（忽略首尾空白）只编译一次"""
+        calls = []
+        cache = ReferenceCache(capacity=4)
+        first = cache.get_or_compile("hello", self._compile(calls))
+        second = cache.get_or_compile("  hello ", self._compile(calls))
+        assert first is second
+        assert calls == ["hello"]
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hitRatio"] == 0.5
+
+    def test_eviction(self):
+        """超过容量时淘汰最久未使用的文本"""
+        calls = []
+        cache = ReferenceCache(capacity=2)
+        fn = self._compile(calls)
+        cache.get_or_compile("a", fn)
+        cache.get_or_compile("b", fn)
+        cache.get_or_compile("a", fn)
+        cache.get_or_compile("c", fn)  # 淘汰 b
+        cache.get_or_compile("b", fn)
+        assert calls == ["a", "b", "c", "b"]
+        assert cache.stats()["size"] == 2
+
+    def test_zero_capacity_disables_cache(self):
+        calls = []
+        cache = ReferenceCache(capacity=0)
+        cache.get_or_compile("a", self._compile(calls))
+        cache.get_or_compile("a", self._compile(calls))
+        assert calls == ["a", "a"]
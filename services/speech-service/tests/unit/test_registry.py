@@ -0,0 +1,109 @@
+"""
+Unit tests for model registry
+"""
+import threading
+
+import pytest
+
+from app.registry import ModelRegistry
+
+
+class _FakeAligner:
+    vocab_size = 3
+    model_path = "fake.pt"
+    model = None
+    precision = "fp32"
+
+    def __init__(self):
+        self.g2p_loaded = False
+
+    def _ensure_g2p(self):
+        self.g2p_loaded = True
+
+
+class TestModelRegistry:
+    """模型注册表测试"""
+
+    def test_load_once_and_share(self):
+        """并发获取只加载一次并返回同一实例"""
+        created = []
+
+        def factory():
+            created.append(1)
+            return _FakeAligner()
+
+        registry = ModelRegistry(factory=factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get_aligner())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(created) == 1
+        assert all(r is results[0] for r in results)
+        assert results[0].g2p_loaded
+
+        stats = registry.stats()
+        assert stats["loaded"] is True
+        assert stats["loadTimeMs"] is not None
+        assert stats["vocabSize"] == 3
+
+    def test_load_failure_recorded_and_retried(self):
+        """加载失败时记录错误，下次调用重新尝试"""
+        calls = []
+
+        def factory():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("model missing")
+            return _FakeAligner()
+
+        registry = ModelRegistry(factory=factory)
+        with pytest.raises(RuntimeError):
+            registry.get_aligner()
+        assert registry.last_error == "model missing"
+        assert not registry.is_loaded
+
+        assert registry.get_aligner() is not None
+        assert registry.last_error is None
+
+    def test_state_does_not_trigger_load(self):
+        """state 只读缓存状态，不会触发加载"""
+        calls = []
+
+        def factory():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("model missing")
+            return _FakeAligner()
+
+        registry = ModelRegistry(factory=factory)
+        assert registry.state == "unloaded"
+        assert calls == []
+
+        with pytest.raises(RuntimeError):
+            registry.load()
+        assert registry.state == "error"
+
+        registry.load()
+        assert registry.state == "loaded"
+        assert len(calls) == 2
+
+    def test_model_identity_tracks_model_file(self, tmp_path, monkeypatch):
+        """模型标识包含模型文件的大小与修改时间、后端与精度"""
+        checkpoint = tmp_path / "final.pt"
+        checkpoint.write_bytes(b"v1")
+        aligner = _FakeAligner()
+        aligner.model_path = str(checkpoint)
+        registry = ModelRegistry(factory=lambda: aligner)
+        registry.load()
+
+        monkeypatch.setenv("WENET_BACKEND", "torch")
+        first = registry.model_identity()
+        assert "backend=torch" in first and "precision=fp32" in first
+        checkpoint.write_bytes(b"version 2")
+        assert registry.model_identity() != first
+        aligner.precision = "int8"
+        assert "precision=int8" in registry.model_identity()
+
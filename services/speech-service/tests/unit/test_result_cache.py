@@ -0,0 +1,211 @@
+"""
+Unit tests for result cache and request coalescing
+"""
+import asyncio
+import os
+
+import numpy as np
+
+from app.result_cache import DiskResultStore, ResultCache, ResultCacheConfig, result_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestResultKey:
+    """缓存键测试"""
+
+    def test_text_exact(self):
+        """响应按原文返回单词，键不做大小写或空白规范化"""
+        samples = np.zeros((1, 100), dtype=np.float32)
+        assert result_key(samples, 16000, "Hello  World", True) == result_key(samples, 16000, "Hello  World", True)
+        assert result_key(samples, 16000, "Hello  World", True) != result_key(samples, 16000, "hello world", True)
+
+    def test_key_depends_on_model(self):
+        """更换模型、后端或精度后不命中旧结果"""
+        samples = np.zeros((1, 100), dtype=np.float32)
+        base = result_key(samples, 16000, "hello", True, "model=a|backend=torch|precision=fp32")
+        assert base != result_key(samples, 16000, "hello", True, "model=b|backend=torch|precision=fp32")
+        assert base != result_key(samples, 16000, "hello", True, "model=a|backend=onnx|precision=fp32")
+
+    def test_key_depends_on_inputs(self):
+        samples = np.zeros((1, 100), dtype=np.float32)
+        other = samples.copy()
+        other[0, 5] = 0.1
+        base = result_key(samples, 16000, "hello", True)
+        assert base != result_key(other, 16000, "hello", True)
+        assert base != result_key(samples, 8000, "hello", True)
+        assert base != result_key(samples, 16000, "hello", False)
+        assert base != result_key(samples, 16000, "world", True)
+
+
+class TestResultCache:
+    """结果缓存测试"""
+
+    def test_hit_returns_copy(self):
+        """命中时返回副本，调用方修改不影响缓存"""
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=1024))
+        cache.put("k", {"score": 1})
+        first = cache.get("k")
+        first["score"] = 2
+        assert cache.get("k") == {"score": 1}
+
+    def test_ttl_expiry(self):
+        clock = _Clock()
+        cache = ResultCache(ResultCacheConfig(ttl_s=10, max_bytes=1024), clock=clock)
+        cache.put("k", {"score": 1})
+        clock.now = 9.9
+        assert cache.get("k") is not None
+        clock.now = 10.0
+        assert cache.get("k") is None
+        assert cache.stats()["bytes"] == 0
+
+    def test_byte_limit_evicts_lru(self):
+        """超过字节上限时淘汰最久未使用的结果"""
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=40))
+        cache.put("a", {"v": "x" * 10})
+        cache.put("b", {"v": "y" * 10})
+        cache.get("a")
+        cache.put("c", {"v": "z" * 10})
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["bytes"] <= 40
+        assert cache.stats()["evictions"] == 1
+
+    def test_disabled(self):
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=0))
+        cache.put("k", {"score": 1})
+        assert cache.get("k") is None
+
+    def test_get_or_compute_hit(self):
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=1024))
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"score": 1}
+
+        async def main():
+            first = await cache.get_or_compute("k", compute)
+            second = await cache.get_or_compute("k", compute)
+            return first, second
+
+        first, second = _run(main())
+        assert first == ({"score": 1}, "miss")
+        assert second == ({"score": 1}, "hit")
+        assert len(calls) == 1
+
+    def test_concurrent_requests_coalesced(self):
+        """并发的相同请求只计算一次"""
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=1024))
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"score": 1}
+
+        async def main():
+            return await asyncio.gather(*[cache.get_or_compute("k", compute) for _ in range(5)])
+
+        results = _run(main())
+        assert len(calls) == 1
+        statuses = sorted(status for _, status in results)
+        assert statuses == ["coalesced"] * 4 + ["miss"]
+        assert all(result == {"score": 1} for result, _ in results)
+        # 每个请求拿到独立的对象
+        assert len({id(result) for result, _ in results}) == 5
+
+    def test_failure_not_cached_and_shared(self):
+        """计算失败时等待者收到同一异常，且结果不缓存"""
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=1024))
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def main():
+            return await asyncio.gather(
+                *[cache.get_or_compute("k", compute) for _ in range(3)], return_exceptions=True
+            )
+
+        results = _run(main())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.get("k") is None
+
+    def test_waiters_retry_when_leader_abandons(self):
+        """负责计算的请求放弃（如客户端断开）时，等待者重新计算"""
+        cache = ResultCache(ResultCacheConfig(ttl_s=60, max_bytes=1024))
+
+        class Gone(Exception):
+            pass
+
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise Gone()
+            return {"score": 1}
+
+        async def main():
+            return await asyncio.gather(
+                *[cache.get_or_compute("k", compute, retry_on=(Gone,)) for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        results = _run(main())
+        assert isinstance(results[0], Gone)
+        assert results[1] == ({"score": 1}, "miss")
+        assert results[2] == ({"score": 1}, "coalesced")
+        assert len(calls) == 2
+
+    def test_disk_store_shared(self, tmp_path):
+        """磁盘存储可被新的缓存实例复用"""
+        config = ResultCacheConfig(ttl_s=60, max_bytes=1024, disk_dir=str(tmp_path))
+
+        async def compute():
+            return {"score": 1}
+
+        async def fail():
+            raise AssertionError("should not recompute")
+
+        async def main():
+            writer = ResultCache(config)
+            await writer.get_or_compute("k", compute)
+            # 磁盘写入在后台线程执行，等待其完成
+            for _ in range(100):
+                if (tmp_path / "k.json").exists():
+                    break
+                await asyncio.sleep(0.01)
+            reader = ResultCache(config)
+            result = await reader.get_or_compute("k", fail)
+            return reader, result
+
+        reader, result = _run(main())
+        assert result == ({"score": 1}, "hit")
+        stats = reader.stats()
+        assert stats["diskHits"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 0
+        assert stats["hitRatio"] == 1.0
+
+    def test_disk_store_prunes(self, tmp_path):
+        """磁盘超过上限时删除最旧的条目"""
+        store = DiskResultStore(str(tmp_path), max_bytes=10, ttl_s=60)
+        store.put("a", b"x" * 8)
+        os.utime(tmp_path / "a.json", (1, 1))
+        store.put("b", b"y" * 8)
+        assert store.get("b") == b"y" * 8
+        assert store.get("a") is None
@@ -0,0 +1,134 @@
+"""
+Unit tests for streaming (chunked) assessment
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+import torchaudio.compliance.kaldi as kaldi
+
+from app.audio import AudioTooLarge
+from app.streaming import StreamingFbank, StreamingSession
+
+
+def _fbank(waveform: torch.Tensor) -> torch.Tensor:
+    return kaldi.fbank(
+        waveform.unsqueeze(0), num_mel_bins=80, sample_frequency=16000,
+        frame_length=25.0, frame_shift=10.0, dither=0.0,
+        window_type='hamming', use_energy=False,
+    )
+
+
+class _FakeEncoder:
+    """模拟 Conv2dSubsampling4 的帧数变化，输出为 [1, T', 2]"""
+
+    def __init__(self):
+        self.embed = SimpleNamespace(subsampling_rate=4, right_context=6)
+        self.calls = []
+
+    def forward_chunk(self, xs, offset, required_cache_size, att_cache, cnn_cache):
+        n = xs.size(1)
+        out_len = ((n - 1) // 2 - 1) // 2
+        self.calls.append((n, offset, required_cache_size))
+        return torch.zeros(1, out_len, 2), att_cache, cnn_cache
+
+
+class _FakeCTC:
+    def log_softmax(self, x):
+        return torch.log_softmax(x, dim=-1)
+
+
+class TestStreaming:
+    """流式评估测试"""
+
+    def test_streaming_fbank_matches_offline(self):
+        """任意分块输入的增量 fbank 与整段提取一致"""
+        rng = np.random.default_rng(0)
+        samples = rng.normal(scale=0.1, size=16000).astype(np.float32)
+        fbank = StreamingFbank(_fbank)
+        pieces = []
+        pos = 0
+        while pos < len(samples):
+            n = int(rng.integers(50, 3000))
+            out = fbank.accept(samples[pos:pos + n])
+            if out is not None:
+                pieces.append(out)
+            pos += n
+        streamed = torch.cat(pieces, dim=0)
+        offline = _fbank(torch.from_numpy(samples))
+        assert streamed.shape == offline.shape
+        assert torch.allclose(streamed, offline, atol=1e-4)
+
+    def test_session_chunking_covers_all_frames(self):
+        """分块编码输出帧数与整段子采样一致，offset 连续递增"""
+        encoder = _FakeEncoder()
+        aligner = SimpleNamespace(
+            model=SimpleNamespace(encoder=encoder, ctc=_FakeCTC()),
+            compute_features=_fbank,
+            device=torch.device("cpu"),
+        )
+        session = StreamingSession(aligner, "hello world", chunk_size=16)
+        assert session.decoding_window == 67 and session.stride == 64
+
+        rng = np.random.default_rng(1)
+        pcm = (rng.normal(scale=0.1, size=32000) * 32768).astype("<i2")
+        for start in range(0, len(pcm), 1600):
+            session.accept_pcm16(pcm[start:start + 1600].tobytes())
+        ctc_probs = session.finish()
+
+        total_frames = _fbank(torch.zeros(32000)).shape[0]
+        assert ctc_probs.shape[0] == ((total_frames - 1) // 2 - 1) // 2
+        offsets = [c[1] for c in encoder.calls]
+        assert offsets == sorted(offsets) and offsets[0] == 0
+        assert all(c[0] == 67 for c in encoder.calls[:-1])
+
+    def test_short_audio_is_padded(self):
+        """过短音频与整段评估一样补零到 0.5 秒"""
+        aligner = SimpleNamespace(
+            model=SimpleNamespace(encoder=_FakeEncoder(), ctc=_FakeCTC()),
+            compute_features=_fbank,
+            device=torch.device("cpu"),
+        )
+        session = StreamingSession(aligner, "hi", chunk_size=16)
+        session.accept_pcm16(np.zeros(1600, dtype="<i2").tobytes())
+        session.finish()
+        assert session.fbank.num_samples == 8000
+
+    def test_total_audio_limit(self):
+        """累计 PCM 超过 max_bytes 时拒绝，且不处理超出的数据"""
+        aligner = SimpleNamespace(
+            model=SimpleNamespace(encoder=_FakeEncoder(), ctc=_FakeCTC()),
+            compute_features=_fbank,
+            device=torch.device("cpu"),
+        )
+        session = StreamingSession(aligner, "hi", chunk_size=16, max_bytes=6400)
+        chunk = np.zeros(1600, dtype="<i2").tobytes()
+        session.accept_pcm16(chunk)
+        session.accept_pcm16(chunk)
+        with pytest.raises(AudioTooLarge):
+            session.accept_pcm16(chunk)
+        assert session.num_bytes == 6400
+        assert session.fbank.num_samples == 3200
+
+    def test_odd_length_frames_carry_over(self):
+        """PCM 在奇数字节处切分时，剩余字节并入下一条消息，结果与整段输入一致"""
+        rng = np.random.default_rng(2)
+        data = (rng.normal(scale=0.1, size=16000) * 32768).astype("<i2").tobytes()
+
+        def run(pieces):
+            aligner = SimpleNamespace(
+                model=SimpleNamespace(encoder=_FakeEncoder(), ctc=_FakeCTC()),
+                compute_features=_fbank,
+                device=torch.device("cpu"),
+            )
+            session = StreamingSession(aligner, "hi", chunk_size=16)
+            for piece in pieces:
+                session.accept_pcm16(piece)
+            return session, session.finish()
+
+        whole, expected = run([data])
+        split, actual = run([data[:1601], data[1601:3333], data[3333:]])
+        assert split.num_bytes == whole.num_bytes == len(data)
+        assert split.fbank.num_samples == whole.fbank.num_samples == 16000
+        assert torch.allclose(actual, expected)
@@ -0,0 +1,36 @@
+"""
+Unit tests for stage timing and Prometheus stage metrics
+"""
+import pytest
+
+from app.timing import StageTimer, stage
+
+
+def _stage_count(name: str) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value("sylis_stage_seconds_count", {"stage": name}) or 0.0
+
+
+class TestStageTiming:
+    """阶段计时测试"""
+
+    def test_stage_records_into_active_timer(self):
+        timer = StageTimer()
+        with timer.activate():
+            with stage("fbank"):
+                pass
+            with stage("fbank"):
+                pass
+        with stage("fbank"):
+            pass  # 计时器未启用时不记录到请求
+        timings = timer.as_dict()
+        assert list(timings) == ["fbankMs"]
+        assert timings["fbankMs"] >= 0
+
+    def test_stage_observes_histogram(self):
+        pytest.importorskip("prometheus_client")
+        before = _stage_count("viterbi")
+        with stage("viterbi"):
+            pass
+        assert _stage_count("viterbi") == before + 1
@@ -0,0 +1,90 @@
+"""
+Unit tests for leading/trailing silence trimming
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from app.alignment import WeNetAlignment
+from app.lexicon import PronunciationLexicon
+from app.phoneme_confidence import compute_assessment_scores
+from app.reference import ReferenceCache
+from app.trim import TrimConfig, TrimSpan, speech_span
+from app.vocabulary import Vocabulary
+
+
+def _padded_tone(lead_s: float, tone_s: float, tail_s: float, seed: int = 0) -> np.ndarray:
+    """前后带低噪声静音的 440Hz 正弦"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(tone_s * 16000)) / 16000.0
+    tone = 0.5 * np.sin(2 * np.pi * 440.0 * t)
+    lead = rng.normal(0, 1e-4, int(lead_s * 16000))
+    tail = rng.normal(0, 1e-4, int(tail_s * 16000))
+    return np.concatenate([lead, tone, tail]).astype(np.float32)
+
+
+class TestSpeechSpan:
+    """语音区间检测测试"""
+
+    def test_trims_leading_and_trailing_silence(self):
+        samples = _padded_tone(1.5, 1.0, 2.0)
+        span = speech_span(torch.from_numpy(samples), TrimConfig(enabled=True, margin_ms=100))
+        assert span.total == samples.shape[0]
+        assert abs(span.start - (1.5 - 0.1) * 16000) <= 320
+        assert abs(span.end - (2.5 + 0.1) * 16000) <= 320
+        assert abs(span.trimmed_s - 3.3) < 0.05
+
+    def test_disabled_keeps_full_span(self):
+        samples = _padded_tone(1.0, 1.0, 1.0)
+        assert speech_span(samples, TrimConfig(enabled=False)) == TrimSpan(0, samples.shape[0], samples.shape[0])
+
+    def test_off_by_default(self, monkeypatch):
+        """未设置 AUDIO_TRIM_SILENCE 时不裁剪"""
+        monkeypatch.delenv("AUDIO_TRIM_SILENCE", raising=False)
+        assert TrimConfig.from_env().enabled is False
+        assert TrimConfig().enabled is False
+        monkeypatch.setenv("AUDIO_TRIM_SILENCE", "true")
+        assert TrimConfig.from_env().enabled is True
+
+    def test_silent_audio_not_trimmed(self):
+        samples = np.zeros(32000, dtype=np.float32)
+        assert speech_span(samples, TrimConfig(enabled=True)) == TrimSpan(0, 32000, 32000)
+
+    def test_min_length(self):
+        samples = _padded_tone(1.0, 0.05, 1.0)
+        span = speech_span(samples, TrimConfig(enabled=True, margin_ms=0))
+        assert span.num_samples == 8000
+
+
+class TestTrimmedAlignment:
+    """裁剪后的时间戳还原测试"""
+
+    def test_timestamps_reoffset_to_original_timeline(self):
+        pieces = ['<blank>', '<unk>', '▁'] + [f'▁W{i}' for i in range(10)]
+        aligner = WeNetAlignment.__new__(WeNetAlignment)
+        aligner.vocab = Vocabulary({p: i for i, p in enumerate(pieces)})
+        aligner.spm = SimpleNamespace(EncodeAsPieces=lambda text: [f'▁W{len(w)}' for w in text.split()])
+        aligner.lexicon = PronunciationLexicon()
+        aligner.references = ReferenceCache(4)
+
+        torch.manual_seed(0)
+        probs = torch.log_softmax(torch.randn(40, len(pieces)), dim=-1)
+        text = "hi there"
+        span = TrimSpan(start=24000, end=40000, total=64000)
+
+        base = aligner.align_posteriors(probs, text, span.num_samples)
+        trimmed = aligner.align_posteriors(probs, text, span.num_samples, span)
+
+        assert trimmed.duration == 4.0
+        assert abs(trimmed.trimmed_duration - 3.0) < 1e-9
+        for bw, tw in zip(base.words, trimmed.words):
+            assert abs(tw.start - (bw.start + 1.5)) < 1e-9
+            assert abs(tw.end - (bw.end + 1.5)) < 1e-9
+            for bp, tp in zip(bw.phonemes, tw.phonemes):
+                assert abs(tp.start - (bp.start + 1.5)) < 1e-9
+
+        # 流利度按原始时长计算
+        scores = compute_assessment_scores(trimmed)
+        assert scores["duration"] == 4.0
+        assert scores["trimmedDuration"] == 3.0
@@ -0,0 +1,54 @@
+"""
+Unit tests for vocabulary
+"""
+from app.vocabulary import Vocabulary
+
+
+def _symbol_table():
+    pieces = ['<blank>', '<unk>', '▁', '▁HE', 'LLO', '▁WORLD', "'S"]
+    return {p: i for i, p in enumerate(pieces)}
+
+
+class TestVocabulary:
+    """词表双向索引测试"""
+
+    def test_special_ids(self):
+        vocab = Vocabulary(_symbol_table())
+        assert len(vocab) == 7
+        assert vocab.blank_id == 0
+        assert vocab.unk_id == 1
+        assert vocab.space_id == 2
+        assert vocab.space_piece == '▁'
+
+    def test_round_trip(self):
+        """decode(encode(x)) 保持一致，未登录 piece 编码为 unk"""
+        vocab = Vocabulary(_symbol_table())
+        ids = vocab.encode(['▁HE', 'LLO', '▁WORLD'])
+        assert ids == [3, 4, 5]
+        assert vocab.decode(ids) == ['▁HE', 'LLO', '▁WORLD']
+        assert vocab.encode(['▁MISSING']) == [1]
+
+    def test_decode_out_of_range(self):
+        vocab = Vocabulary(_symbol_table())
+        assert vocab.decode([99, -1]) == ['', '']
+        assert vocab.piece_of(99) is None
+        assert vocab.piece_of(5) == '▁WORLD'
+
+    def test_id_holes(self):
+        """id 不连续时空洞反查为 None"""
+        vocab = Vocabulary({'<blank>': 0, 'a': 2})
+        assert vocab.piece_of(1) is None
+        assert vocab.decode([2, 1]) == ['a', '']
+
+    def test_encode_sentencepiece_uppercases(self):
+        vocab = Vocabulary(_symbol_table())
+        assert vocab.encode_sentencepiece(['▁he', 'llo', "'s"]) == [3, 4, 6]
+
+    def test_encode_chars(self):
+        """字符级回退：空格映射到 '▁'，否则保留空格"""
+        vocab = Vocabulary({'<blank>': 0, '<unk>': 1, '▁': 2, 'a': 3, 'b': 4})
+        assert vocab.encode_chars('A b!') == [3, 2, 4, 1]
+
+        no_space = Vocabulary({'<blank>': 0, '<unk>': 1, ' ': 2, 'a': 3})
+        assert no_space.space_id is None
+        assert no_space.encode_chars('a a') == [3, 2, 3]